@@ -1,24 +1,278 @@
 
-from typing import Annotated, Literal
+import asyncio
+import json
+import os
+import tempfile
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Annotated, Any, Awaitable, Callable, Literal, Optional, TypeVar
 
-from fastapi import FastAPI, File, Form, HTTPException, Response, UploadFile
+import numpy as np
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.responses import PlainTextResponse
 from loguru import logger
-from pydantic import BaseModel, ValidationError, Field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
-from src.mpcli.entities.source import AudioSource
+from src.mpcli.api_cache import (
+    CacheStats,
+    ResultCache,
+    cache_key,
+    cached_response,
+    file_digest,
+    not_modified,
+)
+from src.mpcli.api_metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    Counter,
+    Gauge,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    registry,
+    server_timing,
+)
+from src.mpcli.api_jobs import (
+    JobRecord,
+    JobRunner,
+    JobStatus,
+    JobStore,
+    job_parameters_adapter,
+)
+from src.mpcli.api_tempo import TempoBatcher
+from src.mpcli.api_streaming import (
+    MEDIA_TYPES,
+    output_filename,
+    remove_output,
+    render_to_file,
+    stream_audio,
+    stream_file,
+)
+from src.mpcli.api_upload import (
+    MaxUploadSizeMiddleware,
+    save_upload,
+    spooled_source,
+    spooled_sources,
+)
+from src.mpcli.api_pool import (
+    APISettings,
+    DeadlineExceededError,
+    MemoryBudgetExceededError,
+    ServerBusyError,
+    WorkerPool,
+)
+from src.mpcli.entities.pipeline import DetectTempoStage, PipelineStage, TimeStretchStage
+from src.mpcli.entities.source import AudioSegment, AudioSource, AudioSourceError
+from src.mpcli.model_host import (
+    ModelHostClient,
+    ModelHostUnavailableError,
+    share_tempo_features,
+)
+from src.mpcli.repository.exceptions import AudioTransformError
+from src.mpcli.repository.profiling import settings as profiling_settings
+from src.mpcli.repository.scheduler import (
+    MemoryModel,
+    pipeline_stretch_rate,
+    probe_audio_source,
+    stretch_rate,
+)
+from src.mpcli.repository.shared_array import SharedArray, release_array
+from src.mpcli.repository.stream_stretch import (
+    MAX_RATE,
+    MIN_RATE,
+    StreamStretcher,
+    stretch_samples,
+)
+from src.mpcli.repository.timing import timed, timed_stage
 from src.mpcli.use_cases.convert import execute_format_conversion
 from src.mpcli.use_cases.normalization import execute_normalization
-from src.mpcli.use_cases.tempo import execute_tempo_estimation
+from src.mpcli.use_cases.pipeline import execute_pipeline
+from src.mpcli.use_cases.tempo import execute_tempo_features
 from src.mpcli.use_cases.timestretch import execute_timestretch
 
-app = FastAPI()
+T = TypeVar("T")
+
+# the use cases are CPU-bound, they are run in worker processes
+worker_pool = WorkerPool(APISettings.from_env())
+
+# the tempo model runs in the server process, on the features computed by the workers:
+# the estimations of the concurrent requests are batched
+tempo_batcher = TempoBatcher(
+    max_batch=worker_pool.settings.tempo_batch_size,
+    max_delay=worker_pool.settings.tempo_batch_delay,
+)
+
+# or in the model host, shared by the API workers
+model_host = (
+    ModelHostClient(worker_pool.settings.model_host)
+    if worker_pool.settings.model_host is not None
+    else None
+)
+
+# the results of the synchronous endpoints, by upload and parameters
+result_cache = ResultCache(
+    worker_pool.settings.cache_dir,
+    memory_size=worker_pool.settings.cache_memory_size,
+    disk_size=worker_pool.settings.cache_disk_size,
+)
+
+# estimates the memory needed by the requests, admitted against the budget of the worker pool
+memory_model = MemoryModel()
+
+# the state of the server, read when the metrics are scraped
+registry.register(
+    Gauge(
+        "mpcli_worker_requests",
+        "Requests admitted to the worker pool, being processed or waiting for a worker",
+        ("state",),
+        lambda: {
+            ("processing",): min(worker_pool.in_flight, worker_pool.settings.workers),
+            ("queued",): max(worker_pool.in_flight - worker_pool.settings.workers, 0),
+        },
+    )
+)
+registry.register(
+    Gauge(
+        "mpcli_memory_reserved_bytes",
+        "Memory reserved by the requests being processed, out of the budget of the worker pool",
+        function=lambda: {(): worker_pool.memory.reserved if worker_pool.memory else 0},
+    )
+)
+registry.register(
+    Gauge(
+        "mpcli_memory_waiting_requests",
+        "Requests waiting for memory to be available in the budget of the worker pool",
+        function=lambda: {(): worker_pool.memory.waiting if worker_pool.memory else 0},
+    )
+)
+registry.register(
+    Counter(
+        "mpcli_cache_lookups_total",
+        "Lookups of the cache of the results, by outcome",
+        ("result",),
+        lambda: {
+            ("memory_hit",): result_cache.stats.memory_hits,
+            ("disk_hit",): result_cache.stats.disk_hits,
+            ("miss",): result_cache.stats.misses,
+        },
+    )
+)
+registry.register(
+    Gauge(
+        "mpcli_cache_size_bytes",
+        "Bytes held by the cache of the results, by tier",
+        ("tier",),
+        lambda: {
+            ("memory",): result_cache.stats.memory_size,
+            ("disk",): result_cache.stats.disk_size,
+        },
+    )
+)
+registry.register(
+    Counter(
+        "mpcli_tempo_batches_total",
+        "Batches run through the tempo model by this process",
+        function=lambda: {(): tempo_batcher.batches},
+    )
+)
+registry.register(
+    Counter(
+        "mpcli_tempo_estimations_total",
+        "Tempo estimations run through the model in batches by this process",
+        function=lambda: {(): tempo_batcher.estimations},
+    )
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    # the queue of the /jobs endpoints, the jobs left by the previous run are resumed
+    jobs_dir = worker_pool.settings.jobs_dir
+    store = JobStore(jobs_dir / "jobs.sqlite")
+    app.state.job_runner = JobRunner(store, worker_pool, jobs_dir)
+    runner = asyncio.create_task(app.state.job_runner.run())
+
+    if model_host is None:
+        tempo_batcher.warm_up()
+
+    yield
+
+    runner.cancel()
+    tempo_batcher.shutdown()
+    worker_pool.shutdown()
+    store.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MaxUploadSizeMiddleware, max_size=worker_pool.settings.max_upload_size)
+# the work of the sampled requests in the worker processes is profiled, see `MPCLI_PROFILE_DIR`
+if profiling_settings.enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=profiling_settings.directory,
+        sample_rate=profiling_settings.sample_rate,
+    )
+# the outermost middleware, the rejected uploads are measured as well
+app.add_middleware(MetricsMiddleware)
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exc: StarletteHTTPException):
-    return PlainTextResponse(str(exc.detail), status_code=exc.status_code)
+    return PlainTextResponse(
+        str(exc.detail), status_code=exc.status_code, headers=getattr(exc, "headers", None)
+    )
+
+
+def _overload_error(
+    e: ServerBusyError
+    | DeadlineExceededError
+    | ModelHostUnavailableError
+    | MemoryBudgetExceededError,
+) -> HTTPException:
+    """the HTTP error of a request which could not be processed in time"""
+
+    if isinstance(e, ModelHostUnavailableError):
+        return HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(worker_pool.settings.retry_after)},
+        )
+
+    if isinstance(e, ServerBusyError):
+        return HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+
+    if isinstance(e, MemoryBudgetExceededError):
+        # the request would never fit, whenever it's retried
+        return HTTPException(status_code=413, detail=str(e))
+
+    return HTTPException(status_code=504, detail=str(e))
+
+
+# the errors of the requests which could not be processed, mapped by `_overload_error`
+OVERLOAD_ERRORS = (
+    ServerBusyError,
+    DeadlineExceededError,
+    ModelHostUnavailableError,
+    MemoryBudgetExceededError,
+)
 
 
 @app.exception_handler(RequestValidationError)
@@ -29,6 +283,29 @@ async def validation_exception_handler(request, exc: RequestValidationError):
     return PlainTextResponse(message, status_code=400)
 
 
+def audio_segment(
+    start: Annotated[Optional[float], Form(
+        description="Start of the part of the audio to process, by default the start of the audio")] = None,
+    end: Annotated[Optional[float], Form(
+        description="End of the part of the audio to process, by default the end of the audio")] = None,
+    unit: Annotated[Literal["seconds", "samples"], Form(
+        description="Unit of the start and the end, seconds or samples")] = "seconds",
+) -> Optional[AudioSegment]:
+    """the part of the audio to process: only this part is decoded, processed and returned"""
+
+    if start is None and end is None:
+        return None
+
+    try:
+        return AudioSegment(start=start or 0.0, end=end, unit=unit)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+# the part of the uploaded audio to process, see `audio_segment`
+Segment = Annotated[Optional[AudioSegment], Depends(audio_segment)]
+
+
 class TempoResponse(BaseModel):
 
     source_name: str = Field(..., description="The name of the source audio file")
@@ -43,72 +320,216 @@ class AudioResponse(BaseModel):
     sample_rate: int = Field(..., description="The sample rate of the audio file in Hz")
 
 
+async def _request_key(source: AudioSource, operation: str, **parameters) -> str:
+    """cache key of the request, from the content of the upload, its segment and the parameters"""
+
+    if source.segment is not None:
+        parameters["segment"] = source.segment.model_dump()
+
+    with timed_stage("hash"):
+        digest = await asyncio.to_thread(file_digest, source.audio_path)
+
+    return cache_key(digest, operation, **parameters)
+
+
+async def _run_use_case(
+    operation: str,
+    source: AudioSource,
+    fn: Callable[..., T],
+    *args,
+    discard: Optional[Callable[[T], None]] = None,
+    rate: Optional[float] = 1.0,
+) -> T:
+    """run ``fn(*args)`` on a worker once the memory that the operation is estimated to need
+    on the source is available, the estimation is made from the header of the source
+    and from the lowest rate the source is time stretched by"""
+
+    probe = await asyncio.to_thread(probe_audio_source, source)
+
+    return await worker_pool.run(
+        fn, *args, memory=memory_model.estimate(operation, probe, rate), discard=discard
+    )
+
+
+async def _run_render(
+    operation: str,
+    source: AudioSource,
+    execute: Callable[..., T],
+    *args,
+    rate: Optional[float] = 1.0,
+) -> T:
+    """run the use case on a worker with `render_to_file`: its output is written to a temporary file,
+    removed when the request is abandoned (e.g. past its deadline) before the output is sent"""
+
+    return await _run_use_case(
+        operation,
+        source,
+        render_to_file,
+        execute,
+        *args,
+        discard=partial(remove_output, source=source),
+        rate=rate,
+    )
+
+
+def _release_features(features: np.ndarray | SharedArray) -> None:
+    """remove the block of shared memory of the features, unless already released"""
+
+    if isinstance(features, SharedArray):
+        release_array(features)
+
+
+async def _tempo_features(source: AudioSource) -> np.ndarray | SharedArray:
+    """the features of the tempo model, computed by a worker: in shared memory for the model host,
+    the block must be released by the caller with `_release_features`"""
+
+    if model_host is not None:
+        return await _run_use_case(
+            "detect_tempo", source, share_tempo_features, source, discard=_release_features
+        )
+
+    return await _run_use_case("detect_tempo", source, execute_tempo_features, source)
+
+
+async def _predict_tempo(features: np.ndarray | SharedArray) -> float:
+    """the tempo of the features, run through the model in a batch with the concurrent requests"""
+
+    if model_host is not None:
+        with timed_stage("tempo_inference"):
+            return await model_host.estimate(features)
+
+    return await tempo_batcher.estimate(features)
+
+
+async def _estimate_tempo(source: AudioSource) -> float:
+
+    features = await _tempo_features(source)
+
+    try:
+        return await _predict_tempo(features)
+    finally:
+        _release_features(features)
+
+
+async def _render(
+    request: Request,
+    source: AudioSource,
+    key: str,
+    render: Callable[[], Awaitable[Any]],
+    suffix: Callable[[Any], str] = lambda result: "",
+) -> Response:
+    """Respond with the processed audio of the source, rendered by ``render``
+    unless the result of the same request is cached"""
+
+    if (response := not_modified(request, key)) is not None:
+        return response
+
+    cached = await result_cache.get(key)
+
+    if cached is None:
+
+        result = await render()
+        if result is None:
+            raise ValueError("No result returned")
+
+        converted = result.converted_audio
+
+        # the source itself may be the result, e.g. when converted to its own format
+        cached = await result_cache.put(
+            key,
+            converted.audio_path,
+            media_type=MEDIA_TYPES.get(converted.audio_format, "application/octet-stream"),
+            metadata={"audio_format": converted.audio_format, "suffix": suffix(result)},
+        )
+
+    filename = output_filename(source, cached.metadata["audio_format"], cached.metadata["suffix"])
+
+    return cached_response(cached, filename)
+
+
 @app.post("/convert")
-def convert(file: Annotated[UploadFile, File(
-    description="The audio file to be converted. Supported formats are WAV and MP3.")], 
+async def convert(request: Request, file: Annotated[UploadFile, File(
+    description="The audio file to be converted. Supported formats are WAV and MP3.")], segment: Segment,
             target_format: Annotated[str, Form(
                 examples=[{"value": "wav", "description": "Convert to WAV format"}, {"value": "mp3", "description": "Convert to MP3 format"}])],
             sample_rate: Annotated[int, Form()] = 44100):
 
-    file_content = file.file.read()
+    # "MP3" and "mp3" are the same request
+    target_format = target_format.lower()
 
     try:
-        audio_source = AudioSource(
-            name=file.filename,
-            audio_format=file.filename.split(".")[-1],
-            audio_bytes=file_content,
-            sample_rate=sample_rate,  # Use the provided sample rate
-        )
+        async with spooled_source(file, sample_rate=sample_rate, segment=segment) as audio_source:
 
-        # Here you would implement the actual conversion logic
-        result = execute_format_conversion(audio_source, target_format)
-        
-        logger.info(
-            f"Converted '{audio_source.name}' from {audio_source.audio_format} to {target_format}, resulting in {len(result.converted_audio.audio_bytes)} bytes"
-        )
+            key = await _request_key(
+                audio_source, "convert", target_format=target_format, sample_rate=sample_rate
+            )
 
-        # generate a response with the converted audio content
-        return Response(
-            result.converted_audio.audio_bytes, media_type="application/octet-stream"
-        )
+            # stream the converted audio, the source itself when it's already in the target format
+            response = await _render(
+                request,
+                audio_source,
+                key,
+                lambda: _run_render(
+                    "convert",
+                    audio_source,
+                    execute_format_conversion,
+                    audio_source,
+                    target_format,
+                ),
+            )
 
-    except ValidationError as e:
+            logger.info(
+                f"Converted '{audio_source.name}' from {audio_source.audio_format} to {target_format}"
+            )
+
+            return response
+
+    except (ValidationError, AudioSourceError) as e:
+        # e.g. a segment starting after the end of the audio
         raise HTTPException(status_code=422, detail=str(e))
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/normalize")
-def normalize(
+async def normalize(
+    request: Request,
+    segment: Segment,
     file: Annotated[UploadFile, File(
         description="The audio file to be normalized. Supported formats are WAV and MP3.")], lufs: Annotated[float, Form(
             description="The target loudness in LUFS. Defaults to -14.0 LUFS", ge=-20.0, le=0.0)]= -14.0
 ):
 
-    file_content = file.file.read()
-
     try:
-        audio_source = AudioSource(
-            name=file.filename,
-            audio_format=file.filename.split(".")[-1],
-            audio_bytes=file_content,
-            sample_rate=44100,  # Assuming a default sample rate, adjust as needed
-        )
+        async with spooled_source(file, segment=segment) as audio_source:
 
-        result = execute_normalization(audio_source, lufs)
-        return Response(
-            result.converted_audio.audio_bytes,
-            media_type="application/octet-stream",
-        )
+            key = await _request_key(audio_source, "normalize", lufs=lufs)
 
-    except ValidationError as e:
+            return await _render(
+                request,
+                audio_source,
+                key,
+                lambda: _run_render(
+                    "normalize", audio_source, execute_normalization, audio_source, lufs
+                ),
+                suffix=lambda result: "_normalized",
+            )
+
+    except (ValidationError, AudioSourceError) as e:
+        # e.g. a segment starting after the end of the audio
         raise HTTPException(status_code=422, detail=str(e))
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/timestretch")
-def timestretch(
+async def timestretch(
+    request: Request,
+    segment: Segment,
     file: Annotated[UploadFile, File(
         description="The audio file to be timestretched. Supported formats are WAV and MP3.")],
     target_tempo: Annotated[float, Form(
@@ -142,30 +563,52 @@ def timestretch(
         f"Received timestretch request for file '{file.filename}' with target_tempo={target_tempo}, min_rate={min_rate}, max_rate={max_rate}"
     )
 
-    file_content = file.file.read()
-
     try:
-        audio_source = AudioSource(
-            name=file.filename,
-            audio_format=file.filename.split(".")[-1],
-            audio_bytes=file_content,
-            sample_rate=44100,  # Assuming a default sample rate, adjust as needed
-        )
+        async with spooled_source(file, segment=segment) as audio_source:
 
-        result = execute_timestretch(audio_source, target_tempo, min_rate, max_rate)
-        return Response(
-            result.converted_audio.audio_bytes,
-            media_type="application/octet-stream",
-        )
+            key = await _request_key(
+                audio_source,
+                "timestretch",
+                target_tempo=target_tempo,
+                min_rate=min_rate,
+                max_rate=max_rate,
+            )
 
-    except ValidationError as e:
+            async def render():
+                original_tempo = await _estimate_tempo(audio_source)
+                return await _run_render(
+                    "timestretch",
+                    audio_source,
+                    execute_timestretch,
+                    audio_source,
+                    target_tempo,
+                    min_rate,
+                    max_rate,
+                    original_tempo,
+                    rate=stretch_rate(target_tempo, min_rate, max_rate, original_tempo),
+                )
+
+            return await _render(
+                request,
+                audio_source,
+                key,
+                render,
+                suffix=lambda result: f"_{result.target_tempo}_BPM",
+            )
+
+    except (ValidationError, AudioSourceError) as e:
+        # e.g. a segment starting after the end of the audio
         raise HTTPException(status_code=422, detail=str(e))
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tempo")
-def tempo(file: UploadFile = File(...)) -> TempoResponse:
+async def tempo(
+    request: Request, response: Response, segment: Segment, file: UploadFile = File(...)
+) -> TempoResponse:
     """Estimate the tempo of an audio file.
 
     Args:
@@ -175,27 +618,566 @@ def tempo(file: UploadFile = File(...)) -> TempoResponse:
         TempoResponse: The estimated tempo of the audio file.
     """
 
-    file_content = file.file.read()
-
     try:
-        audio_source = AudioSource(
-            name=file.filename,
-            audio_format=file.filename.split(".")[-1],
-            audio_bytes=file_content,
-            sample_rate=44100,  # Assuming a default sample rate, adjust as needed
-        )
+        async with spooled_source(file, segment=segment) as audio_source:
+
+            key = await _request_key(audio_source, "tempo")
+
+            if (not_modified_response := not_modified(request, key)) is not None:
+                return not_modified_response
+
+            cached = await result_cache.get(key)
+
+            if cached is None:
+                cached = await result_cache.put(
+                    key, metadata={"tempo": await _estimate_tempo(audio_source)}
+                )
+
+            response.headers["ETag"] = cached.etag
 
-        result = execute_tempo_estimation(audio_source)
-        if result is not None:
             return TempoResponse(
                 source_name=audio_source.name,
                 source_format=audio_source.audio_format,
-                tempo=result.tempo,
+                tempo=cached.metadata["tempo"],
             )
 
-        raise ValueError("No tempo estimation result returned")
+    except (ValidationError, AudioSourceError) as e:
+        # e.g. a segment starting after the end of the audio
+        raise HTTPException(status_code=422, detail=str(e))
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    except ValidationError as e:
+
+# the operations of the /process endpoint, in order
+pipeline_stages_adapter: TypeAdapter[list[PipelineStage]] = TypeAdapter(
+    Annotated[list[PipelineStage], Field(min_length=1)]
+)
+
+
+def _needs_source_tempo(stages: list[PipelineStage]) -> bool:
+    """whether the tempo of the source is used, by a stage run before any time stretch"""
+
+    for stage in stages:
+        match stage:
+            case DetectTempoStage() | TimeStretchStage(target_tempo=float()):
+                return True
+            case TimeStretchStage():
+                return False
+
+    return False
+
+
+@app.post("/process")
+async def process(
+    request: Request,
+    segment: Segment,
+    file: Annotated[UploadFile, File(
+        description="The audio file to be processed. Supported formats are WAV and MP3.")],
+    operations: Annotated[str, Form(
+        description="""
+        The JSON list of the operations to run in order, each one with its parameters, e.g.
+        `[{"operation": "timestretch", "target_tempo": 95}, {"operation": "normalize", "lufs": -14}, {"operation": "convert", "target_format": "mp3"}]`.
+        The operations are `detect_tempo`, `timestretch` (`target_tempo`, or `min_rate` and `max_rate`), `normalize` (`lufs`) and `convert` (`target_format`).
+        """,
+        examples=['[{"operation": "timestretch", "target_tempo": 95}, {"operation": "normalize", "lufs": -14}]'],
+    )],
+):
+    """Run a chain of operations on the audio file in a single request: the file is uploaded once,
+    and the operations run on a single decoded buffer, encoded once, whatever their number.
+
+    When an operation needs the tempo of the source (`detect_tempo`, or a `timestretch`
+    to a `target_tempo` before any other time stretch), the tempo is estimated beforehand
+    by the batched tempo model, which decodes the file a second time for its features.
+
+    The duration of each operation, decoding and encoding included, is reported
+    in the `Server-Timing` header of the response.
+    """
+
+    try:
+        stages = pipeline_stages_adapter.validate_json(operations)
+
+        async with spooled_source(file, segment=segment) as audio_source:
+
+            key = await _request_key(
+                audio_source,
+                "process",
+                operations=[stage.model_dump() for stage in stages],
+            )
+
+            timings: dict[str, float] = {}
+
+            async def render():
+
+                original_tempo = None
+                if _needs_source_tempo(stages):
+                    with timed(timings, "tempo_inference"):
+                        original_tempo = await _estimate_tempo(audio_source)
+
+                result = await _run_render(
+                    "pipeline",
+                    audio_source,
+                    execute_pipeline,
+                    audio_source,
+                    stages,
+                    original_tempo,
+                    rate=pipeline_stretch_rate(stages, original_tempo),
+                )
+                timings.update(result.timings)
+
+                return result
+
+            response = await _render(
+                request,
+                audio_source,
+                key,
+                render,
+                suffix=lambda result: "_processed",
+            )
+
+            response.headers["Server-Timing"] = (
+                server_timing(timings) if timings else 'cache;desc="hit"'
+            )
+
+            return response
+
+    except (ValidationError, AudioSourceError) as e:
+        # e.g. a segment starting after the end of the audio
         raise HTTPException(status_code=422, detail=str(e))
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class BatchTempoResponse(BaseModel):
+
+    source_name: str = Field(..., description="The name of the source audio file")
+    source_format: Optional[str] = Field(default=None, description="The format of the source audio file")
+    tempo: Optional[float] = Field(default=None, description="The estimated tempo of the audio file in BPM")
+    error: Optional[str] = Field(default=None, description="Why the tempo could not be estimated")
+
+
+BatchFiles = Annotated[list[UploadFile], File(
+    description="The audio files, WAV or MP3, and zip archives of audio files")]
+
+
+def _skipped(name: str, error: BaseException) -> str:
+    logger.warning(f"Batch: '{name}' skipped, {error}")
+    return str(error)
+
+
+@app.post("/batch/tempo")
+async def batch_tempo(files: BatchFiles, segment: Segment) -> list[BatchTempoResponse]:
+    """Estimate the tempo of many audio files at once.
+
+    The features of the files are computed in parallel on the workers, and run through
+    the tempo model in batches. A file which cannot be processed gets an error in its result,
+    the other results are not affected.
+
+    Returns:
+        list[BatchTempoResponse]: the estimated tempo of each audio file, in the order of the upload
+    """
+
+    # the batch takes at most all the workers, the requests submitted meanwhile are still served
+    semaphore = asyncio.Semaphore(worker_pool.settings.workers)
+
+    async def estimate_one(source: AudioSource) -> float:
+        async with semaphore:
+            features = await _tempo_features(source)
+
+        try:
+            return await _predict_tempo(features)
+        finally:
+            _release_features(features)
+
+    try:
+        async with spooled_sources(
+            files, worker_pool.settings.max_upload_size, segment=segment
+        ) as sources:
+
+            valid = [s for _, s in sources if isinstance(s, AudioSource)]
+            tempi = await asyncio.gather(
+                *(estimate_one(s) for s in valid), return_exceptions=True
+            )
+
+            # a busy server fails the whole batch, for the client to retry it later
+            for error in tempi:
+                if isinstance(
+                    error, (ServerBusyError, DeadlineExceededError, ModelHostUnavailableError)
+                ):
+                    raise error
+
+            results = dict(zip(map(id, valid), tempi))
+
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=422, detail=f"Invalid zip archive: {e}")
+    except OVERLOAD_ERRORS as e:
+        raise _overload_error(e)
+    except StarletteHTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    responses = []
+
+    for name, source in sources:
+
+        result = results.get(id(source), source)
+
+        if isinstance(result, BaseException):
+            responses.append(BatchTempoResponse(source_name=name, error=_skipped(name, result)))
+        else:
+            responses.append(
+                BatchTempoResponse(
+                    source_name=name, source_format=source.audio_format, tempo=result
+                )
+            )
+
+    return responses
+
+
+def _write_archive(path: Path, outputs: list[tuple[str, Path, dict]], report: list[dict]) -> None:
+    """zip the processed files under their names, made unique, with the report of the batch:
+    the name of each file in the archive is set in its entry of the report"""
+
+    names: set[str] = set()
+
+    with zipfile.ZipFile(path, "w") as archive:
+
+        for filename, output, entry in outputs:
+
+            stem, suffix = os.path.splitext(filename)
+            name, n = filename, 1
+            while name in names:
+                name, n = f"{stem} ({n}){suffix}", n + 1
+            names.add(name)
+
+            # the audio is compressed already, or hardly compressible
+            archive.write(output, name, compress_type=zipfile.ZIP_STORED)
+            entry["output"] = name
+
+        archive.writestr("results.json", json.dumps(report, indent=2))
+
+
+@app.post("/batch/normalize")
+async def batch_normalize(
+    files: BatchFiles,
+    segment: Segment,
+    lufs: Annotated[float, Form(
+        description="The target loudness in LUFS. Defaults to -14.0 LUFS", ge=-20.0, le=0.0)] = -14.0,
+):
+    """Normalize many audio files at once, in parallel on the workers.
+
+    Returns:
+        a zip archive of the normalized files, with a `results.json` reporting
+        the output of each uploaded file, or why it could not be processed
+    """
+
+    # the batch takes at most all the workers, the requests submitted meanwhile are still served
+    semaphore = asyncio.Semaphore(worker_pool.settings.workers)
+
+    async def normalize_one(source: AudioSource) -> AudioSource:
+        async with semaphore:
+            result = await _run_render("normalize", source, execute_normalization, source, lufs)
+        return result.converted_audio
+
+    fd, name = tempfile.mkstemp(prefix="mpcli-batch-", suffix=".zip")
+    os.close(fd)
+    archive_path = Path(name)
+
+    try:
+        async with spooled_sources(
+            files, worker_pool.settings.max_upload_size, segment=segment
+        ) as sources:
+
+            valid = [s for _, s in sources if isinstance(s, AudioSource)]
+            normalized = await asyncio.gather(
+                *(normalize_one(s) for s in valid), return_exceptions=True
+            )
+            results = dict(zip(map(id, valid), normalized))
+
+            outputs, report, errors = [], [], []
+
+            for name, source in sources:
+
+                result = results.get(id(source), source)
+
+                if isinstance(result, BaseException):
+                    errors.append(result)
+                    report.append({"source_name": name, "error": _skipped(name, result)})
+                else:
+                    report.append({"source_name": name, "lufs": lufs})
+                    filename = output_filename(source, result.audio_format, "_normalized")
+                    outputs.append((filename, result.audio_path, report[-1]))
+
+            try:
+                # a busy server fails the whole batch, for the client to retry it later
+                for error in errors:
+                    if isinstance(error, (ServerBusyError, DeadlineExceededError)):
+                        raise error
+
+                await asyncio.to_thread(_write_archive, archive_path, outputs, report)
+            finally:
+                for _, output, _ in outputs:
+                    output.unlink(missing_ok=True)
+
+    except BaseException as e:
+        archive_path.unlink(missing_ok=True)
+
+        if isinstance(e, zipfile.BadZipFile):
+            raise HTTPException(status_code=422, detail=f"Invalid zip archive: {e}")
+        if isinstance(e, (ServerBusyError, DeadlineExceededError)):
+            raise _overload_error(e)
+        if isinstance(e, Exception) and not isinstance(e, StarletteHTTPException):
+            raise HTTPException(status_code=500, detail=str(e))
+        raise
+
+    return stream_file(archive_path, "application/zip", "normalized.zip", remove=True)
+
+
+# the encodings of the PCM frames of the streaming endpoints, interleaved little-endian samples
+PCM_FORMATS = {"f32": np.dtype("<f4"), "s16": np.dtype("<i2")}
+
+
+class StreamControl(BaseModel):
+    """A text message of the client of a stream, changing its parameters or ending it"""
+
+    rate: Optional[float] = Field(default=None, ge=MIN_RATE, le=MAX_RATE)
+    end: bool = Field(default=False, description="no more frames are sent, the output is flushed")
+
+
+def _decode_pcm(data: bytes, pcm: np.dtype, channels: int) -> np.ndarray:
+
+    if len(data) % (pcm.itemsize * channels):
+        raise ValueError(
+            f"Expected whole frames of {channels} {pcm.name} samples, got {len(data)} bytes"
+        )
+
+    samples = np.frombuffer(data, dtype=pcm).reshape(-1, channels)
+
+    if pcm.kind == "i":
+        return samples.astype(np.float32) / 32768.0
+
+    return samples.astype(np.float32)
+
+
+def _encode_pcm(samples: np.ndarray, pcm: np.dtype) -> bytes:
+
+    if pcm.kind == "i":
+        samples = np.clip(np.round(samples * 32768.0), -32768, 32767)
+
+    return samples.astype(pcm).tobytes()
+
+
+@app.websocket("/stream/timestretch")
+async def stream_timestretch(
+    websocket: WebSocket,
+    sample_rate: Annotated[int, Query(gt=0, description="Sample rate of the stream in Hz")] = 44100,
+    channels: Annotated[int, Query(ge=1, le=8, description="Number of channels of the stream")] = 2,
+    rate: Annotated[float, Query(
+        ge=MIN_RATE, le=MAX_RATE, description="Initial time stretch rate, > 1 speeds up the audio")] = 1.0,
+    format: Annotated[Literal["f32", "s16"], Query(
+        description="Encoding of the PCM frames, float32 or int16, interleaved little-endian")] = "f32",
+    block: Annotated[int, Query(
+        ge=1024, le=65536, description="Frames stretched at a time, the latency grows with it")] = 8192,
+):
+    """Time stretch a live stream of PCM frames, by a rate which may change over time.
+
+    The client sends binary messages of interleaved PCM frames, and text messages
+    of JSON controls: `{"rate": 1.1}` changes the rate from the next block on,
+    `{"end": true}` flushes the output of the frames received and closes the stream.
+    The stretched frames are sent back as binary messages in the same encoding,
+    once the frames following them are received: the latency is about `block + 6144` frames.
+    """
+
+    await websocket.accept()
+
+    pcm = PCM_FORMATS[format]
+    stretcher = StreamStretcher(channels, rate=rate, block=block)
+
+    async def send_windows(final: bool = False) -> None:
+        for window in stretcher.windows(final=final):
+            stretched = await worker_pool.run(
+                stretch_samples, window.samples, sample_rate, window.rate
+            )
+            output = stretcher.assemble(window, stretched)
+            if len(output):
+                await websocket.send_bytes(_encode_pcm(output, pcm))
+
+    try:
+        while True:
+            message = await websocket.receive()
+
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                stretcher.feed(_decode_pcm(message["bytes"], pcm, channels))
+                await send_windows()
+                continue
+
+            control = StreamControl.model_validate_json(message.get("text") or "{}")
+
+            if control.rate is not None:
+                stretcher.rate = control.rate
+
+            if control.end:
+                await send_windows(final=True)
+                await websocket.close()
+                return
+
+    except WebSocketDisconnect:
+        logger.info("The client of the stream disconnected")
+    except (ValueError, AudioTransformError) as e:
+        # pydantic.ValidationError is a ValueError: an invalid control message
+        await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA, reason=str(e)[:120])
+    except (ServerBusyError, DeadlineExceededError) as e:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e)[:120])
+
+
+@app.get("/cache")
+async def cache_stats() -> CacheStats:
+    """The hits and misses of the cache of the results, and its size"""
+
+    return result_cache.stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """The metrics of the server in the Prometheus text format: the latency of the requests
+    and of their stages, the bytes received and sent, the depth of the queue and the cache hits"""
+
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+class JobResponse(BaseModel):
+    id: str = Field(..., description="The id of the job")
+    operation: str = Field(..., description="The operation run by the job")
+    status: JobStatus
+    progress: float = Field(..., description="The estimated completed fraction of the job, from 0 to 1")
+    error: Optional[str] = Field(default=None, description="Why the job failed")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    result_url: Optional[str] = Field(
+        default=None, description="Where to download the processed audio, once the job is done"
+    )
+
+    @classmethod
+    def from_record(cls, job: JobRecord) -> "JobResponse":
+        return cls(
+            id=job.id,
+            operation=job.parameters.operation,
+            status=job.status,
+            progress=job.progress,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            completed_at=job.completed_at,
+            result_url=f"/jobs/{job.id}/result" if job.status == JobStatus.done else None,
+        )
+
+
+def _get_job(request: Request, job_id: str) -> JobRecord:
+
+    job = request.app.state.job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    segment: Segment,
+    file: Annotated[UploadFile, File(
+        description="The audio file to be processed. Supported formats are WAV and MP3.")],
+    operation: Annotated[Literal["convert", "normalize", "timestretch"], Form(
+        description="The operation, the other parameters are the ones of its endpoint")],
+    target_format: Annotated[Optional[str], Form()] = None,
+    sample_rate: Annotated[int, Form()] = 44100,
+    lufs: Annotated[float, Form()] = -14.0,
+    target_tempo: Annotated[Optional[float], Form()] = None,
+    min_rate: Annotated[float, Form()] = 1.0,
+    max_rate: Annotated[float, Form()] = 1.0,
+) -> JobResponse:
+    """Queue the processing of an audio file, the job is run in the background:
+    poll `GET /jobs/{id}` until it's done, then download the result from `GET /jobs/{id}/result`."""
+
+    runner: JobRunner = request.app.state.job_runner
+    job_id = runner.new_id()
+
+    try:
+        parameters = job_parameters_adapter.validate_python(
+            {
+                "operation": operation,
+                "target_format": target_format,
+                "lufs": lufs,
+                "target_tempo": target_tempo,
+                "min_rate": min_rate,
+                "max_rate": max_rate,
+            }
+        )
+        source = AudioSource(
+            name=file.filename,
+            audio_format=file.filename.split(".")[-1],
+            audio_path=runner.input_path(job_id, file.filename),
+            sample_rate=sample_rate,
+            segment=segment,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        await runner.check_capacity()
+    except ServerBusyError as e:
+        raise _overload_error(e)
+
+    try:
+        await save_upload(file, source.audio_path)
+    except BaseException:
+        source.audio_path.unlink(missing_ok=True)
+        raise
+
+    job = runner.new_job(job_id, parameters, source)
+
+    logger.info(f"Job {job.id} queued: {operation} of '{file.filename}'")
+
+    return JobResponse.from_record(job)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str) -> JobResponse:
+    """The status and progress of a job"""
+
+    return JobResponse.from_record(_get_job(request, job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(request: Request, job_id: str):
+    """The processed audio of a job which is done, it can be downloaded until the job is deleted"""
+
+    job = _get_job(request, job_id)
+
+    if job.status != JobStatus.done:
+        raise HTTPException(
+            status_code=409, detail=f"Job '{job_id}' is {job.status.value}, it has no result"
+        )
+
+    output = AudioSource(
+        audio_path=job.output.path,
+        audio_format=job.output.audio_format,
+        sample_rate=job.output.sample_rate,
+    )
+
+    return stream_audio(output, filename=f"{job.output.name}.{job.output.audio_format}")
+
+
+@app.delete("/jobs/{job_id}", status_code=204)
+async def delete_job(request: Request, job_id: str) -> None:
+    """Delete a job and its files, a running job completes but its result is dropped"""
+
+    request.app.state.job_runner.delete(_get_job(request, job_id))
@@ -0,0 +1,392 @@
+import asyncio
+import hashlib
+import json
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, computed_field, model_validator
+
+from src.mpcli.api_streaming import stream_file, stream_opened_file
+
+# bumped when the processing changes, so that the results of the previous versions are not served
+CACHE_VERSION = 1
+
+# an entry larger than this fraction of the memory budget is only kept on disk
+MEMORY_ENTRY_FRACTION = 8
+
+
+def cache_key(digest: str, operation: str, **parameters: Any) -> str:
+    """Key of the result of an operation, from the hash of the uploaded bytes and the parameters.
+
+    The parameters are normalized so that equivalent requests share their result:
+    the numbers are compared as floats (``95`` and ``95.0`` are the same tempo)
+    and the order of the parameters does not matter.
+    """
+
+    normalized = {
+        name: float(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+        else value
+        for name, value in parameters.items()
+    }
+
+    request = json.dumps(
+        {"version": CACHE_VERSION, "upload": digest, "operation": operation, "parameters": normalized},
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+class CachedResult(BaseModel):
+    """A result of the cache, its content is held in memory or stored in a file,
+    or it's entirely described by its metadata (e.g. an estimated tempo)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    key: str
+    media_type: str = "application/octet-stream"
+    size: int = 0
+    metadata: dict[str, Any] = Field(
+        default_factory=dict, description="what the endpoint needs to answer, besides the content"
+    )
+    content: Optional[bytes] = Field(default=None, exclude=True)
+    path: Optional[Path] = Field(default=None, exclude=True)
+    file: Optional[Any] = Field(
+        default=None,
+        exclude=True,
+        description="the file of the content, opened by the cache to respond with it",
+    )
+    transient: bool = Field(
+        default=False,
+        exclude=True,
+        description="the result could not be cached, its file is to be removed once sent",
+    )
+
+    @model_validator(mode="after")
+    def check_single_content(self):
+        if self.content is not None and self.path is not None:
+            raise ValueError("At most one of content or path must be provided")
+        return self
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key}"'
+
+
+class CacheStats(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_entries: int = 0
+    memory_size: int = Field(default=0, description="bytes held by the memory tier")
+    disk_entries: int = 0
+    disk_size: int = Field(default=0, description="bytes stored by the disk tier")
+
+    @computed_field
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResultCache:
+    """Content-addressed cache of the results of the API, in two tiers:
+
+    - the small results are kept in memory, the least recently used ones being evicted
+      beyond ``memory_size`` bytes,
+    - the results are stored in ``directory``, the least recently used ones being removed
+      beyond ``disk_size`` bytes. The disk tier survives the restarts of the server.
+
+    A budget of 0 disables its tier. The cache must be used by the coroutines of a single event loop:
+    the files are read and written by threads, the operations on the cache being serialized.
+    """
+
+    def __init__(self, directory: Path, memory_size: int, disk_size: int):
+        self.directory = directory
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+
+        self._memory: OrderedDict[str, CachedResult] = OrderedDict()
+        self._memory_used = 0
+
+        # the index of the disk tier is loaded on first use
+        self._disk: Optional[OrderedDict[str, CachedResult]] = None
+        self._disk_used = 0
+
+        self._lock = asyncio.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats.model_copy(
+            update={
+                "memory_entries": len(self._memory),
+                "memory_size": self._memory_used,
+                "disk_entries": len(self._disk or ()),
+                "disk_size": self._disk_used,
+            }
+        )
+
+    def _index_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _content_path(self, key: str) -> Path:
+        return self.directory / key
+
+    def _read_index(self) -> list[CachedResult]:
+        """the entries stored in the directory, the least recently used first"""
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # the access time being the modification time of the index
+        indexes = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime_ns)
+        results = []
+
+        for index in indexes:
+            try:
+                result = CachedResult.model_validate_json(index.read_text())
+            except (OSError, ValueError):
+                logger.warning(f"Invalid cache index {index}, removed")
+                index.unlink(missing_ok=True)
+                continue
+
+            if self._content_path(result.key).exists():
+                result.path = self._content_path(result.key)
+            elif result.size > 0:
+                # the content was removed, e.g. by hand
+                index.unlink(missing_ok=True)
+                continue
+
+            results.append(result)
+
+        return results
+
+    async def _load_disk(self) -> OrderedDict[str, CachedResult]:
+
+        if self._disk is not None:
+            return self._disk
+
+        self._disk = OrderedDict()
+
+        if self.disk_size == 0:
+            return self._disk
+
+        for result in await asyncio.to_thread(self._read_index):
+            self._disk[result.key] = result
+            self._disk_used += result.size
+
+        await self._evict_disk()
+
+        return self._disk
+
+    def _open(self, result: CachedResult) -> Optional[BinaryIO]:
+        """mark the entry as used and open its content: the open file stays readable once evicted
+
+        Raises:
+            OSError: if the content was removed
+        """
+
+        self._index_path(result.key).touch()
+
+        return open(result.path, "rb") if result.path is not None else None
+
+    async def get(self, key: str) -> Optional[CachedResult]:
+        """The cached result, or None: the file of a result stored on disk is opened
+        for the response, see `cached_response`"""
+
+        async with self._lock:
+
+            if (result := self._memory.get(key)) is not None:
+                self._memory.move_to_end(key)
+                self._stats.memory_hits += 1
+                return result
+
+            disk = await self._load_disk()
+
+            if (result := disk.get(key)) is not None:
+                disk.move_to_end(key)
+
+                try:
+                    file = await asyncio.to_thread(self._open, result)
+                except OSError:
+                    # removed in the meantime, e.g. by hand
+                    self._disk_used -= disk.pop(key).size
+                    self._stats.misses += 1
+                    return None
+
+                self._stats.disk_hits += 1
+                return await self._remember(result.model_copy(update={"file": file}))
+
+            self._stats.misses += 1
+            return None
+
+    def _store(self, result: CachedResult, path: Optional[Path]) -> Optional[BinaryIO]:
+        """move the file of the result to the disk tier and write its index,
+        the content is opened before it may be evicted"""
+
+        file = None
+
+        if path is not None:
+            shutil.move(path, self._content_path(result.key))
+            file = open(self._content_path(result.key), "rb")
+
+        self._index_path(result.key).write_text(result.model_dump_json())
+
+        return file
+
+    @staticmethod
+    def _take(path: Path) -> bytes:
+        """the content of the file, removed"""
+
+        content = path.read_bytes()
+        path.unlink()
+        return content
+
+    async def put(
+        self,
+        key: str,
+        path: Optional[Path] = None,
+        media_type: str = "application/octet-stream",
+        metadata: Optional[dict[str, Any]] = None,
+    ) -> CachedResult:
+        """Cache a result, its file is moved to the disk tier.
+
+        Returns:
+            CachedResult: the cached result, `transient` when it could not be cached:
+                its file is then left where it is
+        """
+
+        async with self._lock:
+
+            size = (await asyncio.to_thread(path.stat)).st_size if path is not None else 0
+            result = CachedResult(key=key, media_type=media_type, size=size, metadata=metadata or {})
+
+            disk = await self._load_disk()
+
+            if self.disk_size > 0 and size <= self.disk_size:
+
+                file = await asyncio.to_thread(self._store, result, path)
+                if path is not None:
+                    result.path = self._content_path(key)
+
+                if (previous := disk.pop(key, None)) is not None:
+                    self._disk_used -= previous.size
+
+                disk[key] = result
+                self._disk_used += size
+                await self._evict_disk()
+
+                return await self._remember(result.model_copy(update={"file": file}))
+
+            if path is not None and self._fits_memory(size):
+                result.content = await asyncio.to_thread(self._take, path)
+                return await self._remember(result)
+
+            if path is not None:
+                result.path, result.transient = path, True
+                return result
+
+            return await self._remember(result)
+
+    def _fits_memory(self, size: int) -> bool:
+        return self.memory_size > 0 and size <= self.memory_size // MEMORY_ENTRY_FRACTION
+
+    async def _remember(self, result: CachedResult) -> CachedResult:
+        """keep the result in the memory tier when it's small enough, its content read from its open file:
+        the result to respond with is returned"""
+
+        if not self._fits_memory(result.size) or result.key in self._memory:
+            return result
+
+        if result.content is None and result.file is not None:
+            try:
+                content = await asyncio.to_thread(_read_and_close, result.file)
+            except OSError:
+                return result
+            result = result.model_copy(update={"content": content, "path": None, "file": None})
+
+        self._memory[result.key] = result
+        self._memory_used += result.size
+
+        while self._memory_used > self.memory_size:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.size
+
+        return result
+
+    async def _evict_disk(self) -> None:
+
+        evicted_keys = []
+
+        while self._disk_used > self.disk_size and self._disk:
+            key, evicted = self._disk.popitem(last=False)
+            self._disk_used -= evicted.size
+            evicted_keys.append(key)
+
+        if evicted_keys:
+            await asyncio.to_thread(self._remove, evicted_keys)
+
+    def _remove(self, keys: list[str]) -> None:
+
+        for key in keys:
+            # a response being sent keeps reading its open file
+            self._content_path(key).unlink(missing_ok=True)
+            self._index_path(key).unlink(missing_ok=True)
+
+            logger.debug(f"Result {key} evicted from the disk cache")
+
+
+def _read_and_close(file: BinaryIO) -> bytes:
+    with file:
+        return file.read()
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of the content of the file"""
+
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def not_modified(request: Request, key: str) -> Optional[Response]:
+    """a 304 response when the client holds the result already, the results being content-addressed"""
+
+    etags = request.headers.get("if-none-match", "")
+
+    if f'"{key}"' in [tag.strip().removeprefix("W/") for tag in etags.split(",")]:
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+
+    return None
+
+
+def cached_response(result: CachedResult, filename: str) -> Response:
+    """Respond with the content of the result, the key being its ETag"""
+
+    if result.file is not None:
+        response: Response = stream_opened_file(result.file, result.media_type, filename)
+    elif result.path is not None:
+        response = stream_file(
+            result.path, result.media_type, filename, remove=result.transient
+        )
+    else:
+        response = Response(
+            result.content or b"",
+            media_type=result.media_type,
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"},
+        )
+
+    response.headers["ETag"] = result.etag
+
+    return response
+
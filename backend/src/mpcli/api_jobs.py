@@ -0,0 +1,396 @@
+import asyncio
+import shutil
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from functools import partial
+from pathlib import Path
+from typing import Annotated, Any, Callable, Literal, Optional, Union
+
+from loguru import logger
+from pydantic import BaseModel, Field, TypeAdapter
+
+from src.mpcli.api_pool import ServerBusyError, WorkerPool
+from src.mpcli.api_streaming import output_filename, remove_output, render_to_file
+from src.mpcli.entities.source import AudioFileHandle, AudioSource
+from src.mpcli.repository.scheduler import (
+    MemoryModel,
+    SourceProbe,
+    load_cost_model,
+    probe_audio_source,
+    probe_source,
+    stretch_rate,
+)
+from src.mpcli.use_cases.convert import execute_format_conversion
+from src.mpcli.use_cases.normalization import execute_normalization
+from src.mpcli.use_cases.timestretch import execute_timestretch
+
+# seconds between two checks of the queue, when no job is submitted in the meantime
+POLL_INTERVAL = 1.0
+
+
+class ConvertJobParameters(BaseModel):
+    operation: Literal["convert"] = "convert"
+    target_format: Literal["wav", "mp3"]
+
+
+class NormalizeJobParameters(BaseModel):
+    operation: Literal["normalize"] = "normalize"
+    lufs: float = Field(default=-14.0, ge=-20.0, le=0.0)
+
+
+class TimeStretchJobParameters(BaseModel):
+    operation: Literal["timestretch"] = "timestretch"
+    target_tempo: Optional[float] = None
+    min_rate: float = 1.0
+    max_rate: float = 1.0
+
+
+# the parameters of the endpoint of the operation
+JobParameters = Annotated[
+    Union[ConvertJobParameters, NormalizeJobParameters, TimeStretchJobParameters],
+    Field(discriminator="operation"),
+]
+
+job_parameters_adapter: TypeAdapter[JobParameters] = TypeAdapter(JobParameters)
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class JobRecord(BaseModel):
+    id: str
+    status: JobStatus = JobStatus.queued
+    parameters: JobParameters
+    source: AudioSource = Field(..., description="the uploaded audio, kept until the job is deleted")
+    output: Optional[AudioFileHandle] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    estimated_duration: Optional[float] = Field(
+        default=None, description="estimated processing time in seconds, gives the progress"
+    )
+
+    @property
+    def progress(self) -> float:
+        """completed fraction of the job, estimated from its elapsed and expected processing times"""
+
+        match self.status:
+            case JobStatus.done | JobStatus.failed:
+                return 1.0
+            case JobStatus.queued:
+                return 0.0
+
+        if self.started_at is None or not self.estimated_duration:
+            return 0.0
+
+        elapsed = (datetime.now(timezone.utc) - self.started_at).total_seconds()
+
+        # the estimation may be exceeded, the job is not done until it's done
+        return round(min(elapsed / self.estimated_duration, 0.99), 2)
+
+
+class JobStore:
+    """SQLite store of the jobs: the queue survives the restarts of the server.
+
+    The store must be used by a single thread, the one of the event loop.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(str(path))
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                record TEXT NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+        )
+
+    def save(self, job: JobRecord) -> None:
+
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, created_at, record) VALUES (?, ?, ?, ?)",
+                (job.id, job.status.value, job.created_at.isoformat(), job.model_dump_json()),
+            )
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+
+        row = self._connection.execute(
+            "SELECT record FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+        return JobRecord.model_validate_json(row[0]) if row is not None else None
+
+    def delete(self, job_id: str) -> None:
+
+        with self._connection:
+            self._connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def next_queued(self) -> Optional[JobRecord]:
+        """the oldest queued job"""
+
+        row = self._connection.execute(
+            "SELECT record FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+            (JobStatus.queued.value,),
+        ).fetchone()
+
+        return JobRecord.model_validate_json(row[0]) if row is not None else None
+
+    def count_pending(self) -> int:
+        """the number of jobs queued or running"""
+
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+            (JobStatus.queued.value, JobStatus.running.value),
+        ).fetchone()
+
+        return count
+
+    def requeue_running(self) -> int:
+        """queue again the jobs which were running when the server stopped"""
+
+        rows = self._connection.execute(
+            "SELECT record FROM jobs WHERE status = ?", (JobStatus.running.value,)
+        ).fetchall()
+
+        for (record,) in rows:
+            job = JobRecord.model_validate_json(record)
+            self.save(job.model_copy(update={"status": JobStatus.queued, "started_at": None}))
+
+        return len(rows)
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def _task(job: JobRecord) -> tuple[Callable[..., Any], tuple, str]:
+    """the use case of the job, its arguments, and the suffix of the output filename"""
+
+    match job.parameters:
+        case ConvertJobParameters(target_format=target_format):
+            return execute_format_conversion, (job.source, target_format), ""
+        case NormalizeJobParameters(lufs=lufs):
+            return execute_normalization, (job.source, lufs), "_normalized"
+        case TimeStretchJobParameters(
+            target_tempo=target_tempo, min_rate=min_rate, max_rate=max_rate
+        ):
+            return (
+                execute_timestretch,
+                (job.source, target_tempo, min_rate, max_rate),
+                "_timestretched",
+            )
+
+
+def _rate(job: JobRecord) -> Optional[float]:
+    """the lowest rate the job time stretches its source by, None when it depends on its tempo"""
+
+    match job.parameters:
+        case TimeStretchJobParameters(
+            target_tempo=target_tempo, min_rate=min_rate, max_rate=max_rate
+        ):
+            return stretch_rate(target_tempo, min_rate, max_rate)
+
+    return 1.0
+
+
+class JobRunner:
+    """Runs the queued jobs on the workers of the pool left free by the synchronous requests,
+    the jobs and their files are stored in ``jobs_dir``."""
+
+    def __init__(self, store: JobStore, pool: WorkerPool, jobs_dir: Path):
+        self.store = store
+        self.pool = pool
+        self.inputs_dir = jobs_dir / "inputs"
+        self.outputs_dir = jobs_dir / "outputs"
+
+        self.inputs_dir.mkdir(parents=True, exist_ok=True)
+        self.outputs_dir.mkdir(parents=True, exist_ok=True)
+
+        self._cost_model = load_cost_model()
+        self._memory_model = MemoryModel()
+        self._wake_up: Optional[asyncio.Event] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def input_path(self, job_id: str, filename: str) -> Path:
+        return self.inputs_dir / f"{job_id}{Path(filename).suffix}"
+
+    def disk_usage(self) -> int:
+        """bytes of the files of the jobs, the uploads and the outputs"""
+
+        return sum(
+            path.stat().st_size
+            for directory in (self.inputs_dir, self.outputs_dir)
+            for path in directory.iterdir()
+            if path.is_file()
+        )
+
+    async def check_capacity(self) -> None:
+        """Check that a job may be queued: the number of pending jobs and the disk used by the files
+        of the jobs are bounded, the jobs done count until they're deleted.
+
+        Raises:
+            ServerBusyError: if the queue, or the disk of the jobs, is full
+        """
+
+        settings = self.pool.settings
+
+        if self.store.count_pending() >= settings.max_jobs:
+            raise ServerBusyError(settings.retry_after)
+
+        if settings.jobs_disk_size == 0:
+            return
+
+        if await asyncio.to_thread(self.disk_usage) >= settings.jobs_disk_size:
+            raise ServerBusyError(settings.retry_after)
+
+    def new_job(
+        self, job_id: str, parameters: JobParameters, source: AudioSource
+    ) -> JobRecord:
+        """Queue a job, its uploaded audio must be stored in `input_path` beforehand"""
+
+        job = JobRecord(id=job_id, parameters=parameters, source=source)
+        self.store.save(job)
+
+        if self._wake_up is not None:
+            self._wake_up.set()
+
+        return job
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def delete(self, job: JobRecord) -> None:
+
+        self.store.delete(job.id)
+
+        job.source.audio_path.unlink(missing_ok=True)
+        if job.output is not None:
+            job.output.path.unlink(missing_ok=True)
+
+    async def run(self) -> None:
+        """Start the queued jobs as soon as a worker is free, until cancelled"""
+
+        self._wake_up = asyncio.Event()
+
+        requeued = self.store.requeue_running()
+        if requeued:
+            logger.info(f"{requeued} interrupted job(s) queued again")
+
+        while True:
+
+            job = None
+            if self.pool.in_flight < self.pool.settings.workers:
+                job = self.store.next_queued()
+
+            if job is None:
+                self._wake_up.clear()
+                try:
+                    await asyncio.wait_for(self._wake_up.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job.status = JobStatus.running
+            job.started_at = datetime.now(timezone.utc)
+            job.estimated_duration = self._estimate(job)
+            self.store.save(job)
+
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            # let the job be submitted to the pool before checking the free workers again
+            await asyncio.sleep(0)
+
+    def _estimate(self, job: JobRecord) -> float:
+        try:
+            probe = probe_source(job.source.audio_path)
+        except OSError:
+            probe = SourceProbe(duration=0)
+        return self._cost_model.estimate(job.parameters.operation, probe)
+
+    async def _execute(self, job: JobRecord) -> None:
+
+        execute, args, suffix = _task(job)
+        start = time.perf_counter()
+
+        try:
+            probe = await asyncio.to_thread(probe_audio_source, job.source)
+            result = await self.pool.run(
+                render_to_file,
+                execute,
+                *args,
+                deadline=self.pool.settings.job_deadline,
+                memory=self._memory_model.estimate(job.parameters.operation, probe, _rate(job)),
+                # the output rendered after the deadline is removed
+                discard=partial(remove_output, source=job.source),
+            )
+        except ServerBusyError:
+            # the workers were taken by synchronous requests in the meantime
+            job.status, job.started_at = JobStatus.queued, None
+            self.store.save(job)
+            return
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            self._fail(job, str(e))
+            return
+
+        if result is None:
+            self._fail(job, "No result returned")
+            return
+
+        converted = result.converted_audio
+
+        if self.store.get(job.id) is None:
+            # deleted while running
+            if converted.audio_path != job.source.audio_path:
+                converted.audio_path.unlink(missing_ok=True)
+            return
+
+        output_path = self.outputs_dir / f"{job.id}.{converted.audio_format}"
+
+        if converted.audio_path == job.source.audio_path:
+            # the source itself, e.g. converted to its own format
+            shutil.copyfile(converted.audio_path, output_path)
+        else:
+            shutil.move(converted.audio_path, output_path)
+
+        job.output = AudioFileHandle(
+            path=output_path,
+            name=Path(output_filename(job.source, converted.audio_format, suffix)).stem,
+            audio_format=converted.audio_format,
+            sample_rate=converted.sample_rate,
+            size=output_path.stat().st_size,
+        )
+        job.status = JobStatus.done
+        job.completed_at = datetime.now(timezone.utc)
+        self.store.save(job)
+
+        logger.info(f"Job {job.id} done in {time.perf_counter() - start:.2f}s")
+
+    def _fail(self, job: JobRecord, error: str) -> None:
+
+        # unless deleted while running
+        if self.store.get(job.id) is None:
+            return
+
+        job.status, job.error = JobStatus.failed, error
+        job.completed_at = datetime.now(timezone.utc)
+        self.store.save(job)
@@ -0,0 +1,294 @@
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.mpcli.repository.profiling import profile_calls
+from src.mpcli.repository.timing import record_stages
+
+# the durations of the requests and of their stages, from a few milliseconds to several minutes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+class Metric:
+    """A metric in the Prometheus text format, with a value per combination of labels.
+
+    The values are either updated by the code (`Counter.inc`, `Gauge.set`),
+    or read at each scrape from ``function``, which returns the value of each combination of labels.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        function: Optional[Callable[[], dict[Labels, float]]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.function = function
+
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def _labels(self, labels: dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+
+        values = self.function() if self.function is not None else dict(self._values)
+
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def render(self) -> str:
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+
+        key = self._labels(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+
+        with self._lock:
+            self._values[self._labels(labels)] = value
+
+
+class Histogram(Metric):
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+        # the count of each bucket, then the sum of the observations
+        self._observations: dict[Labels, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+
+        key = self._labels(labels)
+
+        with self._lock:
+            counts, total = self._observations.get(key, ([0] * len(self.buckets), 0.0))
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+
+            self._observations[key] = (counts, total + value)
+
+    def samples(self) -> Iterable[str]:
+
+        with self._lock:
+            observations = {key: (list(c), t) for key, (c, t) in self._observations.items()}
+
+        for labels, (counts, total) in sorted(observations.items()):
+
+            cumulated = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulated += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulated}"
+
+            suffix = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {_format_value(total)}"
+            yield f"{self.name}_count{suffix} {cumulated}"
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """the metrics in the Prometheus text exposition format"""
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+# the content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+request_duration = registry.register(
+    Histogram(
+        "mpcli_request_duration_seconds",
+        "Duration of the requests, from the first byte received to the last byte sent",
+        ("method", "endpoint", "status"),
+    )
+)
+stage_duration = registry.register(
+    Histogram(
+        "mpcli_stage_duration_seconds",
+        "Duration of the stages of the processing of the requests, e.g. upload, decode, stretch, encode",
+        ("endpoint", "stage"),
+    )
+)
+received_bytes = registry.register(
+    Counter(
+        "mpcli_received_bytes_total",
+        "Bytes of the request bodies, e.g. the uploaded audio",
+        ("endpoint",),
+    )
+)
+sent_bytes = registry.register(
+    Counter(
+        "mpcli_sent_bytes_total",
+        "Bytes of the response bodies, e.g. the processed audio",
+        ("endpoint",),
+    )
+)
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """the value of a `Server-Timing` header reporting the durations in seconds, in milliseconds"""
+    return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in timings.items())
+
+
+def _endpoint(scope: Scope) -> str:
+    """the path of the route of the request, a bounded set of values unlike the requested paths"""
+
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Measures the duration and the bytes of the requests, and the duration of their stages:
+    the stages run while the request is processed are recorded, in worker processes included"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        received, sent, status = 0, 0, 500
+
+        async def receive_counted() -> Message:
+            nonlocal received
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal sent, status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+
+            await send(message)
+
+        with record_stages() as stages:
+            try:
+                await self.app(scope, receive_counted, send_counted)
+            finally:
+                endpoint = _endpoint(scope)
+
+                request_duration.observe(
+                    time.perf_counter() - start,
+                    method=scope["method"],
+                    endpoint=endpoint,
+                    status=str(status),
+                )
+                received_bytes.inc(received, endpoint=endpoint)
+                sent_bytes.inc(sent, endpoint=endpoint)
+
+                for name, duration in stages.items():
+                    stage_duration.observe(duration, endpoint=endpoint, stage=name)
+
+
+class ProfilingMiddleware:
+    """Profiles the calls made to the worker processes by a sampled fraction of the requests,
+    the profiles are named after the method and the path of the request, see `profile_calls`.
+
+    It's only added when the profiling is enabled, the other requests are passed through.
+    """
+
+    def __init__(self, app: ASGIApp, directory: Path, sample_rate: float):
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        with profile_calls(self.directory, f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
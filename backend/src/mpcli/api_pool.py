@@ -0,0 +1,414 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src.mpcli.repository.profiling import call_profiled, profiled_calls
+from src.mpcli.repository.timing import add_stages, call_recorded
+
+T = TypeVar("T")
+
+# the workers started by default, whatever the number of CPUs: each one imports the audio libraries
+# and holds the buffers of its request, and several uvicorn workers may start a pool each
+MAX_DEFAULT_WORKERS = 4
+
+
+def _default_memory_budget() -> int:
+    """half of the physical memory, the other half being left to the server and the system"""
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (AttributeError, ValueError, OSError):
+        return 4 * 1024 * 1024 * 1024
+
+
+class APISettings(BaseModel):
+    """Settings of the processing of the API requests, read from the environment"""
+
+    workers: int = Field(
+        default_factory=lambda: min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS),
+        ge=1,
+        description="number of worker processes running the use cases, "
+        f"by default the number of CPUs up to {MAX_DEFAULT_WORKERS}",
+    )
+    max_queued: int = Field(
+        default=16,
+        ge=0,
+        description="number of requests waiting for a worker, beyond which the requests are rejected",
+    )
+    deadline: float = Field(
+        default=300.0,
+        gt=0,
+        description="seconds after which a request which is not processed yet is abandoned",
+    )
+    job_deadline: float = Field(
+        default=3600.0,
+        gt=0,
+        description="seconds after which a job of the /jobs endpoints which is not processed yet fails",
+    )
+    jobs_dir: Path = Field(
+        default=Path.home() / ".cache" / "mpcli" / "jobs",
+        description="directory of the queue of the /jobs endpoints, and of their files",
+    )
+    max_jobs: int = Field(
+        default=64,
+        ge=1,
+        description="number of jobs of the /jobs endpoints queued or running, beyond which the jobs are rejected",
+    )
+    jobs_disk_size: int = Field(
+        default=10 * 1024 * 1024 * 1024,
+        ge=0,
+        description="bytes of the files of the jobs in jobs_dir, beyond which the jobs are rejected, "
+        "0 disables the limit",
+    )
+    max_upload_size: int = Field(
+        default=1024 * 1024 * 1024,
+        gt=0,
+        description="maximum size of the request bodies in bytes, the uploads are rejected beyond",
+    )
+    cache_dir: Path = Field(
+        default=Path.home() / ".cache" / "mpcli" / "results",
+        description="directory of the disk tier of the cache of the results",
+    )
+    cache_memory_size: int = Field(
+        default=64 * 1024 * 1024,
+        ge=0,
+        description="bytes of results cached in memory, 0 disables the memory tier",
+    )
+    cache_disk_size: int = Field(
+        default=1024 * 1024 * 1024,
+        ge=0,
+        description="bytes of results cached on disk, 0 disables the disk tier",
+    )
+    tempo_batch_size: int = Field(
+        default=32,
+        ge=1,
+        description="maximum number of requests whose tempo is estimated in a single pass of the model",
+    )
+    tempo_batch_delay: float = Field(
+        default=0.005,
+        ge=0,
+        description="seconds during which the requests are collected into a batch of the tempo model",
+    )
+    model_host: Optional[Path] = Field(
+        default=None,
+        description="socket of the model host estimating the tempi for all the API workers, "
+        "by default each API worker loads the model",
+    )
+    memory_budget: int = Field(
+        default_factory=_default_memory_budget,
+        ge=0,
+        description="bytes of memory the requests being processed may use at once, "
+        "by default half of the physical memory, 0 disables the budget",
+    )
+    retry_after: int = Field(
+        default=5,
+        ge=1,
+        description="seconds after which a rejected client is invited to retry",
+    )
+
+    @classmethod
+    def from_env(cls) -> "APISettings":
+
+        variables = {
+            "workers": "MPCLI_API_WORKERS",
+            "max_queued": "MPCLI_API_MAX_QUEUED",
+            "deadline": "MPCLI_API_DEADLINE",
+            "job_deadline": "MPCLI_API_JOB_DEADLINE",
+            "jobs_dir": "MPCLI_API_JOBS_DIR",
+            "max_jobs": "MPCLI_API_MAX_JOBS",
+            "jobs_disk_size": "MPCLI_API_JOBS_DISK_SIZE",
+            "max_upload_size": "MPCLI_API_MAX_UPLOAD_SIZE",
+            "cache_dir": "MPCLI_API_CACHE_DIR",
+            "cache_memory_size": "MPCLI_API_CACHE_MEMORY_SIZE",
+            "cache_disk_size": "MPCLI_API_CACHE_DISK_SIZE",
+            "tempo_batch_size": "MPCLI_API_TEMPO_BATCH_SIZE",
+            "tempo_batch_delay": "MPCLI_API_TEMPO_BATCH_DELAY",
+            "model_host": "MPCLI_API_MODEL_HOST",
+            "memory_budget": "MPCLI_API_MEMORY_BUDGET",
+            "retry_after": "MPCLI_API_RETRY_AFTER",
+        }
+
+        return cls(
+            **{
+                name: os.environ[variable]
+                for name, variable in variables.items()
+                if variable in os.environ
+            }
+        )
+
+
+class ServerBusyError(RuntimeError):
+    """Raised when all the workers are busy and the queue of waiting requests is full"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"The server is busy, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the processing of a request did not complete before its deadline"""
+
+    pass
+
+
+def _discard_result(discard: Callable[[T], None], future: Future) -> None:
+    """release the resources of the result of a call whose caller is gone, e.g. a temporary file"""
+
+    if future.cancelled() or future.exception() is not None:
+        return
+
+    result, _ = future.result()
+
+    try:
+        discard(result)
+    except Exception as e:
+        logger.warning(f"Cannot discard the result of an abandoned call: {e}")
+
+
+class MemoryBudgetExceededError(RuntimeError):
+    """Raised when a call needs more memory than the whole budget, it can never be admitted"""
+
+    pass
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class MemoryBudget:
+    """The memory reserved by the calls being processed, out of a global budget in bytes.
+
+    A call is admitted when its estimated peak memory fits in what is left of the budget,
+    otherwise it waits for the calls admitted before it to release enough memory,
+    in their order of arrival. The memory may be released by any thread,
+    e.g. by the executor when the call completes.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._waiters: deque[tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def reserved(self) -> int:
+        return self._reserved
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def reserve(self, size: int, timeout: float) -> None:
+        """Wait until ``size`` bytes can be reserved, they must be released with `release`
+
+        Raises:
+            MemoryBudgetExceededError: if ``size`` exceeds the whole budget
+            DeadlineExceededError: if the memory was not available within ``timeout`` seconds
+        """
+
+        if size > self.budget:
+            raise MemoryBudgetExceededError(
+                f"The request needs an estimated {size / 2**20:.0f} MiB of memory, "
+                f"more than the budget of {self.budget / 2**20:.0f} MiB"
+            )
+
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if not self._waiters and self._reserved + size <= self.budget:
+                self._reserved += size
+                return
+
+            waiter = (size, loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[2]), timeout)
+        except BaseException as e:
+
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+
+            # the memory was reserved meanwhile, or the next waiters may fit now
+            if granted:
+                self.release(size)
+            else:
+                self._wake_up()
+
+            if isinstance(e, asyncio.TimeoutError):
+                raise DeadlineExceededError(
+                    f"The memory needed by the request was not available within {timeout} seconds"
+                )
+            raise
+
+    def release(self, size: int) -> None:
+
+        with self._lock:
+            self._reserved -= size
+
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+
+        with self._lock:
+            while self._waiters and self._reserved + self._waiters[0][0] <= self.budget:
+                size, loop, future = self._waiters.popleft()
+                self._reserved += size
+                loop.call_soon_threadsafe(_grant, future)
+
+
+class WorkerPool:
+    """Runs the CPU-bound use cases in a pool of worker processes,
+    so that they neither block the event loop nor compete for the GIL with the request handling.
+
+    At most ``workers + max_queued`` calls are admitted at a time, the others are rejected
+    right away with a `ServerBusyError` instead of piling up. A call also waits for the memory
+    it's estimated to need to be available in the budget, holding its slot meanwhile,
+    so that large uploads arriving at once are processed in turn. A call which does not complete
+    before the deadline raises a `DeadlineExceededError`: it's cancelled if it did not start yet,
+    otherwise its result is dropped and its slot is released once the worker is done with it.
+    """
+
+    def __init__(
+        self,
+        settings: APISettings,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.settings = settings
+        self._initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # the slots are released by the executor threads, when the calls complete
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self.memory = MemoryBudget(settings.memory_budget) if settings.memory_budget else None
+
+    @property
+    def capacity(self) -> int:
+        return self.settings.workers + self.settings.max_queued
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+
+        if self._executor is None:
+            # "spawn" avoids forking a server which may have loaded tensorflow
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.settings.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self._initializer,
+            )
+
+        return self._executor
+
+    def _acquire(self) -> None:
+
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise ServerBusyError(self.settings.retry_after)
+            self._in_flight += 1
+
+    def _release(self, _: Future) -> None:
+
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args,
+        deadline: Optional[float] = None,
+        memory: int = 0,
+        discard: Optional[Callable[[T], None]] = None,
+    ) -> T:
+        """Run ``fn(*args)`` in a worker process, ``fn`` and the arguments must be picklable.
+
+        The call is submitted once the ``memory`` it's estimated to need (in bytes)
+        is available in the budget, the memory is released when the call completes.
+        When the caller stops waiting (deadline exceeded, request cancelled) while the call runs,
+        ``discard`` is called with its result once it completes, e.g. to remove the files it wrote.
+        The stages timed in the worker are added to the ones recorded by the caller,
+        and the call is profiled in the worker when the caller profiles its calls (`profile_calls`).
+
+        Raises:
+            ServerBusyError: if the pool is full, the call was not submitted
+            MemoryBudgetExceededError: if ``memory`` exceeds the whole budget
+            DeadlineExceededError: if the call did not complete within ``deadline`` seconds
+                (by default the deadline of the settings), the wait for the memory included
+        """
+
+        self._acquire()
+
+        profile = profiled_calls()
+        if profile is not None:
+            fn = partial(call_profiled, *profile, fn)
+
+        timeout = deadline if deadline is not None else self.settings.deadline
+        start = time.monotonic()
+        reserved = 0
+
+        try:
+            if memory and self.memory is not None:
+                await self.memory.reserve(memory, timeout)
+                reserved = memory
+
+            try:
+                future = self._get_executor().submit(call_recorded, fn, *args)
+            except BrokenProcessPool:
+                # a worker died (e.g. killed by the OOM killer), a new pool is started
+                logger.warning("The worker pool is broken, restarting it")
+                self.shutdown()
+                future = self._get_executor().submit(call_recorded, fn, *args)
+        except BaseException:
+            self._release(None)
+            if reserved:
+                self.memory.release(reserved)
+            raise
+
+        future.add_done_callback(self._release)
+        if reserved:
+            future.add_done_callback(lambda _: self.memory.release(reserved))
+
+        try:
+            result, stages = await asyncio.wait_for(
+                asyncio.wrap_future(future), max(timeout - (time.monotonic() - start), 0)
+            )
+        except BaseException as e:
+            future.cancel()
+
+            if discard is not None:
+                future.add_done_callback(partial(_discard_result, discard))
+
+            if isinstance(e, asyncio.TimeoutError):
+                raise DeadlineExceededError(
+                    f"The request was not processed within {timeout} seconds"
+                )
+            raise
+
+        add_stages(stages)
+
+        return result
+
+    def shutdown(self) -> None:
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
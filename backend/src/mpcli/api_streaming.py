@@ -0,0 +1,121 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Generator, Optional, TypeVar
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.timing import timed_stage
+
+# size of the blocks sent to the client
+BLOCK_SIZE = 256 * 1024
+
+MEDIA_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg"}
+
+R = TypeVar("R")
+
+
+def render_to_file(execute: Callable[..., Optional[R]], *args) -> Optional[R]:
+    """Worker task: run the use case, then move its converted audio to a temporary file
+    so that only the path of the output is sent back to the server process.
+
+    The caller is responsible for removing the file, e.g. with `stream_audio`,
+    or with `remove_output` when the result is abandoned.
+    """
+
+    result = execute(*args)
+
+    if result is None or result.converted_audio.audio_path is not None:
+        return result
+
+    converted = result.converted_audio
+
+    fd, name = tempfile.mkstemp(prefix="mpcli-output-", suffix=f".{converted.audio_format}")
+    with timed_stage("write"), os.fdopen(fd, "wb") as output:
+        output.write(converted.audio_bytes)
+
+    result.converted_audio = converted.model_copy(
+        update={"audio_bytes": None, "audio_path": Path(name)}
+    )
+
+    return result
+
+
+def remove_output(result: Optional[R], source: Optional[AudioSource] = None) -> None:
+    """remove the temporary file written by `render_to_file`, e.g. when the request is abandoned,
+    unless the output is the file of the ``source`` itself (e.g. converted to its own format)"""
+
+    if result is None or result.converted_audio.audio_path is None:
+        return
+
+    if source is not None and result.converted_audio.audio_path == source.audio_path:
+        return
+
+    result.converted_audio.audio_path.unlink(missing_ok=True)
+
+
+def output_filename(source: AudioSource, output_format: str, suffix: str = "") -> str:
+    """filename of the processed audio, after the name of the uploaded file"""
+    return f"{Path(source.name).stem}{suffix}.{output_format}"
+
+
+def _iter_blocks(audio: BinaryIO) -> Generator[bytes, None, None]:
+
+    try:
+        while block := audio.read(BLOCK_SIZE):
+            yield block
+    finally:
+        audio.close()
+
+
+def _stream(audio: BinaryIO, size: int, media_type: str, filename: str) -> StreamingResponse:
+
+    headers = {
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+        "Content-Length": str(size),
+    }
+
+    return StreamingResponse(_iter_blocks(audio), media_type=media_type, headers=headers)
+
+
+def stream_file(
+    path: Path, media_type: str, filename: str, remove: bool = False
+) -> StreamingResponse:
+    """Respond with the content of the file, sent block by block.
+
+    The file is opened right away: with ``remove`` it's unlinked at once,
+    its content remaining readable until the response is sent.
+    """
+
+    file = open(path, "rb")
+
+    if remove:
+        path.unlink(missing_ok=True)
+
+    return stream_opened_file(file, media_type, filename)
+
+
+def stream_opened_file(file: BinaryIO, media_type: str, filename: str) -> StreamingResponse:
+    """Respond with the content of the open file, which is closed once sent:
+    it's sent whole even when the file is unlinked in the meantime"""
+
+    return _stream(file, os.fstat(file.fileno()).st_size, media_type, filename)
+
+
+def stream_audio(
+    source: AudioSource, filename: str, remove: bool = False
+) -> StreamingResponse:
+    """Respond with the encoded audio of the source, sent block by block.
+
+    The file of a file-backed source is opened right away: with ``remove`` it's unlinked
+    at once, its content remaining readable until the response is sent.
+    """
+
+    media_type = MEDIA_TYPES.get(source.audio_format, "application/octet-stream")
+
+    if source.audio_path is not None:
+        return stream_file(source.audio_path, media_type, filename, remove=remove)
+
+    return _stream(source.open(), len(source.audio_bytes), media_type, filename)
@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from src.mpcli.repository.tempo import get_tempo_classifier, predict_tempi
+from src.mpcli.repository.timing import timed_stage
+
+
+class TempoBatcher:
+    """Estimates the tempo of the requests served concurrently with a single pass of the model.
+
+    The features of the requests are collected for up to ``max_delay`` seconds,
+    or until ``max_batch`` requests are waiting, then run through the model as one batch.
+    The model runs in a thread of its own, one batch at a time: the requests arriving
+    in the meantime make up the next batch, which starts as soon as the model is free.
+
+    The batcher must be used by a single thread, the one of the event loop.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._pending: list[tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Optional[asyncio.Task] = None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # the number of estimations divided by the number of batches gives the batching rate
+        self.batches = 0
+        self.estimations = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+
+        if self._executor is None:
+            # tensorflow is loaded along with the model, by the thread which runs it
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mpcli-tempo")
+
+        return self._executor
+
+    def warm_up(self) -> None:
+        """load the model in the background, before the first request is received"""
+        self._get_executor().submit(get_tempo_classifier)
+
+    async def estimate(self, features: np.ndarray) -> float:
+        """the tempo in BPM of the signal, from its features of shape (windows, 40, 256, 1)
+
+        The wait for the batch is included in the "tempo_inference" stage of the request.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((features, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+
+        with timed_stage("tempo_inference"):
+            return await future
+
+    def _flush(self) -> None:
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # the pending requests go with the next batch, when the model is free
+        if self._running is not None or not self._pending:
+            return
+
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+
+        self._running = asyncio.create_task(self._predict(batch))
+
+    async def _predict(self, batch: list[tuple[np.ndarray, asyncio.Future]]) -> None:
+
+        # the requests cancelled while waiting, e.g. the client disconnected
+        batch = [(features, future) for features, future in batch if not future.done()]
+
+        try:
+            if batch:
+                tempi = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), predict_tempi, [features for features, _ in batch]
+                )
+
+                self.batches += 1
+                self.estimations += len(batch)
+
+                logger.debug(f"Tempo of {len(batch)} request(s) estimated in a batch")
+
+                for (_, future), tempo in zip(batch, tempi):
+                    if not future.done():
+                        future.set_result(tempo)
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        finally:
+            self._running = None
+
+            # the requests which arrived during the prediction waited long enough
+            if self._pending:
+                self._flush()
+
+    def shutdown(self) -> None:
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,233 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import asynccontextmanager
+from pathlib import Path, PurePosixPath
+from typing import AsyncGenerator, Optional
+
+from fastapi import UploadFile
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.audio_file import SUPPORTED_EXTENSIONS
+from src.mpcli.repository.timing import timed_stage
+
+# size of the blocks copied from the upload to the spool file
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(HTTPException):
+    """Raised while reading a request body larger than the limit,
+    as an HTTP exception so that it's answered with a 413 by the exception handlers"""
+
+    def __init__(self, max_size: int):
+        super().__init__(
+            status_code=413,
+            detail=f"The request body exceeds the maximum size of {max_size} bytes",
+        )
+
+
+class MaxUploadSizeMiddleware:
+    """Rejects with a 413 the requests whose body is larger than ``max_size`` bytes.
+
+    The size is checked against the Content-Length header when provided, and counted
+    while the body streams in otherwise (e.g. chunked uploads): the body is never
+    read beyond the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        error = UploadTooLargeError(self.max_size)
+        too_large = PlainTextResponse(error.detail, status_code=error.status_code)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and int(content_length) > self.max_size:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def receive_limited() -> Message:
+            nonlocal received
+
+            message = await receive()
+
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise error
+
+            return message
+
+        async def send_tracked(message: Message) -> None:
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, receive_limited, send_tracked)
+        except UploadTooLargeError:
+            if response_started:
+                raise
+            await too_large(scope, receive, send)
+
+
+async def save_upload(file: UploadFile, path: Path) -> None:
+    """Copy the upload to ``path`` block by block, without holding it in memory:
+    the blocks are written by a thread, not to block the event loop on the disk"""
+
+    with timed_stage("upload"), open(path, "wb") as output:
+        while chunk := await file.read(CHUNK_SIZE):
+            await asyncio.to_thread(output.write, chunk)
+
+
+@asynccontextmanager
+async def spooled_source(
+    file: UploadFile, spool_dir: Optional[Path] = None, **fields
+) -> AsyncGenerator[AudioSource, None]:
+    """Copy the upload to a temporary file, block by block, and yield it as a file-backed `AudioSource`:
+    the upload is never held in memory, and only its path is sent to the worker processes.
+
+    The temporary file is removed on exit.
+
+    Args:
+        file (UploadFile): the uploaded audio file, its extension gives the audio format
+        spool_dir (Path, optional): directory of the temporary file, by default the temp directory
+        **fields: other fields of the `AudioSource`, e.g. the sample rate
+
+    Raises:
+        pydantic.ValidationError: if the format of the upload is not supported
+    """
+
+    fd, name = tempfile.mkstemp(
+        prefix="mpcli-upload-", suffix=Path(file.filename or "").suffix, dir=spool_dir
+    )
+    os.close(fd)
+    path = Path(name)
+
+    try:
+        await save_upload(file, path)
+
+        yield AudioSource(
+            name=file.filename,
+            audio_format=file.filename.split(".")[-1],
+            audio_path=path,
+            **fields,
+        )
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _extract_zip(archive: Path, output_dir: Path, max_size: int) -> list[Path]:
+    """Extract the audio files of the archive, block by block, the other members are skipped.
+
+    Raises:
+        UploadTooLargeError: if the audio files are larger than ``max_size`` bytes once extracted
+    """
+
+    with zipfile.ZipFile(archive) as z:
+
+        members = [
+            m
+            for m in z.infolist()
+            if not m.is_dir()
+            and PurePosixPath(m.filename).suffix.lower() in SUPPORTED_EXTENSIONS
+            and not any(
+                part.startswith((".", "__MACOSX")) for part in PurePosixPath(m.filename).parts
+            )
+        ]
+
+        # the sizes declared by the archive are enforced while extracting, below
+        if sum(m.file_size for m in members) > max_size:
+            raise UploadTooLargeError(max_size)
+
+        paths = []
+        extracted = 0
+
+        for i, member in enumerate(members):
+
+            # the name of the member is not trusted as a path
+            path = output_dir / f"{i}-{PurePosixPath(member.filename).name}"
+
+            with z.open(member) as source, open(path, "wb") as output:
+                while chunk := source.read(CHUNK_SIZE):
+                    extracted += len(chunk)
+                    if extracted > max_size:
+                        raise UploadTooLargeError(max_size)
+                    output.write(chunk)
+
+            paths.append(path)
+
+        return paths
+
+
+@asynccontextmanager
+async def spooled_sources(
+    files: list[UploadFile], max_size: int, **fields
+) -> AsyncGenerator[list[tuple[str, AudioSource | Exception]], None]:
+    """Spool a batch of uploads to a temporary directory and yield them as file-backed `AudioSource`,
+    the zip archives being replaced by the audio files they contain.
+
+    Each source is yielded with its name, the uploads whose format is not supported
+    with their validation error instead. The temporary directory is removed on exit.
+
+    Args:
+        files (list[UploadFile]): the uploaded audio files and zip archives
+        max_size (int): maximum size of the audio files extracted from the archives
+        **fields: other fields of the `AudioSource`, e.g. the sample rate
+
+    Raises:
+        UploadTooLargeError: if the audio files extracted from the archives are too large
+        zipfile.BadZipFile: if an archive is invalid
+    """
+
+    spool_dir = Path(tempfile.mkdtemp(prefix="mpcli-batch-"))
+
+    try:
+        sources: list[tuple[str, AudioSource | Exception]] = []
+
+        for i, file in enumerate(files):
+
+            path = spool_dir / f"{i}-{Path(file.filename or '').name}"
+            await save_upload(file, path)
+
+            if path.suffix.lower() == ".zip":
+                extracted_dir = spool_dir / f"{i}-extracted"
+                extracted_dir.mkdir()
+                # decompressed by a thread, not to block the event loop
+                paths = await asyncio.to_thread(_extract_zip, path, extracted_dir, max_size)
+                path.unlink()
+                # the index prefix is dropped from the name of the source
+                names = [p.name.split("-", 1)[1] for p in paths]
+            else:
+                paths, names = [path], [file.filename]
+
+            for path, name in zip(paths, names):
+                try:
+                    source = AudioSource(
+                        name=name,
+                        audio_format=name.split(".")[-1].lower(),
+                        audio_path=path,
+                        **fields,
+                    )
+                    sources.append((name, source))
+                except ValueError as e:
+                    sources.append((name, e))
+
+        yield sources
+
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
@@ -1,57 +1,292 @@
+import itertools
+import json
+import time
 from pathlib import Path
+from typing import Annotated, Any, Callable, Iterable, Optional
 
-import jinja2
 import typer
 from loguru import logger
 from pydantic import ValidationError
 from rich.console import Console
 from rich.table import Table
-import fleep
 
+from src.mpcli.cli_benchmark import (
+    DEFAULT_BENCHMARK_PATH,
+    OPERATIONS,
+    BenchmarkReport,
+    compare_reports,
+    default_cases,
+    load_report,
+    run_case,
+    save_report,
+)
 from src.mpcli.cli_entities import (
     CLIConfigError,
     CLIConvertConfig,
+    CLIJobResult,
     CLINormalizeConfig,
+    CLIOutputFormat,
+    CLIPipelineConfig,
     CLITempoEstimationConfig,
     CLITimeStretchConfig,
     LocalAudioSource,
 )
-from src.mpcli.repository.audio_file import iter_sources, save_audio_file
+from src.mpcli.cli_manifest import DEFAULT_MANIFEST_DIR, read_manifests, write_manifest
+from src.mpcli.daemon import (
+    DEFAULT_SOCKET_PATH,
+    DaemonUnavailableError,
+    run_jobs_on_daemon,
+    serve,
+)
+from src.mpcli.entities.shard import Shard
+from src.mpcli.model_host import DEFAULT_MODEL_HOST_SOCKET, serve_models
+from src.mpcli.repository import profiling
+from src.mpcli.repository.audio_file import iter_source_paths
+from src.mpcli.repository.audio_probe import (
+    DEFAULT_PROBE_CACHE_PATH,
+    ProbeCache,
+    probe_audio_files,
+)
+from src.mpcli.repository.scheduler import (
+    CostModel,
+    SourceProbe,
+    estimate_makespan,
+    load_cost_model,
+    longest_first,
+    probe_source,
+    save_cost_model,
+)
 from src.mpcli.repository.toml_config import read_configurations
-from src.mpcli.use_cases.convert import execute_format_conversion
-from src.mpcli.use_cases.normalization import execute_normalization
-from src.mpcli.use_cases.tempo import execute_tempo_estimation
-from src.mpcli.use_cases.timestretch import execute_timestretch
-from src.mpcli.entities.source import AudioSourceError
+from src.mpcli.repository.watch import SourceWatcher
 
 app = typer.Typer()
 
 CONFIG_FILE = "cli-config.toml"
 
+JobsOption = Annotated[
+    int,
+    typer.Option(
+        "--jobs",
+        "-j",
+        min=1,
+        help="Number of files processed in parallel, each one in its own process",
+    ),
+]
+
+PlanOption = Annotated[
+    bool,
+    typer.Option(
+        "--plan", help="Print the estimated duration of the batch before running it"
+    ),
+]
+
+
+def _parse_shard(value: str) -> Shard:
+    try:
+        return Shard.model_validate(value)
+    except ValidationError as e:
+        raise typer.BadParameter(e.errors()[0]["msg"])
+
+
+ShardOption = Annotated[
+    Optional[Shard],
+    typer.Option(
+        "--shard",
+        parser=_parse_shard,
+        metavar="i/N",
+        help="Process only the shard i of N of the sources (e.g. 1/4), "
+        "each machine of a batch running a different shard",
+    ),
+]
+
+ManifestDirOption = Annotated[
+    Path,
+    typer.Option(
+        "--manifests",
+        help="Directory of the manifests written by the sharded runs, combined by `merge`",
+    ),
+]
+
+OutputOption = Annotated[
+    CLIOutputFormat,
+    typer.Option(
+        "--output",
+        "-o",
+        help="`table` prints a table once all the files are processed, "
+        "`jsonl` prints a JSON line for each file as soon as it's processed",
+    ),
+]
+
+
+def _iter_items(configs: list[LocalAudioSource]) -> Iterable[tuple[Any, Path]]:
+    """yield the (config, path) pairs of all the source files of the configs"""
 
-def _timestretched_filename(config: CLITimeStretchConfig, tempo: float) -> str:
+    for c in configs:
+        for path in iter_source_paths(c.source, shard=c.shard):
+            yield c, path
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def _result_line(section: str, columns: list[str], result: CLIJobResult) -> str:
+    """JSON line reporting the processing of a file, the cells of its row keyed by column"""
+
+    return json.dumps(
+        {
+            "section": section,
+            "source": str(result.source),
+            "status": "error" if result.error is not None else "ok",
+            "result": dict(zip(columns, result.row)),
+            "error": result.error,
+            "elapsed": result.elapsed,
+            "timings": result.timings,
+        },
+        ensure_ascii=False,
+    )
 
-    environment = jinja2.Environment()
 
-    tempo_min = round(tempo * config.min_rate, 2)
-    tempo_max = round(tempo * config.max_rate, 2)
+def _config_shard(section: str, configs: list[LocalAudioSource]) -> Optional[Shard]:
+    """the shard set in the config file, when the shard isn't given on the command line:
+    None when no config sets one, or when the configs of the section set different shards"""
+
+    shards = [c.shard for c in configs]
+
+    if any(s != shards[0] for s in shards):
+        logger.warning(
+            f"The configs of '{section}' set different shards, no manifest is written"
+        )
+        return None
+
+    return shards[0] if shards else None
+
+
+def _fill_table(
+    table: Table,
+    section: str,
+    configs: list[LocalAudioSource],
+    jobs: int,
+    plan: bool = False,
+    shard: Optional[Shard] = None,
+    manifest_dir: Path = DEFAULT_MANIFEST_DIR,
+    output: CLIOutputFormat = CLIOutputFormat.table,
+) -> None:
+    """run the job of the section on all the sources and add the results to the table as they complete
+
+    When a single job is run at a time and the daemon is running, the sources are processed by the daemon
+    (unless the profiling is enabled), otherwise they are processed by this process or by a pool of worker processes.
 
-    if config.filename is not None:
-        filename_template = config.filename
-    elif tempo_min == tempo_max:
-        filename_template = "{{ source.stem }}_{{ tempo_min }}_BPM"
-    else:
-        filename_template = "{{ source.stem }}_{{ tempo_min }}-{{ tempo_max }}_BPM"
+    In parallel, or with ``plan``, the cost of each job is estimated from the duration and channels
+    of the source and the longest jobs are dispatched first. With ``plan``, the estimated makespan
+    is printed before the run starts. The cost model is then calibrated with the timings of the run:
+    a single job at a time without ``plan`` neither probes the sources nor touches the cost model.
 
-    template = environment.from_string(filename_template)
+    When the run processes a ``shard``, given on the command line or set in the config file,
+    its manifest is written to ``manifest_dir`` once completed.
 
-    return template.render(
-        **config.model_dump(), tempo_min=tempo_min, tempo_max=tempo_max
-    )
+    With the ``jsonl`` output, a JSON line is printed for each file as soon as it's processed,
+    the table is filled all the same.
+    """
+
+    items = list(_iter_items(configs))
+
+    cost_model: Optional[CostModel] = None
+    probes: dict[Path, SourceProbe] = {}
+    costs: list[float] = []
+
+    # the sources are only probed when their costs are used
+    if jobs > 1 or plan:
+        cost_model = load_cost_model()
+        probes = {path.resolve(): probe_source(path) for _, path in items}
+        costs = [cost_model.estimate(section, probes[path.resolve()]) for _, path in items]
+
+    if jobs > 1:
+        items, costs = longest_first(items, costs)
+
+    # stdout is kept for the JSON lines
+    console = Console(stderr=output == CLIOutputFormat.jsonl)
+    columns = [str(column.header) for column in table.columns]
+
+    if plan:
+        console.print(
+            f"Plan: {len(items)} file(s), {_format_duration(sum(costs))} of processing, "
+            f"estimated makespan {_format_duration(estimate_makespan(costs, jobs))} "
+            f"with {jobs} job(s)"
+        )
+
+    observations = []
+    results: list[CLIJobResult] = []
+
+    def add_result(result: CLIJobResult) -> None:
+        results.append(result)
+        if output == CLIOutputFormat.jsonl:
+            print(_result_line(section, columns, result), flush=True)
+        if result.error is not None:
+            logger.error(f"Error processing '{result.source}': {result.error}")
+        else:
+            table.add_row(*result.row)
+
+            probe = probes.get(result.source.resolve())
+            if probe is not None and result.elapsed is not None:
+                observations.append((probe, result.elapsed))
+
+    # the daemon profiles under its own settings, read from its environment:
+    # the files are processed in-process when this command is asked to profile them
+    if jobs == 1 and profiling.settings.enabled:
+        logger.debug("Profiling enabled, the daemon is not used")
+
+    elif jobs == 1:
+        processed = 0
+        try:
+            for result in run_jobs_on_daemon(section, items):
+                add_result(result)
+                processed += 1
+        except DaemonUnavailableError as e:
+            logger.debug(f"Processing in-process: {e}")
+
+        # the remaining items, if the daemon is not running or stopped
+        items = items[processed:]
+
+    if items:
+
+        # imported here, the use cases and their dependencies are not needed when the daemon runs the jobs
+        from src.mpcli.cli_jobs import (
+            SECTION_JOBS,
+            TEMPO_SECTIONS,
+            run_jobs,
+            warm_up_tempo_model,
+        )
+
+        _, job = SECTION_JOBS[section]
+        initializer = warm_up_tempo_model if section in TEMPO_SECTIONS else None
+
+        for result in run_jobs(job, items, jobs=jobs, initializer=initializer):
+            add_result(result)
+
+    if cost_model is not None:
+        cost_model.calibrate(section, observations)
+        save_cost_model(cost_model)
+
+    shard = shard or _config_shard(section, configs)
+
+    if shard is not None:
+        path = write_manifest(manifest_dir, section, shard, columns, results)
+        logger.info(f"Shard {shard} completed, manifest written to '{path}'")
 
 
 @app.command()
-def detect_tempo():
+def detect_tempo(
+    jobs: JobsOption = 1,
+    plan: PlanOption = False,
+    shard: ShardOption = None,
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+    output: OutputOption = CLIOutputFormat.table,
+):
     """estimate the tempo of an audio file"""
 
     table = Table(title="Tempo Detection Results")
@@ -59,31 +294,27 @@ def detect_tempo():
     table.add_column("Source", justify="right", style="cyan", no_wrap=True)
     table.add_column("Tempo", style="magenta")
 
-    configs = read_configurations(CONFIG_FILE, "detect_tempo", CLITempoEstimationConfig)
-
-    for config in configs:
+    configs = read_configurations(
+        CONFIG_FILE, "detect_tempo", CLITempoEstimationConfig, shard=shard
+    )
 
-        for audio in iter_sources(config.source):
-            try:
-                result = execute_tempo_estimation(audio)
-                if result is not None:
-                    table.add_row(
-                        result.audio_source.name,
-                        f"{result.tempo} BPM",
-                    )
-            except ValidationError as e:
-                logger.error(
-                    f"Ignore {audio.name if audio.name else 'Unknown'} check `config.toml` file and ensure it is correctly formatted."
-                )
-            except Exception as e:
-                logger.error(f"Error during tempo estimation: {e}")
+    _fill_table(
+        table, "detect_tempo", configs, jobs, plan, shard, manifest_dir, output
+    )
 
-    console = Console()
-    console.print(table)
+    if output == CLIOutputFormat.table:
+        console = Console()
+        console.print(table)
 
 
 @app.command()
-def timestretch():
+def timestretch(
+    jobs: JobsOption = 1,
+    plan: PlanOption = False,
+    shard: ShardOption = None,
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+    output: OutputOption = CLIOutputFormat.table,
+):
 
     try:
 
@@ -94,49 +325,30 @@ def timestretch():
         table.add_column("BPM", justify="right", style="green")
 
         # if config provided as an array, take the first element
-        configs = read_configurations(CONFIG_FILE, "timestretch", CLITimeStretchConfig)
-
-        for c in configs:
-
-            for source in iter_sources(c.source):
-
-                try:
-
-                    result = execute_timestretch(
-                        source=source,
-                        target_tempo=c.target_tempo,
-                        min_rate=c.min_rate,
-                        max_rate=c.max_rate,
-                    )
-
-                    if result is not None:
-                        # dump to a file according to the provided filename template, for debugging purposes
-                        filename = _timestretched_filename(c, result.original_tempo)
-                        sound_file = save_audio_file(
-                            output_dir=Path(c.output),
-                            filename=filename,
-                            data=result.converted_audio.to_array(),
-                            sample_rate=result.converted_audio.sample_rate,
-                            format=result.converted_audio.audio_format,
-                        )
-                        table.add_row(
-                            str(c.source),
-                            sound_file.name,
-                            str(result.target_tempo),
-                        )
-
-                except (ValueError, AudioSourceError) as e:
-                    logger.error(e)
+        configs = read_configurations(
+            CONFIG_FILE, "timestretch", CLITimeStretchConfig, shard=shard
+        )
 
-        console = Console()
-        console.print(table)
+        _fill_table(
+            table, "timestretch", configs, jobs, plan, shard, manifest_dir, output
+        )
+
+        if output == CLIOutputFormat.table:
+            console = Console()
+            console.print(table)
 
     except CLIConfigError as e:
         logger.error(f"Configuration error: {e}")
 
 
 @app.command()
-def convert():
+def convert(
+    jobs: JobsOption = 1,
+    plan: PlanOption = False,
+    shard: ShardOption = None,
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+    output: OutputOption = CLIOutputFormat.table,
+):
 
     table = Table(title="Format Conversion Results")
 
@@ -145,85 +357,410 @@ def convert():
     table.add_column("Target name", style="magenta", no_wrap=True)
     table.add_column("Target format", style="magenta")
 
-    configs = read_configurations(CONFIG_FILE, "convert", CLIConvertConfig)
+    configs = read_configurations(
+        CONFIG_FILE, "convert", CLIConvertConfig, shard=shard
+    )
 
-    for c in configs:
+    _fill_table(
+        table, "convert", configs, jobs, plan, shard, manifest_dir, output
+    )
 
-        for source in iter_sources(c.source):
+    if output == CLIOutputFormat.table:
+        console = Console()
+        console.print(table)
 
-            result = execute_format_conversion(source, target_format=c.target_format)
 
-            if result is not None:
+@app.command()
+def normalize(
+    jobs: JobsOption = 1,
+    plan: PlanOption = False,
+    shard: ShardOption = None,
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+    output: OutputOption = CLIOutputFormat.table,
+):
+
+    configs = read_configurations(
+        CONFIG_FILE, "normalize", CLINormalizeConfig, shard=shard
+    )
 
-                # get numpy array from the converted audio source
-                converted_array = result.converted_audio.to_array()
+    table = Table(title="Normalization Results")
 
-                # dump to a file according to the provided filename template, for debugging purposes
-                save_audio_file(
-                    output_dir=c.output,
-                    filename=result.converted_audio.name,
-                    data=converted_array,
-                    sample_rate=result.converted_audio.sample_rate,
-                    format=result.converted_audio.audio_format,
-                )
-                table.add_row(
-                    result.audio_source.name,
-                    result.audio_source.audio_format,
-                    result.converted_audio.name,
-                    result.converted_audio.audio_format,
-                )
+    table.add_column("Source name", justify="right", style="cyan", no_wrap=True)
+    table.add_column("LUFS", style="magenta")
+    table.add_column("Target name", style="green", no_wrap=True)
+
+    _fill_table(
+        table, "normalize", configs, jobs, plan, shard, manifest_dir, output
+    )
+
+    if output == CLIOutputFormat.table:
+        console = Console()
+        console.print(table)
+
+
+@app.command()
+def pipeline(
+    jobs: JobsOption = 1,
+    plan: PlanOption = False,
+    shard: ShardOption = None,
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+    output: OutputOption = CLIOutputFormat.table,
+):
+    """run the stages of the `pipeline` section(s) in order, e.g. timestretch → normalize → convert,
+    each file is decoded once and encoded once"""
+
+    configs = read_configurations(
+        CONFIG_FILE, "pipeline", CLIPipelineConfig, shard=shard
+    )
+
+    table = Table(title="Pipeline Results")
+
+    table.add_column("Source name", justify="right", style="cyan", no_wrap=True)
+    table.add_column("Target name", style="magenta", no_wrap=True)
+    table.add_column("Tempo", style="green")
+    table.add_column("Timings", style="yellow")
+
+    _fill_table(
+        table, "pipeline", configs, jobs, plan, shard, manifest_dir, output
+    )
+
+    if output == CLIOutputFormat.table:
+        console = Console()
+        console.print(table)
+
+
+@app.command()
+def merge(
+    section: Annotated[
+        str, typer.Argument(help="Section of the sharded runs, e.g. timestretch")
+    ],
+    manifest_dir: ManifestDirOption = DEFAULT_MANIFEST_DIR,
+):
+    """combine the manifests of the shards of a batch into a single table,
+    the shards which are not completed yet are reported"""
+
+    try:
+        manifests, missing = read_manifests(manifest_dir, section)
+    except CLIConfigError as e:
+        logger.error(e)
+        raise typer.Exit(code=1)
+
+    table = Table(title=f"Merged Results of `{section}` ({len(manifests)} shard(s))")
+
+    for column in manifests[0].columns:
+        table.add_column(column)
+
+    errors = 0
+    for manifest in manifests:
+        for result in manifest.results:
+            if result.error is not None:
+                errors += 1
+                logger.error(f"[shard {manifest.shard}] Error processing '{result.source}': {result.error}")
+            else:
+                table.add_row(*result.row)
 
     console = Console()
     console.print(table)
 
+    if errors:
+        logger.warning(f"{errors} file(s) could not be processed")
 
-@app.command()
-def normalize():
+    if missing:
+        logger.error(f"Shard(s) not completed: {', '.join(str(s) for s in missing)}")
+        raise typer.Exit(code=1)
 
-    configs = read_configurations(CONFIG_FILE, "normalize", CLINormalizeConfig)
 
-    table = Table(title="Normalization Results")
+@app.command()
+def watch(
+    interval: Annotated[
+        float, typer.Option(min=0.1, help="Seconds between two scans of the sources")
+    ] = 1.0,
+    settle: Annotated[
+        float,
+        typer.Option(
+            min=0.0,
+            help="Seconds a file must stay unchanged before being processed, to skip partially written files",
+        ),
+    ] = 2.0,
+    process_existing: Annotated[
+        bool, typer.Option(help="Also process the files present when the watch starts")
+    ] = False,
+):
+    """watch the sources of all the sections of the config,
+    and process the new or changed files as soon as they are completely written"""
+
+    from src.mpcli.cli_jobs import (
+        SECTION_JOBS,
+        TEMPO_SECTIONS,
+        run_jobs,
+        warm_up_tempo_model,
+    )
 
-    table.add_column("Source name", justify="right", style="cyan", no_wrap=True)
-    table.add_column("LUFS", style="magenta")
-    table.add_column("Target name", style="green", no_wrap=True)
+    watchers = []
 
-    for c in configs:
-        for source in iter_sources(c.source):
-            result = execute_normalization(source, lufs=c.lufs)
-            if result is not None:
-
-                save_audio_file(
-                    output_dir=c.output,
-                    filename=result.converted_audio.name,
-                    data=result.converted_audio.to_array(),
-                    sample_rate=result.converted_audio.sample_rate,
-                    format=result.converted_audio.audio_format,
-                )
-                table.add_row(
-                    result.audio_source.name,
-                    str(result.lufs),
-                    result.converted_audio.name,
+    for section, (config_type, job) in SECTION_JOBS.items():
+        for c in read_configurations(CONFIG_FILE, section, config_type, optional=True):
+            try:
+                watcher = SourceWatcher(
+                    c.source,
+                    settle=settle,
+                    exclude=getattr(c, "output", None),
+                    process_existing=process_existing,
                 )
+            except ValueError as e:
+                # e.g. the output directory is the watched one
+                logger.error(f"Cannot watch the `{section}` section: {e}")
+                raise typer.Exit(code=1)
+            watchers.append((section, c, job, watcher))
+            logger.info(f"Watching '{c.source}' for the `{section}` section")
+
+    if not watchers:
+        logger.error(f"No section to watch in '{CONFIG_FILE}'")
+        raise typer.Exit(code=1)
+
+    # the models are loaded once, and kept between files
+    if any(section in TEMPO_SECTIONS for section, *_ in watchers):
+        warm_up_tempo_model()
+
+    try:
+        while True:
+            for section, c, job, watcher in watchers:
+
+                items = [(c, path) for path in watcher.poll()]
+
+                for result in run_jobs(job, items):
+                    if result.error is not None:
+                        logger.error(f"[{section}] Error processing '{result.source}': {result.error}")
+                    else:
+                        logger.info(f"[{section}] {' | '.join(result.row)}")
+
+            time.sleep(interval)
+
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+
+
+@app.command()
+def daemon(
+    socket_path: Annotated[
+        Path, typer.Option("--socket", help="Path of the Unix socket to listen on")
+    ] = DEFAULT_SOCKET_PATH,
+):
+    """keep the models loaded in a resident process, which runs the jobs of the other commands:
+    while it's running, the commands are sent to it instead of being processed in-process"""
+
+    serve(socket_path)
+
+
+@app.command()
+def model_host(
+    socket_path: Annotated[
+        Path, typer.Option("--socket", help="Path of the Unix socket to listen on")
+    ] = DEFAULT_MODEL_HOST_SOCKET,
+    batch_size: Annotated[
+        int, typer.Option(min=1, help="Maximum number of requests estimated in a single pass of the model")
+    ] = 32,
+    batch_delay: Annotated[
+        float, typer.Option(min=0, help="Seconds during which the requests are collected into a batch")
+    ] = 0.005,
+):
+    """keep the tempo model loaded in a resident process, serving the workers of the API:
+    start the API with `MPCLI_API_MODEL_HOST` set to the socket, the model is then loaded once
+    whatever the number of API workers"""
+
+    serve_models(socket_path, max_batch=batch_size, max_delay=batch_delay)
+
+
+@app.command()
+def info(
+    paths: Annotated[
+        Optional[list[Path]],
+        typer.Argument(
+            help="Audio files or directories to scan, by default the sources of the `info` section(s)"
+        ),
+    ] = None,
+    loudness: Annotated[
+        bool,
+        typer.Option(
+            help="Measure the loudness of the files which don't have it in cache, this decodes the files"
+        ),
+    ] = False,
+    threads: Annotated[
+        int, typer.Option(min=1, help="Number of files probed in parallel")
+    ] = 16,
+    cache_path: Annotated[
+        Path, typer.Option("--cache", help="Cache of the probes, re-used until the files change")
+    ] = DEFAULT_PROBE_CACHE_PATH,
+    output: OutputOption = CLIOutputFormat.table,
+):
+    """print the format, sample rate, channels, duration, bit depth and loudness (when known)
+    of audio files, read from their headers"""
+
+    if paths:
+        sources = [iter_source_paths(path) for path in paths]
+    else:
+        configs = read_configurations(CONFIG_FILE, "info", LocalAudioSource)
+        sources = [iter_source_paths(c.source, shard=c.shard) for c in configs]
+
+    table = Table(title="Audio Files")
+
+    table.add_column("File", style="cyan", overflow="fold")
+    table.add_column("Format", style="magenta", no_wrap=True)
+    table.add_column("Sample rate", justify="right", no_wrap=True)
+    table.add_column("Channels", justify="right", no_wrap=True)
+    table.add_column("Duration", justify="right", no_wrap=True)
+    table.add_column("Bit depth", justify="right", no_wrap=True)
+    table.add_column("Loudness", justify="right", style="green", no_wrap=True)
+
+    with ProbeCache(cache_path) as cache:
+
+        for path, probe in probe_audio_files(
+            itertools.chain.from_iterable(sources), cache, threads, loudness
+        ):
+
+            if isinstance(probe, Exception):
+                logger.error(f"Cannot probe '{path}': {probe}")
+                if output == CLIOutputFormat.jsonl:
+                    print(json.dumps({"path": str(path), "error": str(probe)}), flush=True)
+                continue
+
+            if output == CLIOutputFormat.jsonl:
+                print(probe.model_dump_json(), flush=True)
+                continue
+
+            table.add_row(
+                str(path),
+                f"{probe.format} ({probe.subtype})",
+                f"{probe.sample_rate} Hz",
+                str(probe.channels),
+                _format_duration(probe.duration),
+                str(probe.bit_depth or ""),
+                f"{probe.loudness} LUFS" if probe.loudness is not None else "",
+            )
+
+    if output == CLIOutputFormat.table:
+        console = Console()
+        console.print(table)
+
+
+@app.command()
+def benchmark(
+    operations: Annotated[
+        Optional[list[str]],
+        typer.Option(
+            "--operation",
+            help=f"Operation to benchmark, among {', '.join(OPERATIONS)}, by default all of them",
+        ),
+    ] = None,
+    max_duration: Annotated[
+        Optional[float],
+        typer.Option(min=0, help="Skip the signals longer than this number of seconds"),
+    ] = None,
+    repeats: Annotated[int, typer.Option(min=1, help="Number of timed runs of each case")] = 3,
+    output_path: Annotated[
+        Path, typer.Option("--output", help="JSON file the results are written to")
+    ] = DEFAULT_BENCHMARK_PATH,
+    baseline_path: Annotated[
+        Optional[Path],
+        typer.Option("--baseline", help="Results of a previous run, the regressions are reported"),
+    ] = None,
+    tolerance: Annotated[
+        float,
+        typer.Option(min=0, help="Relative change of throughput or peak memory tolerated"),
+    ] = 0.15,
+):
+    """measure the throughput and the peak memory of the use cases on synthetic signals
+    of several durations, channels and sample rates"""
+
+    unknown = set(operations or []) - set(OPERATIONS)
+    if unknown:
+        raise typer.BadParameter(f"Unknown operation(s): {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if baseline_path is not None:
+        if not baseline_path.exists():
+            logger.error(f"No baseline at '{baseline_path}'")
+            raise typer.Exit(code=1)
+        baseline = load_report(baseline_path)
+
+    table = Table(title="Benchmark")
+
+    table.add_column("Case", style="cyan", no_wrap=True)
+    table.add_column("Wall time", justify="right")
+    table.add_column("Throughput", justify="right", style="green")
+    table.add_column("Peak memory", justify="right", style="magenta")
+
+    report = BenchmarkReport()
+
+    for case in default_cases(operations, max_duration):
+
+        logger.info(f"Running {case.key}")
+        result = run_case(case, repeats)
+        report.results.append(result)
+
+        table.add_row(
+            case.key,
+            _format_duration(result.wall_time),
+            f"{result.throughput:.1f}x",
+            f"{result.peak_memory / 2**20:.1f} MiB",
+        )
+
+    save_report(output_path, report)
 
     console = Console()
     console.print(table)
+    logger.info(f"Results written to '{output_path}'")
 
+    if baseline is None:
+        return
 
-@app.command()
-def info():
+    regressions = compare_reports(baseline, report, tolerance)
 
-    configs = read_configurations(CONFIG_FILE, "info", LocalAudioSource)
+    if not regressions:
+        logger.info(f"No regression against '{baseline_path}'")
+        return
+
+    regression_table = Table(title="Regressions")
+
+    regression_table.add_column("Case", style="cyan", no_wrap=True)
+    regression_table.add_column("Metric")
+    regression_table.add_column("Baseline", justify="right")
+    regression_table.add_column("Current", justify="right")
+    regression_table.add_column("Change", justify="right", style="red")
+
+    for regression in regressions:
+        regression_table.add_row(
+            regression.key,
+            regression.metric,
+            f"{regression.baseline:g}",
+            f"{regression.current:g}",
+            f"{regression.change:+.0%}",
+        )
+
+    console.print(regression_table)
+    raise typer.Exit(code=1)
+
+
+def _script(command: Callable) -> Callable[[], None]:
+    """entry point of a poetry script, parses the command line options of the command"""
+
+    def run() -> None:
+        typer.run(command)
+
+    return run
 
-    for c in configs:
 
-        with open(c.source, "rb") as file:
-            info = fleep.get(file.read(128))
-            print(f"File: {c.source}")
-            print(f"Type: {info.type}")
-            print(f"Extension: {info.extension}")
-            print(f"Mime: {info.mime}")
-            print("-" * 20)
+detect_tempo_script = _script(detect_tempo)
+timestretch_script = _script(timestretch)
+convert_script = _script(convert)
+normalize_script = _script(normalize)
+pipeline_script = _script(pipeline)
+merge_script = _script(merge)
+watch_script = _script(watch)
+daemon_script = _script(daemon)
+model_host_script = _script(model_host)
+info_script = _script(info)
+benchmark_script = _script(benchmark)
 
 
 if __name__ == "__main__":
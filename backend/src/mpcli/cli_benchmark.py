@@ -0,0 +1,260 @@
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Literal
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src.mpcli.entities.pipeline import ConvertStage, NormalizeStage, TimeStretchStage
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.timing import record_stages
+
+# the use cases import python_stretch before the tempo model loads tensorflow,
+# the other way round the stretcher crashes
+from src.mpcli.use_cases.convert import execute_format_conversion
+from src.mpcli.use_cases.normalization import execute_normalization
+from src.mpcli.use_cases.pipeline import execute_pipeline
+from src.mpcli.use_cases.tempo import execute_tempo_estimation
+from src.mpcli.use_cases.timestretch import execute_timestretch
+
+DEFAULT_BENCHMARK_PATH = Path("benchmark.json")
+
+# the tempo of the synthetic signals, the time stretches are run from it
+SIGNAL_TEMPO = 120.0
+
+BenchmarkOperation = Literal["detect_tempo", "timestretch", "convert", "normalize", "pipeline"]
+
+# the use cases benchmarked, with the parameters of a typical request: the tempo of the source
+# is given to the time stretches, so that they measure the stretching and not the tempo model
+OPERATIONS: dict[str, Callable[[AudioSource], Any]] = {
+    "detect_tempo": execute_tempo_estimation,
+    "timestretch": lambda source: execute_timestretch(
+        source, min_rate=1.25, max_rate=1.25, original_tempo=SIGNAL_TEMPO
+    ),
+    "convert": lambda source: execute_format_conversion(source, "mp3"),
+    "normalize": lambda source: execute_normalization(source, lufs=-14.0),
+    "pipeline": lambda source: execute_pipeline(
+        source,
+        [
+            TimeStretchStage(target_tempo=SIGNAL_TEMPO * 1.25),
+            NormalizeStage(lufs=-14.0),
+            ConvertStage(target_format="mp3"),
+        ],
+        original_tempo=SIGNAL_TEMPO,
+    ),
+}
+
+# the random parameters of the use cases, e.g. the bitrate picked by the MP3 encoder,
+# are drawn from this seed before each run, for the runs to be comparable
+RUN_SEED = 0
+
+# the signals of each operation (duration in seconds, channels, sample rate):
+# the cost of the use cases depends on the three of them
+DEFAULT_SIGNALS = [
+    (10.0, 1, 22050),
+    (10.0, 2, 44100),
+    (60.0, 2, 44100),
+    (60.0, 2, 48000),
+    (300.0, 2, 44100),
+]
+
+
+class BenchmarkCase(BaseModel):
+    operation: BenchmarkOperation
+    duration: float = Field(..., gt=0, description="duration of the synthetic signal in seconds")
+    channels: int = Field(default=2, ge=1)
+    sample_rate: int = Field(default=44100, gt=0)
+
+    @property
+    def key(self) -> str:
+        """identifies the case in the reports, to compare the runs of the same case"""
+        return f"{self.operation}-{self.duration:g}s-{self.channels}ch-{self.sample_rate}Hz"
+
+
+class BenchmarkResult(BaseModel):
+    case: BenchmarkCase
+    repeats: int
+    wall_time: float = Field(..., description="median duration of the runs in seconds")
+    min_wall_time: float = Field(..., description="duration of the fastest run in seconds")
+    throughput: float = Field(..., description="seconds of audio processed per second, on the median run")
+    peak_memory: int = Field(..., description="bytes allocated at the peak of a run, measured by tracemalloc")
+    stages: dict[str, float] = Field(
+        default_factory=dict, description="duration of the stages of the last run, e.g. decode, encode"
+    )
+
+
+class BenchmarkReport(BaseModel):
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    python: str = Field(default_factory=platform.python_version)
+    machine: str = Field(default_factory=platform.machine)
+    cpus: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    results: list[BenchmarkResult] = Field(default_factory=list)
+
+
+class BenchmarkRegression(BaseModel):
+    key: str
+    metric: Literal["throughput", "peak_memory"]
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """relative change of the metric, e.g. -0.2 for a throughput 20% lower"""
+        return self.current / self.baseline - 1 if self.baseline else 0.0
+
+
+def default_cases(
+    operations: list[str] | None = None, max_duration: float | None = None
+) -> list[BenchmarkCase]:
+    """the cases of the benchmark: each operation on each of the default signals,
+    the signals longer than ``max_duration`` seconds excluded"""
+
+    return [
+        BenchmarkCase(operation=operation, duration=duration, channels=channels, sample_rate=sample_rate)
+        for operation in operations or list(OPERATIONS)
+        for duration, channels, sample_rate in DEFAULT_SIGNALS
+        if max_duration is None or duration <= max_duration
+    ]
+
+
+def synthetic_signal(duration: float, channels: int, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """A reproducible float32 signal of shape (frames, channels): a chord along with
+    a click on each beat at `SIGNAL_TEMPO`, for the tempo of the signal to be well defined"""
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(round(duration * sample_rate)) / sample_rate
+
+    chord = sum(np.sin(2 * np.pi * f * t) for f in (220.0, 277.18, 329.63)) / 3
+    beat = 60.0 / SIGNAL_TEMPO
+    envelope = np.exp(-np.mod(t, beat) / 0.01)
+
+    signal = np.empty((len(t), channels), dtype=np.float32)
+    for channel in range(channels):
+        clicks = envelope * rng.uniform(-1.0, 1.0, len(t))
+        signal[:, channel] = 0.1 * chord + 0.1 * clicks
+
+    return signal
+
+
+def synthetic_source(case: BenchmarkCase) -> AudioSource:
+    """the synthetic signal of the case, encoded in WAV in memory as an upload would be"""
+
+    return AudioSource.from_array(
+        data=synthetic_signal(case.duration, case.channels, case.sample_rate),
+        audio_format="wav",
+        sample_rate=case.sample_rate,
+        name=case.key,
+    )
+
+
+def run_operation(operation: str, source: AudioSource) -> Any:
+    """run the use case of the operation on the source, its random parameters drawn from `RUN_SEED`"""
+
+    random.seed(RUN_SEED)
+    return OPERATIONS[operation](source)
+
+
+def run_case(case: BenchmarkCase, repeats: int = 3) -> BenchmarkResult:
+    """Run the use case of the case on its synthetic signal.
+
+    A first run warms up the caches and loads the models, a second one measures the peak memory:
+    tracemalloc slows the allocations down, so the ``repeats`` runs timed are the next ones.
+    """
+
+    source = synthetic_source(case)
+    operation = partial(run_operation, case.operation)
+
+    operation(source)
+
+    tracemalloc.start()
+    try:
+        operation(source)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = []
+    for _ in range(repeats):
+        with record_stages() as stages:
+            start = time.perf_counter()
+            operation(source)
+            durations.append(time.perf_counter() - start)
+
+    wall_time = statistics.median(durations)
+
+    return BenchmarkResult(
+        case=case,
+        repeats=repeats,
+        wall_time=round(wall_time, 4),
+        min_wall_time=round(min(durations), 4),
+        throughput=round(case.duration / wall_time, 2),
+        peak_memory=peak_memory,
+        stages={name: round(duration, 4) for name, duration in stages.items()},
+    )
+
+
+def compare_reports(
+    baseline: BenchmarkReport, report: BenchmarkReport, tolerance: float = 0.15
+) -> list[BenchmarkRegression]:
+    """The cases of the report whose throughput is lower, or whose peak memory is higher,
+    than the ones of the baseline by more than ``tolerance`` (a fraction of the baseline).
+    The cases which are not in both reports are not compared.
+
+    The reports of different machines are compared all the same, with a warning:
+    their throughputs say more about the machines than about the code."""
+
+    for field in ("machine", "cpus"):
+        if getattr(baseline, field) != getattr(report, field):
+            logger.warning(
+                f"The baseline was measured on another {field} "
+                f"({getattr(baseline, field)}, now {getattr(report, field)}), "
+                "the differences may not be regressions"
+            )
+
+    baseline_results = {result.case.key: result for result in baseline.results}
+    regressions = []
+
+    for result in report.results:
+
+        reference = baseline_results.get(result.case.key)
+        if reference is None:
+            continue
+
+        if result.throughput < reference.throughput * (1 - tolerance):
+            regressions.append(
+                BenchmarkRegression(
+                    key=result.case.key,
+                    metric="throughput",
+                    baseline=reference.throughput,
+                    current=result.throughput,
+                )
+            )
+
+        if result.peak_memory > reference.peak_memory * (1 + tolerance):
+            regressions.append(
+                BenchmarkRegression(
+                    key=result.case.key,
+                    metric="peak_memory",
+                    baseline=reference.peak_memory,
+                    current=result.peak_memory,
+                )
+            )
+
+    return regressions
+
+
+def save_report(path: Path, report: BenchmarkReport) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(report.model_dump_json(indent=2))
+
+
+def load_report(path: Path) -> BenchmarkReport:
+    return BenchmarkReport.model_validate_json(path.read_text())
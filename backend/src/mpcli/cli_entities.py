@@ -1,8 +1,23 @@
+from datetime import datetime
+from enum import Enum
 from pathlib import Path
 from typing import Literal, Optional, Self
 
 from pydantic import BaseModel, Field, model_validator
 
+from src.mpcli.entities.pipeline import PipelineStage
+from src.mpcli.entities.shard import Shard
+from src.mpcli.entities.source import AudioSegment
+
+
+class CLIOutputFormat(str, Enum):
+    """how the CLI commands report their results"""
+
+    # a table printed once all the files are processed
+    table = "table"
+    # one JSON line printed as soon as a file is processed
+    jsonl = "jsonl"
+
 
 class CLIConfigError(ValueError):
     pass
@@ -10,6 +25,29 @@ class CLIConfigError(ValueError):
 
 class LocalAudioSource(BaseModel):
     source: Path
+    # process only the part of the sources assigned to this shard, e.g. "1/4"
+    shard: Optional[Shard] = None
+    # process only the segment of each source from `start` to `end`, in seconds or samples
+    start: Optional[float] = Field(default=None, ge=0.0)
+    end: Optional[float] = Field(default=None, gt=0.0)
+    unit: Literal["seconds", "samples"] = "seconds"
+
+    @model_validator(mode="after")
+    def validate_segment(self) -> Self:
+
+        if self.start is not None and self.end is not None and self.end <= self.start:
+            raise CLIConfigError(f"end ({self.end}) must be greater than start ({self.start})")
+
+        return self
+
+    @property
+    def segment(self) -> Optional[AudioSegment]:
+        """the segment of the sources to process, None for the whole sources"""
+
+        if self.start is None and self.end is None:
+            return None
+
+        return AudioSegment(start=self.start or 0.0, end=self.end, unit=self.unit)
 
 
 class CLINormalizeConfig(LocalAudioSource):
@@ -74,3 +112,41 @@ class CLIConvertConfig(LocalAudioSource):
 
 class CLITempoEstimationConfig(LocalAudioSource):
     pass
+
+
+class CLIPipelineConfig(LocalAudioSource):
+    """the stages are run in order on a single decoded buffer,
+    which is encoded once at the end in the format of the last `convert` stage
+    """
+
+    output: Path
+    stages: list[PipelineStage] = Field(..., min_length=1)
+    # jinja template, e.g. "{{ source.stem }}_{{ target_tempo }}_BPM"
+    filename: Optional[str] = None
+
+
+class CLIJobResult(BaseModel):
+    """Outcome of the processing of a single source file by a CLI command"""
+
+    source: Path
+    row: list[str] = Field(
+        default_factory=list, description="cells of the row added to the results table"
+    )
+    error: Optional[str] = None
+    elapsed: Optional[float] = Field(
+        default=None, description="processing time of the file in seconds"
+    )
+    timings: dict[str, float] = Field(
+        default_factory=dict, description="duration of each step of the processing, in seconds"
+    )
+
+
+class ShardManifest(BaseModel):
+    """Written by a command run on a shard once all its sources are processed,
+    the manifests of all the shards are combined by the `merge` command"""
+
+    section: str
+    shard: Shard
+    columns: list[str]
+    results: list[CLIJobResult]
+    completed_at: datetime
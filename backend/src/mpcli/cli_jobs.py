@@ -0,0 +1,369 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterable, Optional
+
+import jinja2
+
+from src.mpcli.cli_entities import (
+    CLIConvertConfig,
+    CLIJobResult,
+    CLINormalizeConfig,
+    CLIPipelineConfig,
+    CLITempoEstimationConfig,
+    CLITimeStretchConfig,
+    LocalAudioSource,
+)
+from src.mpcli.entities.source import AudioFileHandle
+from src.mpcli.repository.audio_file import load_audio_file, load_source
+from src.mpcli.repository.audio_writer import AudioFileWriter
+from src.mpcli.repository.profiling import maybe_profiled
+from src.mpcli.repository.tempo import get_tempo_classifier
+from src.mpcli.repository.timing import timed
+from src.mpcli.use_cases.convert import execute_format_conversion
+from src.mpcli.use_cases.normalization import execute_normalization
+from src.mpcli.use_cases.pipeline import process_samples
+from src.mpcli.use_cases.tempo import execute_tempo_estimation
+from src.mpcli.use_cases.timestretch import execute_timestretch
+
+# a job processes a single source file with the config of the command,
+# it may hand over the output file to the writer and return the pending write
+JobOutput = tuple[CLIJobResult, Optional[Future[AudioFileHandle]]]
+Job = Callable[[Any, Path, AudioFileWriter], JobOutput]
+
+
+def _timestretched_filename(config: CLITimeStretchConfig, tempo: float) -> str:
+
+    environment = jinja2.Environment()
+
+    tempo_min = round(tempo * config.min_rate, 2)
+    tempo_max = round(tempo * config.max_rate, 2)
+
+    if config.filename is not None:
+        filename_template = config.filename
+    elif tempo_min == tempo_max:
+        filename_template = "{{ source.stem }}_{{ tempo_min }}_BPM"
+    else:
+        filename_template = "{{ source.stem }}_{{ tempo_min }}-{{ tempo_max }}_BPM"
+
+    template = environment.from_string(filename_template)
+
+    return template.render(
+        **config.model_dump(), tempo_min=tempo_min, tempo_max=tempo_max
+    )
+
+
+def detect_tempo_job(
+    config: CLITempoEstimationConfig, path: Path, writer: AudioFileWriter
+) -> JobOutput:
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "load"):
+        source = load_source(path, config.segment)
+
+    with timed(timings, "detect_tempo"):
+        result = execute_tempo_estimation(source)
+
+    if result is None:
+        return CLIJobResult(source=path, error="No tempo estimation result returned"), None
+
+    return (
+        CLIJobResult(
+            source=path,
+            row=[result.audio_source.name, f"{result.tempo} BPM"],
+            timings=timings,
+        ),
+        None,
+    )
+
+
+def timestretch_job(
+    config: CLITimeStretchConfig, path: Path, writer: AudioFileWriter
+) -> JobOutput:
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "load"):
+        source = load_source(path, config.segment)
+
+    with timed(timings, "timestretch"):
+        result = execute_timestretch(
+            source=source,
+            target_tempo=config.target_tempo,
+            min_rate=config.min_rate,
+            max_rate=config.max_rate,
+        )
+
+    if result is None:
+        return CLIJobResult(source=path, error="No time stretching result returned"), None
+
+    # dump to a file according to the provided filename template
+    filename = _timestretched_filename(config, result.original_tempo)
+    future = writer.submit(
+        output_dir=Path(config.output),
+        filename=filename,
+        data=result.converted_audio.to_array(),
+        sample_rate=result.converted_audio.sample_rate,
+        format=result.converted_audio.audio_format,
+    )
+
+    return (
+        CLIJobResult(
+            source=path,
+            row=[str(config.source), filename, str(result.target_tempo)],
+            timings=timings,
+        ),
+        future,
+    )
+
+
+def convert_job(config: CLIConvertConfig, path: Path, writer: AudioFileWriter) -> JobOutput:
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "load"):
+        source = load_source(path, config.segment)
+
+    with timed(timings, "convert"):
+        result = execute_format_conversion(source, target_format=config.target_format)
+
+    if result is None:
+        return CLIJobResult(source=path, error="No conversion result returned"), None
+
+    future = writer.submit(
+        output_dir=config.output,
+        filename=result.converted_audio.name,
+        data=result.converted_audio.to_array(),
+        sample_rate=result.converted_audio.sample_rate,
+        format=result.converted_audio.audio_format,
+    )
+
+    return (
+        CLIJobResult(
+            source=path,
+            row=[
+                result.audio_source.name,
+                result.audio_source.audio_format,
+                result.converted_audio.name,
+                result.converted_audio.audio_format,
+            ],
+            timings=timings,
+        ),
+        future,
+    )
+
+
+def normalize_job(
+    config: CLINormalizeConfig, path: Path, writer: AudioFileWriter
+) -> JobOutput:
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "load"):
+        source = load_source(path, config.segment)
+
+    with timed(timings, "normalize"):
+        result = execute_normalization(source, lufs=config.lufs)
+
+    if result is None:
+        return CLIJobResult(source=path, error="No normalization result returned"), None
+
+    future = writer.submit(
+        output_dir=config.output,
+        filename=result.converted_audio.name,
+        data=result.converted_audio.to_array(),
+        sample_rate=result.converted_audio.sample_rate,
+        format=result.converted_audio.audio_format,
+    )
+
+    return (
+        CLIJobResult(
+            source=path,
+            row=[result.audio_source.name, str(result.lufs), result.converted_audio.name],
+            timings=timings,
+        ),
+        future,
+    )
+
+
+def _pipeline_filename(
+    config: CLIPipelineConfig, path: Path, original_tempo: float | None, target_tempo: float | None
+) -> str:
+
+    environment = jinja2.Environment()
+
+    template = environment.from_string(config.filename or "{{ source.stem }}_processed")
+
+    return template.render(
+        source=path, original_tempo=original_tempo, target_tempo=target_tempo
+    )
+
+
+def pipeline_job(config: CLIPipelineConfig, path: Path, writer: AudioFileWriter) -> JobOutput:
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "decode"):
+        samples, sample_rate = load_audio_file(path, dtype="float32", segment=config.segment)
+
+    samples, summary = process_samples(samples, sample_rate, config.stages, timings)
+
+    filename = _pipeline_filename(
+        config, path, summary.original_tempo, summary.target_tempo
+    )
+
+    # without a `convert` stage the format of the source is kept,
+    # the sources which cannot be written back (flac, ogg, m4a) are written in WAV
+    source_format = path.suffix.lower()[1:]
+    if source_format not in ("wav", "mp3"):
+        source_format = "wav"
+
+    # the writer encodes the samples once, in the background
+    future = writer.submit(
+        output_dir=config.output,
+        filename=filename,
+        data=samples,
+        sample_rate=sample_rate,
+        format=summary.target_format or source_format,
+    )
+
+    tempo = ""
+    if summary.original_tempo is not None:
+        tempo = f"{summary.original_tempo:.2f} BPM"
+    if summary.target_tempo is not None:
+        tempo = f"{tempo} → {summary.target_tempo:.2f} BPM"
+
+    return (
+        CLIJobResult(
+            source=path,
+            row=[
+                path.stem,
+                filename,
+                tempo,
+                "\n".join(f"{stage} {t:.2f}s" for stage, t in summary.timings.items()),
+            ],
+            timings=summary.timings,
+        ),
+        future,
+    )
+
+
+# the job of each section of the config, along with the type of its config
+SECTION_JOBS: dict[str, tuple[type[LocalAudioSource], Job]] = {
+    "detect_tempo": (CLITempoEstimationConfig, detect_tempo_job),
+    "timestretch": (CLITimeStretchConfig, timestretch_job),
+    "convert": (CLIConvertConfig, convert_job),
+    "normalize": (CLINormalizeConfig, normalize_job),
+    "pipeline": (CLIPipelineConfig, pipeline_job),
+}
+
+# sections whose job estimates tempi, the model is worth loading upfront
+TEMPO_SECTIONS = ("detect_tempo", "timestretch", "pipeline")
+
+
+def warm_up_tempo_model() -> None:
+    """worker initializer, loads the tempo model before the first job is received"""
+    get_tempo_classifier()
+
+
+def _run_job(job: Job, config: Any, path: Path, writer: AudioFileWriter) -> JobOutput:
+    """run the job, errors are reported in the result so that they don't stop the batch"""
+
+    start = time.perf_counter()
+
+    try:
+        with maybe_profiled(job.__name__.removesuffix("_job"), path.stem):
+            result, write = job(config, path, writer)
+    except Exception as e:
+        result, write = CLIJobResult(source=path, error=str(e)), None
+
+    result.elapsed = round(time.perf_counter() - start, 4)
+
+    return result, write
+
+
+def _complete(result: CLIJobResult, write: Optional[Future[AudioFileHandle]]) -> CLIJobResult:
+    """wait for the pending write of the job, if any"""
+
+    if write is None or result.error is not None:
+        return result
+
+    try:
+        write.result()
+        return result
+    except Exception as e:
+        return result.model_copy(update={"row": [], "error": str(e)})
+
+
+# one writer per worker process, created on the first job
+_worker_writer: Optional[AudioFileWriter] = None
+
+
+def _run_job_in_worker(job: Job, config: Any, path: Path) -> CLIJobResult:
+
+    global _worker_writer
+
+    if _worker_writer is None:
+        _worker_writer = AudioFileWriter()
+
+    return _complete(*_run_job(job, config, path, _worker_writer))
+
+
+def run_jobs(
+    job: Job,
+    items: Iterable[tuple[Any, Path]],
+    jobs: int = 1,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Generator[CLIJobResult, None, None]:
+    """Run the `job` on each (config, path) item and yield the results in completion order.
+
+    - with ``jobs == 1`` the items are processed in the current process,
+      the output files being written in the background while the next item is processed
+    - with ``jobs > 1`` the items are fanned out to a pool of ``jobs`` worker processes,
+      ``initializer`` is called once in each worker, e.g. to load the models
+
+    Errors are isolated per item: they are reported in the `CLIJobResult.error`
+    of the item and the batch goes on.
+    """
+
+    if jobs < 1:
+        raise ValueError(f"jobs must be at least 1, got {jobs}")
+
+    if jobs == 1:
+
+        pending: deque[JobOutput] = deque()
+
+        with AudioFileWriter() as writer:
+            for config, path in items:
+                pending.append(_run_job(job, config, path, writer))
+
+                # yield the jobs whose output file is written
+                while pending and (pending[0][1] is None or pending[0][1].done()):
+                    yield _complete(*pending.popleft())
+
+            while pending:
+                yield _complete(*pending.popleft())
+
+        return
+
+    # "spawn" avoids forking a parent process which may have loaded tensorflow
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+    ) as executor:
+
+        futures = {
+            executor.submit(_run_job_in_worker, job, config, path): path
+            for config, path in items
+        }
+
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # the worker process died
+                yield CLIJobResult(source=futures[future], error=str(e))
@@ -0,0 +1,90 @@
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from src.mpcli.cli_entities import CLIConfigError, CLIJobResult, ShardManifest
+from src.mpcli.entities.shard import Shard
+
+DEFAULT_MANIFEST_DIR = Path("manifests")
+
+
+def manifest_path(manifest_dir: Path, section: str, shard: Shard) -> Path:
+    return manifest_dir / f"{section}.shard-{shard.index}-of-{shard.count}.json"
+
+
+def write_manifest(
+    manifest_dir: Path,
+    section: str,
+    shard: Shard,
+    columns: list[str],
+    results: list[CLIJobResult],
+) -> Path:
+    """Write the manifest of a completed shard, replacing the one of a previous run of the shard.
+
+    The manifest is written to a temporary file first, so that a manifest
+    found in `manifest_dir` is always complete.
+    """
+
+    manifest = ShardManifest(
+        section=section,
+        shard=shard,
+        columns=columns,
+        results=results,
+        completed_at=datetime.now(timezone.utc),
+    )
+
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+
+    path = manifest_path(manifest_dir, section, shard)
+    tmp_path = manifest_dir / f".{path.name}.{uuid.uuid4().hex}.part"
+
+    try:
+        tmp_path.write_text(manifest.model_dump_json(indent=2))
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return path
+
+
+def read_manifests(manifest_dir: Path, section: str) -> tuple[list[ShardManifest], list[Shard]]:
+    """Read the manifests of the shards of the section.
+
+    Returns:
+        tuple[list[ShardManifest], list[Shard]]: the manifests ordered by shard index,
+            and the shards whose manifest is missing, i.e. not completed yet
+
+    Raises:
+        CLIConfigError: if no manifest is found, or if the manifests were written
+            with different shard counts
+    """
+
+    manifests = []
+
+    for path in sorted(manifest_dir.glob(f"{section}.shard-*-of-*.json")):
+        try:
+            manifests.append(ShardManifest.model_validate_json(path.read_text()))
+        except ValueError as e:
+            logger.warning(f"Ignoring the invalid manifest '{path}': {e}")
+
+    if not manifests:
+        raise CLIConfigError(f"No manifest found for '{section}' in '{manifest_dir}'")
+
+    counts = {m.shard.count for m in manifests}
+    if len(counts) > 1:
+        raise CLIConfigError(
+            f"The manifests of '{section}' were written with different shard counts: {sorted(counts)}"
+        )
+
+    (count,) = counts
+    manifests.sort(key=lambda m: m.shard.index)
+
+    completed = {m.shard.index for m in manifests}
+    missing = [
+        Shard(index=i, count=count) for i in range(1, count + 1) if i not in completed
+    ]
+
+    return manifests, missing
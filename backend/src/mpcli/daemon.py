@@ -0,0 +1,158 @@
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Generator, Iterable
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.mpcli.cli_entities import CLIJobResult
+from src.mpcli.repository.unix_socket import (
+    UntrustedSocketError,
+    check_owner,
+    default_socket_dir,
+    owner_only,
+    prepare_socket,
+)
+
+# this module is imported by the CLI: the heavy modules (use cases, models)
+# are only imported by the daemon itself, in `serve`
+
+# in a directory private to the user: another user cannot bind it first and receive the jobs
+DEFAULT_SOCKET_PATH = Path(
+    os.environ.get("MPCLI_DAEMON_SOCKET", default_socket_dir() / "daemon.sock")
+)
+
+
+class DaemonUnavailableError(ConnectionError):
+    """Raised when the daemon is not running, or when the connection to it is lost"""
+
+    pass
+
+
+class DaemonRequest(BaseModel):
+    section: str
+    config: dict[str, Any]
+    path: Path
+
+
+def _absolute(config: BaseModel) -> dict[str, Any]:
+    """dump the config with its paths made absolute, the daemon has its own working directory"""
+
+    data = config.model_dump(mode="json")
+
+    for name, value in config:
+        if isinstance(value, Path):
+            data[name] = str(value.resolve())
+
+    return data
+
+
+def run_jobs_on_daemon(
+    section: str,
+    items: Iterable[tuple[BaseModel, Path]],
+    socket_path: Path = DEFAULT_SOCKET_PATH,
+) -> Generator[CLIJobResult, None, None]:
+    """Send the (config, path) items to the daemon, one at a time, and yield the results.
+
+    The socket must belong to the current user, the jobs are not sent to the daemon
+    of another user.
+
+    Raises:
+        DaemonUnavailableError: if the daemon is not running, its socket belongs to another user,
+            or the connection is lost: the items for which no result was yielded have not been processed.
+    """
+
+    try:
+        check_owner(socket_path)
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(str(socket_path))
+    except OSError as e:
+        raise DaemonUnavailableError(f"No daemon listening on '{socket_path}': {e}") from e
+
+    with connection, connection.makefile("rwb") as stream:
+
+        for config, path in items:
+
+            request = DaemonRequest(
+                section=section, config=_absolute(config), path=path.resolve()
+            )
+
+            try:
+                stream.write(request.model_dump_json().encode() + b"\n")
+                stream.flush()
+                response = stream.readline()
+            except OSError as e:
+                raise DaemonUnavailableError(f"Connection to the daemon lost: {e}") from e
+
+            if not response:
+                raise DaemonUnavailableError("Connection to the daemon lost")
+
+            yield CLIJobResult.model_validate_json(response)
+
+
+def serve(socket_path: Path = DEFAULT_SOCKET_PATH) -> None:
+    """Run the daemon: load the models once, then process the jobs sent by the CLI clients
+    over the Unix socket until interrupted.
+
+    The jobs are run one at a time, whatever the number of connected clients.
+    """
+
+    from src.mpcli.cli_jobs import SECTION_JOBS, run_jobs, warm_up_tempo_model
+
+    warm_up_tempo_model()
+
+    lock = threading.Lock()
+
+    class JobHandler(socketserver.StreamRequestHandler):
+
+        def handle(self) -> None:
+
+            for line in self.rfile:
+
+                try:
+                    request = DaemonRequest.model_validate_json(line)
+                    config_type, job = SECTION_JOBS[request.section]
+                    config = config_type(**request.config)
+                except Exception as e:
+                    result = CLIJobResult(source=Path("."), error=f"Invalid request: {e}")
+                else:
+                    # errors of the job itself are reported in the result
+                    with lock:
+                        (result,) = run_jobs(job, [(config, request.path)])
+
+                self.wfile.write(result.model_dump_json().encode() + b"\n")
+                self.wfile.flush()
+
+    try:
+        prepare_socket(socket_path)
+    except UntrustedSocketError as e:
+        logger.error(f"Cannot listen on '{socket_path}': {e}")
+        return
+
+    # a socket file left by a daemon which was killed
+    if socket_path.exists():
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(str(socket_path))
+            logger.error(f"A daemon is already listening on '{socket_path}'")
+            return
+        except ConnectionRefusedError:
+            socket_path.unlink()
+
+    # only the user running the daemon may submit jobs, the socket is created with the permissions 0600
+    with owner_only():
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), JobHandler)
+
+    with server:
+
+        logger.info(f"Daemon listening on '{socket_path}'")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Daemon stopped")
+        finally:
+            socket_path.unlink(missing_ok=True)
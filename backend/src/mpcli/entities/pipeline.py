@@ -0,0 +1,69 @@
+from typing import Annotated, Literal, Optional, Self, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class DetectTempoStage(BaseModel):
+    """Estimate the tempo of the audio, without modifying it"""
+
+    operation: Literal["detect_tempo"] = "detect_tempo"
+
+
+class TimeStretchStage(BaseModel):
+    """Time stretch the audio, either to a target tempo or by a rate in [min_rate, max_rate].
+
+    When a ``target_tempo`` is provided, the tempo of the audio is estimated first
+    (unless a previous `DetectTempoStage` already did it).
+    """
+
+    operation: Literal["timestretch"] = "timestretch"
+    target_tempo: Optional[float] = Field(default=None, gt=0.0)
+    min_rate: Optional[float] = Field(default=None, gt=0.0)
+    max_rate: Optional[float] = Field(default=None, gt=0.0)
+
+    @model_validator(mode="after")
+    def validate_rates(self) -> Self:
+
+        if (
+            self.target_tempo is None
+            and self.min_rate is None
+            and self.max_rate is None
+        ):
+            raise ValueError("Either target_tempo or min_rate/max_rate must be provided")
+
+        if self.target_tempo is not None and (
+            self.min_rate is not None or self.max_rate is not None
+        ):
+            raise ValueError(
+                "Only one of target_tempo or min_rate/max_rate can be provided"
+            )
+
+        # same defaults as the `timestretch` command
+        if self.target_tempo is None:
+            self.min_rate = self.min_rate if self.min_rate is not None else 1.0
+            self.max_rate = self.max_rate if self.max_rate is not None else 1.0
+
+            if self.min_rate > self.max_rate:
+                raise ValueError("min_rate cannot be greater than max_rate")
+
+        return self
+
+
+class NormalizeStage(BaseModel):
+    """Normalize the loudness of the audio to the given LUFS level"""
+
+    operation: Literal["normalize"] = "normalize"
+    lufs: float = Field(default=-14.0, le=0.0)
+
+
+class ConvertStage(BaseModel):
+    """Select the format of the output, the audio is encoded once at the end of the pipeline"""
+
+    operation: Literal["convert"] = "convert"
+    target_format: Literal["wav", "mp3"] = Field(default="wav")
+
+
+PipelineStage = Annotated[
+    Union[DetectTempoStage, TimeStretchStage, NormalizeStage, ConvertStage],
+    Field(discriminator="operation"),
+]
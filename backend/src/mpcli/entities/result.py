@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
 
 from src.mpcli.entities.source import AudioSource
 
@@ -24,3 +26,18 @@ class NormalizeResult(BaseModel):
     audio_source: AudioSource
     converted_audio: AudioSource
     lufs: float
+
+
+class PipelineSummary(BaseModel):
+    original_tempo: Optional[float] = None
+    target_tempo: Optional[float] = None
+    lufs: Optional[float] = None
+    target_format: Optional[Literal["wav", "mp3"]] = None
+    timings: dict[str, float] = Field(
+        default_factory=dict, description="duration of each stage in seconds"
+    )
+
+
+class PipelineResult(PipelineSummary):
+    audio_source: AudioSource
+    converted_audio: AudioSource
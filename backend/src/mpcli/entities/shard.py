@@ -0,0 +1,49 @@
+import hashlib
+from pathlib import PurePath
+from typing import Self
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class Shard(BaseModel):
+    """One of the ``count`` parts of a batch, numbered from 1 to ``count``.
+
+    The sources are assigned to the shards by a stable hash of their path
+    relative to the configured source, so that several machines sharing the same
+    config process disjoint parts of the batch without any coordination.
+    """
+
+    index: int = Field(..., ge=1, description="number of the shard, from 1 to count")
+    count: int = Field(..., ge=1, description="number of shards")
+
+    @model_validator(mode="before")
+    @classmethod
+    def parse(cls, value):
+        """accept the ``"i/N"`` notation, e.g. ``"2/4"``"""
+
+        if isinstance(value, str):
+            try:
+                index, count = value.split("/")
+                return {"index": int(index), "count": int(count)}
+            except ValueError:
+                raise ValueError(f"Invalid shard '{value}', expected 'i/N', e.g. '1/4'")
+
+        return value
+
+    @model_validator(mode="after")
+    def validate_index(self) -> Self:
+        if self.index > self.count:
+            raise ValueError(
+                f"Invalid shard {self.index}/{self.count}, the index cannot be greater than the count"
+            )
+        return self
+
+    def contains(self, relative_path: PurePath) -> bool:
+        """whether the source at ``relative_path`` is assigned to this shard"""
+
+        digest = hashlib.sha1(relative_path.as_posix().encode()).digest()
+
+        return int.from_bytes(digest[:8], "big") % self.count == self.index - 1
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
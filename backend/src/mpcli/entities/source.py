@@ -1,9 +1,10 @@
 import io
-from typing import Literal, Optional, Self
+from pathlib import Path
+from typing import BinaryIO, Literal, Optional, Self
 
 import numpy as np
 import soundfile as sf
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class AudioSourceError(ValueError):
@@ -30,19 +31,118 @@ def ensure_audio_shape(data: np.ndarray) -> np.ndarray:
     return data
 
 
+class AudioSegment(BaseModel):
+    """Part of the audio to process, from ``start`` to ``end`` (by default the end of the audio),
+    in seconds or in samples (frames)"""
+
+    start: float = Field(default=0.0, ge=0.0, description="Start of the segment")
+    end: Optional[float] = Field(default=None, gt=0.0, description="End of the segment, excluded")
+    unit: Literal["seconds", "samples"] = Field(
+        default="seconds", description="Unit of the start and the end"
+    )
+
+    @model_validator(mode="after")
+    def validate_bounds(self) -> Self:
+        if self.end is not None and self.end <= self.start:
+            raise ValueError(f"The end of the segment ({self.end}) must be after its start ({self.start})")
+        return self
+
+    def frames(self, sample_rate: int, length: int) -> tuple[int, int]:
+        """The first frame of the segment and the frame after its last one,
+        in an audio of ``length`` frames: the end is clipped to the end of the audio
+
+        Raises:
+            AudioSourceError: if the segment starts after the end of the audio
+        """
+
+        scale = sample_rate if self.unit == "seconds" else 1
+
+        start = round(self.start * scale)
+        stop = length if self.end is None else min(round(self.end * scale), length)
+
+        if start >= stop:
+            raise AudioSourceError(
+                f"The segment starts at frame {start}, after the end of the audio ({length} frames)"
+            )
+
+        return start, stop
+
+
 class AudioSource(BaseModel):
-    """Base class for tempo estimation configuration"""
+    """Encoded audio, either held in memory (`audio_bytes`)
+    or backed by a file (`audio_path`) which is read only when decoded"""
 
     audio_format: Literal["wav", "mp3"] = Field(
         ..., description="Audio format (e.g., 'wav', 'mp3')"
     )
-    audio_bytes: bytes = Field(..., description="Audio data in bytes")
+    audio_bytes: Optional[bytes] = Field(default=None, description="Audio data in bytes")
+    audio_path: Optional[Path] = Field(
+        default=None, description="Audio file holding the audio data, instead of audio_bytes"
+    )
     name: Optional[str] = Field(
         default="unknown", description="Name of the audio source"
     )
     sample_rate: Optional[int] = Field(
         default=44100, description="Sample rate of the audio file in Hz"
     )
+    segment: Optional[AudioSegment] = Field(
+        default=None, description="Part of the audio to process, the whole audio by default"
+    )
+
+    @model_validator(mode="after")
+    def validate_data(self) -> Self:
+        if (self.audio_bytes is None) == (self.audio_path is None):
+            raise AudioSourceError("Exactly one of audio_bytes or audio_path must be provided")
+        return self
+
+    def open(self) -> BinaryIO:
+        """Open the encoded audio data for reading, from the file when the source is file-backed"""
+
+        if self.audio_path is not None:
+            return open(self.audio_path, "rb")
+
+        return io.BytesIO(self.audio_bytes)
+
+    def read_bytes(self) -> bytes:
+        """The encoded audio data, read from the file when the source is file-backed"""
+
+        if self.audio_path is not None:
+            return self.audio_path.read_bytes()
+
+        return self.audio_bytes
+
+    def read(
+        self, dtype: Literal["float64", "float32"] = "float64", always_2d: bool = False
+    ) -> tuple[np.ndarray, int]:
+        """Decode the audio, only the frames of the segment when the source has one:
+        the decoder seeks to the start of the segment instead of decoding the audio before it.
+
+        Returns:
+            tuple[np.ndarray, int]: the samples, as returned by `soundfile.read`, and the sample rate
+        """
+
+        with self.open() as audio, sf.SoundFile(audio) as sound:
+
+            if self.segment is None:
+                return sound.read(dtype=dtype, always_2d=always_2d), sound.samplerate
+
+            start, stop = self.segment.frames(sound.samplerate, sound.frames)
+            sound.seek(start)
+
+            return sound.read(stop - start, dtype=dtype, always_2d=always_2d), sound.samplerate
+
+    def extract(self) -> Self:
+        """The audio of the segment as a source of its own, in the same format:
+        the source itself when it has no segment"""
+
+        if self.segment is None:
+            return self
+
+        data, sample_rate = self.read(dtype="float32", always_2d=True)
+
+        return AudioSource.from_array(
+            data=data, audio_format=self.audio_format, sample_rate=sample_rate, name=self.name
+        )
 
     @classmethod
     def from_array(
@@ -92,8 +192,39 @@ class AudioSource(BaseModel):
         Returns:
             np.ndarray: Audio data as a NumPy array, returned in shape (frames, channels)
         """
-        data, _ = sf.read(io.BytesIO(self.audio_bytes), dtype="float32", always_2d=True)
+        data, _ = self.read(dtype="float32", always_2d=True)
 
         data = ensure_audio_shape(data)
 
         return data
+
+
+class AudioFileHandle(BaseModel):
+    """Lightweight reference to an audio file written on disk,
+    returned instead of re-reading the encoded bytes into memory"""
+
+    path: Path = Field(..., description="Path of the audio file on disk")
+    name: str = Field(..., description="Name of the audio file, without extension")
+    audio_format: Literal["wav", "mp3"] = Field(
+        ..., description="Audio format (e.g., 'wav', 'mp3')"
+    )
+    sample_rate: int = Field(..., description="Sample rate of the audio file in Hz")
+    size: int = Field(..., description="Size of the audio file in bytes")
+
+
+class AudioProbe(BaseModel):
+    """Properties of an audio file read from its header, without decoding it"""
+
+    path: Path = Field(..., description="Path of the audio file on disk")
+    format: str = Field(..., description="Container format, e.g. 'WAV', 'MP3'")
+    subtype: str = Field(..., description="Encoding of the samples, e.g. 'PCM_16', 'MPEG_LAYER_III'")
+    sample_rate: int = Field(..., description="Sample rate of the audio file in Hz")
+    channels: int = Field(..., description="Number of channels")
+    duration: float = Field(..., description="Duration of the audio in seconds")
+    bit_depth: Optional[int] = Field(
+        default=None, description="Bits per sample, None for the compressed formats"
+    )
+    loudness: Optional[float] = Field(
+        default=None,
+        description="Integrated loudness in LUFS, measured on demand as it requires decoding the file",
+    )
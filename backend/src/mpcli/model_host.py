@@ -0,0 +1,187 @@
+import asyncio
+import os
+import socket
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.shared_array import (
+    SharedArray,
+    attach_array,
+    release_array,
+    share_array,
+)
+from src.mpcli.repository.unix_socket import (
+    UntrustedSocketError,
+    check_owner,
+    default_socket_dir,
+    owner_only,
+    prepare_socket,
+)
+
+if TYPE_CHECKING:
+    from src.mpcli.api_tempo import TempoBatcher
+
+# this module is imported by the CLI and the API: the model and the feature extraction
+# are only imported by the model host and the worker processes, when used
+
+# in a directory private to the user: another user cannot bind it first and serve fake tempi
+DEFAULT_MODEL_HOST_SOCKET = Path(
+    os.environ.get("MPCLI_MODEL_HOST_SOCKET", default_socket_dir() / "models.sock")
+)
+
+
+class ModelHostUnavailableError(ConnectionError):
+    """Raised when the model host is not running, or when the connection to it is lost"""
+
+    pass
+
+
+class ModelHostResponse(BaseModel):
+    tempo: Optional[float] = None
+    error: Optional[str] = None
+
+
+def share_tempo_features(source: AudioSource) -> SharedArray:
+    """Worker task: compute the features of the tempo model into shared memory,
+    for the model host to read them without copy.
+
+    The block must be released by the caller, `ModelHostClient.estimate` does it.
+    """
+
+    from src.mpcli.use_cases.tempo import execute_tempo_features
+
+    return share_array(execute_tempo_features(source))
+
+
+class ModelHostClient:
+    """Estimates tempi with the model of the host process, which serves all the API workers:
+    the model is loaded once whatever the number of workers"""
+
+    def __init__(self, socket_path: Path = DEFAULT_MODEL_HOST_SOCKET):
+        self.socket_path = socket_path
+
+    async def estimate(self, features: SharedArray) -> float:
+        """the tempo in BPM of the shared features, which are released once estimated
+
+        Raises:
+            ModelHostUnavailableError: if the model host is not running, its socket belongs
+                to another user, or the connection is lost
+            ValueError: if the model host failed to estimate the tempo
+        """
+
+        try:
+            try:
+                check_owner(self.socket_path)
+                reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            except OSError as e:
+                raise ModelHostUnavailableError(
+                    f"No model host listening on '{self.socket_path}': {e}"
+                ) from e
+
+            try:
+                writer.write(features.model_dump_json().encode() + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+            except OSError as e:
+                raise ModelHostUnavailableError(f"Connection to the model host lost: {e}") from e
+            finally:
+                writer.close()
+
+            if not line:
+                raise ModelHostUnavailableError("Connection to the model host lost")
+
+        finally:
+            release_array(features)
+
+        response = ModelHostResponse.model_validate_json(line)
+
+        if response.error is not None:
+            raise ValueError(response.error)
+
+        return response.tempo
+
+
+async def _estimate_shared(batcher: "TempoBatcher", shared: SharedArray) -> float:
+
+    with attach_array(shared) as features:
+        estimation = batcher.estimate(features)
+        # no reference to the mapping must be left when it's closed
+        del features
+        return await estimation
+
+
+async def _serve(socket_path: Path, batcher: "TempoBatcher") -> None:
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+
+        try:
+            async for line in reader:
+
+                try:
+                    shared = SharedArray.model_validate_json(line)
+                    response = ModelHostResponse(tempo=await _estimate_shared(batcher, shared))
+                except Exception as e:
+                    response = ModelHostResponse(error=f"Tempo estimation failed: {e}")
+
+                writer.write(response.model_dump_json().encode() + b"\n")
+                await writer.drain()
+
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # only the user running the model host may use it, the socket is created with the permissions 0600
+    with owner_only():
+        server = await asyncio.start_unix_server(handle, str(socket_path))
+
+    logger.info(f"Model host listening on '{socket_path}'")
+
+    async with server:
+        await server.serve_forever()
+
+
+def serve_models(
+    socket_path: Path = DEFAULT_MODEL_HOST_SOCKET,
+    max_batch: int = 32,
+    max_delay: float = 0.005,
+) -> None:
+    """Run the model host: load the models once, and estimate the tempi of the features
+    sent by the API workers over the Unix socket until interrupted.
+
+    The features of the concurrent requests, whatever the worker which sent them,
+    are run through the model in batches.
+    """
+
+    try:
+        prepare_socket(socket_path)
+    except UntrustedSocketError as e:
+        logger.error(f"Cannot listen on '{socket_path}': {e}")
+        return
+
+    # a socket file left by a model host which was killed
+    if socket_path.exists():
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(str(socket_path))
+            logger.error(f"A model host is already listening on '{socket_path}'")
+            return
+        except ConnectionRefusedError:
+            socket_path.unlink()
+
+    from src.mpcli.api_tempo import TempoBatcher
+
+    batcher = TempoBatcher(max_batch=max_batch, max_delay=max_delay)
+    batcher.warm_up()
+
+    try:
+        asyncio.run(_serve(socket_path, batcher))
+    except KeyboardInterrupt:
+        logger.info("Model host stopped")
+    finally:
+        batcher.shutdown()
+        socket_path.unlink(missing_ok=True)
@@ -5,6 +5,7 @@ import numpy as np
 from audiomentations import Mp3Compression
 
 from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.timing import timed_stage
 
 
 def convert(
@@ -15,7 +16,7 @@ def convert(
         case "mp3":
 
             if audio_source.audio_format == "mp3":
-                return audio_source
+                return audio_source.extract()
 
             transform = Mp3Compression(
                 min_bitrate=16,
@@ -26,20 +27,22 @@ def convert(
             )
 
             # convert the bytes back to a numpy array
-            data = audio_source.to_array()
+            with timed_stage("decode"):
+                data = audio_source.to_array()
 
             # audiomentations expects the audio samples to be in shape (channels, frames)
-            data = data.astype(np.float32).T
+            data = data.astype(np.float32, copy=False).T
 
             sr = audio_source.sample_rate
 
-            augmented_sound = transform(data, sample_rate=sr)
+            with timed_stage("encode"):
+                augmented_sound = transform(data, sample_rate=sr)
 
-            return AudioSource.from_array(
-                data=augmented_sound, audio_format="mp3", sample_rate=sr,
-                # keep the same name but change the extension
-                name=audio_source.name
-            )
+                return AudioSource.from_array(
+                    data=augmented_sound, audio_format="mp3", sample_rate=sr,
+                    # keep the same name but change the extension
+                    name=audio_source.name
+                )
 
         case "wav":
 
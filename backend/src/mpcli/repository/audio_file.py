@@ -1,35 +1,54 @@
+import os
 import re
-from pathlib import Path
-from typing import Generator, Literal
+import uuid
+from pathlib import Path, PurePath
+from typing import Generator, Literal, Optional
 
 import numpy as np
 import soundfile as sf
 from loguru import logger
 
-from src.mpcli.entities.source import AudioSource, ensure_audio_shape
+from src.mpcli.entities.shard import Shard
+from src.mpcli.entities.source import (
+    AudioFileHandle,
+    AudioSegment,
+    AudioSource,
+    AudioSourceError,
+    ensure_audio_shape,
+)
 from src.mpcli.repository.exceptions import (
     AudioFileNotFoundError,
     InvalidAudioFileError,
 )
 
 
-def iter_sources(
+SUPPORTED_EXTENSIONS = [".wav", ".mp3", ".flac", ".ogg", ".m4a"]
+
+
+def iter_source_paths(
     source_path: str | Path,
     format: Literal["*", "wav", "mp3", "flac", "ogg", "m4a"] = "*",
-) -> Generator[AudioSource, None, None]:
+    shard: Optional[Shard] = None,
+) -> Generator[Path, None, None]:
+    """Yield the paths of the supported audio files located at `source_path`,
+    without reading them.
+
+    `source_path` may be a single audio file or a directory containing audio files.
+    When a `shard` is given, only the files assigned to it are yielded.
+    """
 
     if not Path(source_path).exists():
         raise ValueError(f"'{source_path}' does not exist")
 
     if Path(source_path).is_file():
         ext = Path(source_path).suffix.lower()
-        name = Path(source_path).stem
-        if ext not in [".wav", ".mp3", ".flac", ".ogg", ".m4a"]:
+        if ext not in SUPPORTED_EXTENSIONS:
             raise ValueError(f"Unsupported audio format: '{ext}'")
 
-        yield AudioSource(
-            audio_bytes=Path(source_path).read_bytes(), audio_format=ext[1:], name=name
-        )
+        if shard is not None and not shard.contains(PurePath(Path(source_path).name)):
+            return
+
+        yield Path(source_path)
     else:
         for source in Path(source_path).glob("*.*"):
 
@@ -46,12 +65,29 @@ def iter_sources(
                 logger.info(f"Skipping file with unsupported format: {source}")
                 continue
 
-            ext = source.suffix.lower()
-            name = source.stem
+            if shard is not None and not shard.contains(source.relative_to(source_path)):
+                continue
+
+            yield source
 
-            yield AudioSource(
-                audio_bytes=source.read_bytes(), audio_format=ext[1:], name=name
-            )
+
+def load_source(path: Path, segment: Optional[AudioSegment] = None) -> AudioSource:
+    """Reference an audio file as a file-backed `AudioSource`, it's read when decoded:
+    only the ``segment`` of the file when given"""
+
+    return AudioSource(
+        audio_path=path, audio_format=path.suffix.lower()[1:], name=path.stem, segment=segment
+    )
+
+
+def iter_sources(
+    source_path: str | Path,
+    format: Literal["*", "wav", "mp3", "flac", "ogg", "m4a"] = "*",
+    shard: Optional[Shard] = None,
+) -> Generator[AudioSource, None, None]:
+
+    for path in iter_source_paths(source_path, format, shard):
+        yield load_source(path)
 
 
 def save_audio_file(
@@ -60,8 +96,14 @@ def save_audio_file(
     data: np.ndarray,
     sample_rate: int,
     format: Literal["wav", "mp3"] = "wav",
-) -> AudioSource:
-    """dump the audio file as a numpy array, for debugging purposes"""
+) -> AudioFileHandle:
+    """Encode the audio samples and write them to ``output_dir/filename.format``.
+
+    The samples are first encoded into a hidden temporary file in the output directory,
+    which is then atomically renamed, so that readers never see a partially written file.
+
+    Returns a lightweight handle (path, size...) instead of reading the file back.
+    """
 
     if not output_dir.exists():
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -69,36 +111,63 @@ def save_audio_file(
     # dump to file
     file_path = output_dir / f"{filename}.{format}"
 
+    # hidden files are skipped by `iter_sources`, the temp file won't be picked up as a source
+    tmp_path = output_dir / f".{filename}.{uuid.uuid4().hex}.part"
+
     try:
         data = ensure_audio_shape(data)
 
-        sf.write(file_path, data, sample_rate, format=format.upper())
+        sf.write(tmp_path, data, sample_rate, format=format.upper())
 
-        return AudioSource(
-            audio_bytes=file_path.read_bytes(), audio_format=format, name=filename
+        os.replace(tmp_path, file_path)
+
+        return AudioFileHandle(
+            path=file_path,
+            name=filename,
+            audio_format=format,
+            sample_rate=sample_rate,
+            size=file_path.stat().st_size,
         )
     except Exception as e:
+        tmp_path.unlink(missing_ok=True)
         raise InvalidAudioFileError(f"Error saving audio file '{file_path}': {e}")
 
 
-def load_audio_file(file_path: Path) -> tuple[np.ndarray, int]:
+def load_audio_file(
+    file_path: Path,
+    dtype: Literal["float64", "float32"] = "float64",
+    segment: Optional[AudioSegment] = None,
+) -> tuple[np.ndarray, int]:
     """Load an audio file and return the samples and sample rate.
 
     returns the audio samples as a 2D numpy array with shape (frames, channels)
-    and the sample rate as an integer.
+    and the sample rate as an integer. Unlike `load_source`, any format soundfile decodes is read
+    (e.g. flac, ogg).
 
     Args:
         file_path (Path): The path to the audio file.
+        dtype (str, optional): The data type of the returned samples. Defaults to "float64".
+        segment (AudioSegment, optional): only the frames of the segment are read. Defaults to the whole file.
     Returns:
         tuple[np.ndarray, int]: A tuple containing the audio samples as a numpy array and the sample rate as an integer.
+    Raises:
+        AudioSourceError: if the segment starts after the end of the file
     """
     try:
-        data, sample_rate = sf.read(
-            file_path, always_2d=True
-        )  # always return as 2D array even for mono audio
+        with sf.SoundFile(file_path) as sound:
+
+            start, stop = 0, sound.frames
+            if segment is not None:
+                start, stop = segment.frames(sound.samplerate, sound.frames)
+                sound.seek(start)
+
+            # always return as 2D array even for mono audio
+            data = sound.read(stop - start, dtype=dtype, always_2d=True)
 
-        return data, sample_rate
+            return data, sound.samplerate
 
+    except AudioSourceError:
+        raise
     except FileNotFoundError:
         raise AudioFileNotFoundError(f"Audio file '{file_path}' not found")
     except Exception as e:
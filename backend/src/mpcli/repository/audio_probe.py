@@ -0,0 +1,205 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Generator, Iterable, Optional
+
+import soundfile as sf
+
+from src.mpcli.entities.source import AudioProbe
+from src.mpcli.repository.audio_file import load_audio_file
+from src.mpcli.repository.audio_transform import get_loudness
+from src.mpcli.repository.exceptions import AudioFileNotFoundError, InvalidAudioFileError
+
+DEFAULT_PROBE_CACHE_PATH = Path(
+    os.environ.get(
+        "MPCLI_PROBE_CACHE", Path.home() / ".cache" / "mpcli" / "probes.sqlite"
+    )
+)
+
+# bits per sample of the uncompressed subtypes of libsndfile
+_BIT_DEPTHS = {
+    "PCM_S8": 8,
+    "PCM_U8": 8,
+    "PCM_16": 16,
+    "PCM_24": 24,
+    "PCM_32": 32,
+    "FLOAT": 32,
+    "DOUBLE": 64,
+}
+
+# (modification time in ns, size in bytes), a cached probe is valid as long as it's unchanged
+FileSignature = tuple[int, int]
+
+
+def _signature(path: Path) -> FileSignature:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def probe_audio_file(path: Path, loudness: bool = False) -> AudioProbe:
+    """Read the properties of the audio file from its header.
+
+    Args:
+        path (Path): the audio file
+        loudness (bool, optional): also measure the integrated loudness,
+            which requires decoding the whole file. Defaults to False.
+
+    Raises:
+        AudioFileNotFoundError: if the file does not exist
+        InvalidAudioFileError: if the header of the file cannot be read
+    """
+
+    if not path.exists():
+        raise AudioFileNotFoundError(f"Audio file '{path}' not found")
+
+    try:
+        info = sf.info(str(path))
+    except Exception as e:
+        raise InvalidAudioFileError(f"Error reading the header of '{path}': {e}")
+
+    probe = AudioProbe(
+        path=path,
+        format=info.format,
+        subtype=info.subtype,
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        duration=info.duration,
+        bit_depth=_BIT_DEPTHS.get(info.subtype),
+    )
+
+    if loudness:
+        probe.loudness = measure_loudness(path)
+
+    return probe
+
+
+def measure_loudness(path: Path) -> float:
+
+    samples, sample_rate = load_audio_file(path, dtype="float32")
+
+    return round(float(get_loudness(samples, sample_rate)), 2)
+
+
+class ProbeCache:
+    """SQLite cache of the probes, keyed by the path of the file along with
+    its modification time and size: a probe is re-computed when the file changes.
+
+    The cache must be used by a single thread.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PROBE_CACHE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(str(path))
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS probes (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                probe TEXT NOT NULL
+            )
+            """
+        )
+
+    def get(self, path: Path, signature: FileSignature) -> Optional[AudioProbe]:
+
+        row = self._connection.execute(
+            "SELECT mtime_ns, size, probe FROM probes WHERE path = ?",
+            (str(path),),
+        ).fetchone()
+
+        if row is None or (row[0], row[1]) != signature:
+            return None
+
+        return AudioProbe.model_validate_json(row[2])
+
+    def put(self, probes: Iterable[tuple[AudioProbe, FileSignature]]) -> None:
+
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO probes (path, mtime_ns, size, probe) VALUES (?, ?, ?, ?)",
+                [
+                    (str(probe.path), mtime_ns, size, probe.model_dump_json())
+                    for probe, (mtime_ns, size) in probes
+                ],
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "ProbeCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def probe_audio_files(
+    paths: Iterable[Path],
+    cache: ProbeCache,
+    workers: int = 16,
+    loudness: bool = False,
+) -> Generator[tuple[Path, AudioProbe | Exception], None, None]:
+    """Probe the audio files, in parallel, and yield the (path, probe) pairs in order,
+    or (path, error) when a file cannot be probed.
+
+    The probes of the unchanged files are taken from the `cache`, which is updated with the new ones.
+    With ``loudness``, the loudness of the files is measured unless already cached.
+    """
+
+    def probe(path: Path, cached: Optional[AudioProbe]) -> AudioProbe:
+        if cached is not None:
+            # only the loudness is missing
+            return cached.model_copy(update={"loudness": measure_loudness(path)})
+        return probe_audio_file(path, loudness=loudness)
+
+    signatures: dict[Path, FileSignature] = {}
+    # each path with its probe or its error, or None with the cached probe to complete
+    entries: list[tuple[Path, AudioProbe | Exception | None, Optional[AudioProbe]]] = []
+
+    for path in paths:
+
+        path = path.resolve()
+
+        try:
+            signatures[path] = _signature(path)
+        except OSError as e:
+            entries.append((path, e, None))
+            continue
+
+        cached = cache.get(path, signatures[path])
+
+        if cached is not None and (cached.loudness is not None or not loudness):
+            entries.append((path, cached, None))
+        else:
+            entries.append((path, None, cached))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        futures = {
+            i: executor.submit(probe, path, cached)
+            for i, (path, done, cached) in enumerate(entries)
+            if done is None
+        }
+        probed = []
+
+        try:
+            for i, (path, done, _) in enumerate(entries):
+
+                if done is not None:
+                    yield path, done
+                    continue
+
+                try:
+                    result = futures[i].result()
+                except Exception as e:
+                    yield path, e
+                else:
+                    probed.append((result, signatures[path]))
+                    yield path, result
+        finally:
+            # the probes completed so far are kept, even if the scan is interrupted
+            if probed:
+                cache.put(probed)
@@ -6,6 +6,7 @@ from loguru import logger
 
 from src.mpcli.entities.source import ensure_audio_shape
 from src.mpcli.repository.exceptions import AudioTransformError
+from src.mpcli.repository.timing import timed_stage
 
 
 def get_duration(data: np.ndarray, sample_rate: int) -> float:
@@ -42,10 +43,16 @@ def normalize_loudness(
 
     samples = ensure_audio_shape(samples)
 
-    # measure the loudness first
-    loudness = get_loudness(samples, sample_rate)
+    with timed_stage("loudness"):
+        # measure the loudness first
+        loudness = get_loudness(samples, sample_rate)
 
-    loudness_normalized_audio = pyln.normalize.loudness(samples, loudness, lufs)
+        # the gain applied by `pyln.normalize.loudness`, without the copy of its clipping check
+        gain = 10.0 ** ((lufs - loudness) / 20.0)
+        loudness_normalized_audio = samples * gain
+
+    if max(loudness_normalized_audio.max(), -loudness_normalized_audio.min()) > 1.0:
+        logger.warning("Possible clipped samples in the normalized audio")
 
     logger.debug(f"Normalized from {loudness} LUFS to {lufs} LUFS, sr: {sample_rate}")
 
@@ -86,9 +93,11 @@ def time_stretch(
         # not (frames, channels) as we're used to
         samples = ensure_audio_shape(samples)
 
-        samples = samples.astype(np.float32).T
+        # the decoded samples are float32 already, they're not copied
+        samples = samples.astype(np.float32, copy=False).T
 
-        new_samples = augmenter(samples=samples, sample_rate=sample_rate)
+        with timed_stage("stretch"):
+            new_samples = augmenter(samples=samples, sample_rate=sample_rate)
 
         old_duration = get_duration(samples, sample_rate)
         new_duration = get_duration(new_samples, sample_rate)
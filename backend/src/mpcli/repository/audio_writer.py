@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Literal, Self
+
+import numpy as np
+
+from src.mpcli.entities.source import AudioFileHandle
+from src.mpcli.repository.audio_file import save_audio_file
+
+
+class AudioFileWriter:
+    """Background stage encoding and writing audio files on a thread pool,
+    so that encoding and disk writes overlap with the processing of the next file.
+
+    At most ``max_pending`` writes are queued or running at the same time:
+    `submit` blocks when the queue is full (back-pressure), which bounds the number
+    of decoded buffers kept in memory while waiting to be written.
+
+    Example:
+    ```python
+    with AudioFileWriter() as writer:
+        future = writer.submit(output_dir, "my_file", data, 44100, "wav")
+        ...
+        handle = future.result()
+    ```
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 4):
+
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+
+        if max_pending < max_workers:
+            raise ValueError(
+                f"max_pending ({max_pending}) cannot be lower than max_workers ({max_workers})"
+            )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="audio-writer"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(
+        self,
+        output_dir: Path,
+        filename: str,
+        data: np.ndarray,
+        sample_rate: int,
+        format: Literal["wav", "mp3"] = "wav",
+    ) -> Future[AudioFileHandle]:
+        """Queue the audio samples to be written by `save_audio_file`.
+
+        Blocks until a slot is available when ``max_pending`` writes are already in flight.
+
+        Returns:
+            Future[AudioFileHandle]: resolves to the handle of the written file,
+                or raises `InvalidAudioFileError` if the file could not be written.
+        """
+
+        self._slots.acquire()
+
+        try:
+            future = self._executor.submit(
+                save_audio_file,
+                output_dir=output_dir,
+                filename=filename,
+                data=data,
+                sample_rate=sample_rate,
+                format=format,
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+
+        return future
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting new writes, by default waits for the pending ones to complete"""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(wait=True)
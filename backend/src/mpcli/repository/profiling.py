@@ -0,0 +1,145 @@
+import cProfile
+import os
+import random
+import re
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Generator, Optional, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src.mpcli.entities.source import AudioSource
+
+R = TypeVar("R")
+
+
+class ProfilingSettings(BaseModel):
+    """Settings of the profiling of the CLI jobs and of the API requests, read from the environment:
+    the profiling is disabled unless a ``directory`` is set"""
+
+    directory: Optional[Path] = Field(
+        default=None, description="directory the profiles and the allocation snapshots are written to"
+    )
+    sample_rate: float = Field(
+        default=1.0,
+        ge=0.0,
+        le=1.0,
+        description="fraction of the files processed by the CLI, or of the API requests, which are profiled",
+    )
+    frames: int = Field(
+        default=10, ge=1, description="frames of the traceback stored by tracemalloc for each allocation"
+    )
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.sample_rate > 0
+
+    @classmethod
+    def from_env(cls) -> "ProfilingSettings":
+
+        variables = {
+            "directory": "MPCLI_PROFILE_DIR",
+            "sample_rate": "MPCLI_PROFILE_SAMPLE_RATE",
+            "frames": "MPCLI_PROFILE_FRAMES",
+        }
+
+        return cls(
+            **{
+                name: os.environ[variable]
+                for name, variable in variables.items()
+                if variable in os.environ
+            }
+        )
+
+
+# read once, the worker processes read the same environment
+settings = ProfilingSettings.from_env()
+
+# the directory and the name of the profiles of the calls made in the current context, see `profile_calls`
+_profiled_calls: ContextVar[Optional[tuple[Path, str]]] = ContextVar("profiled_calls", default=None)
+
+
+def profile_name(*parts: Optional[str]) -> str:
+    """a unique file name made of the parts, e.g. the command and the source, and of the time"""
+
+    name = ".".join(re.sub(r"[^\w-]+", "_", part).strip("_") for part in parts if part)
+    return f"{name}.{datetime.now():%Y%m%dT%H%M%S}.{uuid.uuid4().hex[:8]}"
+
+
+@contextmanager
+def profiled(directory: Path, name: str, frames: int = 10) -> Generator[None, None, None]:
+    """Profile the block with cProfile and trace its allocations with tracemalloc,
+    the profile is written to ``directory/name.prof`` (read it with `pstats` or snakeviz)
+    and the allocations alive at the end of the block to ``directory/name.snapshot``
+    (read it with `tracemalloc.Snapshot.load`)."""
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(frames)
+    tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(directory / f"{name}.prof")
+            snapshot.dump(str(directory / f"{name}.snapshot"))
+            logger.info(f"Profile '{name}' written to '{directory}', peak memory {peak / 2**20:.1f} MiB")
+        except OSError as e:
+            logger.error(f"Cannot write the profile '{name}' to '{directory}': {e}")
+
+
+def maybe_profiled(*parts: Optional[str]) -> ContextManager[None]:
+    """Profile the block as `profiled` does when the profiling is enabled and the block is sampled,
+    the profile being named after the parts (e.g. the command and the source): otherwise nothing is done"""
+
+    if not settings.enabled or random.random() >= settings.sample_rate:
+        return nullcontext()
+
+    return profiled(settings.directory, profile_name(*parts), settings.frames)
+
+
+@contextmanager
+def profile_calls(directory: Path, name: str) -> Generator[None, None, None]:
+    """Profile the calls made within to the worker processes, e.g. by an API request:
+    their profiles are written to ``directory``, named after ``name`` and their source,
+    see `call_profiled`"""
+
+    token = _profiled_calls.set((directory, name))
+
+    try:
+        yield
+    finally:
+        _profiled_calls.reset(token)
+
+
+def profiled_calls() -> Optional[tuple[Path, str]]:
+    """the directory and the name of the profiles of the calls made in the current context,
+    None when they aren't profiled"""
+    return _profiled_calls.get()
+
+
+def call_profiled(directory: Path, name: str, fn: Callable[..., R], *args: Any) -> R:
+    """call ``fn(*args)`` under `profiled`, e.g. in a worker process: the profile is named
+    after ``name`` and the name of the first `AudioSource` argument, if any"""
+
+    source = next((arg.name for arg in args if isinstance(arg, AudioSource)), None)
+
+    with profiled(directory, profile_name(name, source), settings.frames):
+        return fn(*args)
@@ -0,0 +1,251 @@
+import heapq
+import os
+from pathlib import Path
+from typing import Iterable, Optional, TypeVar
+
+import soundfile as sf
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src.mpcli.entities.pipeline import PipelineStage, TimeStretchStage
+from src.mpcli.entities.source import AudioSource, AudioSourceError
+
+T = TypeVar("T")
+
+DEFAULT_COST_MODEL_PATH = Path(
+    os.environ.get(
+        "MPCLI_COST_MODEL", Path.home() / ".cache" / "mpcli" / "cost-model.json"
+    )
+)
+
+# bitrate assumed for the files which cannot be probed, in bytes per second (~192 kbps)
+FALLBACK_BYTES_PER_SECOND = 24_000
+
+
+class SourceProbe(BaseModel):
+    duration: float = Field(..., description="duration of the audio in seconds")
+    channels: int = Field(default=2, description="number of channels")
+    sample_rate: int = Field(default=44100, description="sample rate of the audio in Hz")
+
+
+def probe_source(path: Path) -> SourceProbe:
+    """Read the header of the audio file to get its duration and number of channels,
+    when the header cannot be read the duration is estimated from the size of the file"""
+
+    try:
+        info = sf.info(str(path))
+        return SourceProbe(
+            duration=info.duration, channels=info.channels, sample_rate=info.samplerate
+        )
+    except Exception:
+        size = path.stat().st_size if path.exists() else 0
+        return SourceProbe(duration=size / FALLBACK_BYTES_PER_SECOND)
+
+
+def probe_audio_source(source: AudioSource) -> SourceProbe:
+    """Probe the source as `probe_source` does, the duration being the one of its segment"""
+
+    if source.audio_path is not None:
+        probe = probe_source(source.audio_path)
+    else:
+        try:
+            with source.open() as audio:
+                info = sf.info(audio)
+            probe = SourceProbe(
+                duration=info.duration, channels=info.channels, sample_rate=info.samplerate
+            )
+        except Exception:
+            probe = SourceProbe(duration=len(source.audio_bytes) / FALLBACK_BYTES_PER_SECOND)
+
+    if source.segment is not None:
+        length = round(probe.duration * probe.sample_rate)
+        try:
+            start, stop = source.segment.frames(probe.sample_rate, length)
+            probe.duration = (stop - start) / probe.sample_rate
+        except AudioSourceError:
+            # the use case fails on the segment, nothing is decoded
+            probe.duration = 0.0
+
+    return probe
+
+
+class CostModel(BaseModel):
+    """Estimates the processing time of a job, per operation (i.e. per section of the config):
+
+        cost = overhead + rate * duration * channels
+
+    The rates are calibrated from the timings of the past runs.
+    """
+
+    # seconds of processing per second of audio and per channel
+    rates: dict[str, float] = Field(
+        default_factory=lambda: {
+            "detect_tempo": 0.02,
+            "timestretch": 0.05,
+            "convert": 0.01,
+            "normalize": 0.005,
+            "pipeline": 0.05,
+        }
+    )
+    # fixed cost of a job, in seconds
+    overhead: float = 0.05
+    default_rate: float = 0.05
+
+    # weight of a new observation when calibrating the rates
+    smoothing: float = 0.3
+
+    def estimate(self, operation: str, probe: SourceProbe) -> float:
+        rate = self.rates.get(operation, self.default_rate)
+        return self.overhead + rate * probe.duration * probe.channels
+
+    def calibrate(
+        self, operation: str, observations: Iterable[tuple[SourceProbe, float]]
+    ) -> None:
+        """Update the rate of the operation from (probe, elapsed seconds) observations"""
+
+        for probe, elapsed in observations:
+
+            work = probe.duration * probe.channels
+            if work <= 0:
+                continue
+
+            observed_rate = max(elapsed - self.overhead, 0.0) / work
+            rate = self.rates.get(operation, self.default_rate)
+
+            self.rates[operation] = (
+                1 - self.smoothing
+            ) * rate + self.smoothing * observed_rate
+
+
+class MemoryModel(BaseModel):
+    """Estimates the peak memory of a job in bytes, per operation:
+
+        peak = overhead + (copies + stretched copies / rate) * decoded size
+
+    The decoded size is the one of the float32 samples of the source: the use cases
+    hold several copies of them at once, e.g. the decoded, the stretched and the encoded audio.
+    The output of a time stretch by a rate r is 1/r times longer than the source, so the copies
+    of the stretched audio are scaled by 1/r: a rate of 0.1 gives an output 10 times longer.
+    The copies are measured on the use cases, with a margin for the buffers of the native libraries.
+    """
+
+    copies: dict[str, float] = Field(
+        default_factory=lambda: {
+            "detect_tempo": 2.5,
+            "timestretch": 1.0,
+            "convert": 3.0,
+            # the loudness is measured channel by channel in float64, mono audio is the worst case
+            "normalize": 6.5,
+            "pipeline": 1.0,
+        }
+    )
+    # the copies of the stretched audio, for a rate of 1
+    stretched_copies: dict[str, float] = Field(
+        default_factory=lambda: {
+            "timestretch": 2.0,
+            # the stretched audio is normalized and encoded
+            "pipeline": 6.0,
+        }
+    )
+    # the buffers of a job whatever its size, e.g. the encoder of the output
+    overhead: int = 16 * 1024 * 1024
+    default_copies: float = 8.0
+    # the rate assumed when the tempo of the source, which gives the rate, isn't estimated yet
+    unknown_rate: float = 0.5
+
+    def estimate(self, operation: str, probe: SourceProbe, rate: Optional[float] = 1.0) -> int:
+        """the peak memory of the operation on the source, time stretched by ``rate`` at the lowest
+        (None when the rate isn't known yet)"""
+
+        decoded = probe.duration * probe.sample_rate * probe.channels * 4
+        copies = self.copies.get(operation, self.default_copies)
+        copies += self.stretched_copies.get(operation, 0.0) / (rate or self.unknown_rate)
+
+        return int(self.overhead + copies * decoded)
+
+
+def stretch_rate(
+    target_tempo: Optional[float],
+    min_rate: Optional[float],
+    max_rate: Optional[float],
+    original_tempo: Optional[float] = None,
+) -> Optional[float]:
+    """The lowest rate of a time stretch, which gives the longest output, as computed by the use case:
+    the rates when given, otherwise the ratio of the target tempo to the original tempo.
+    None when it depends on the original tempo, which isn't known."""
+
+    if min_rate not in (None, 1) or max_rate not in (None, 1):
+        return min(rate for rate in (min_rate, max_rate) if rate is not None)
+
+    if target_tempo is None:
+        return 1.0
+
+    return target_tempo / original_tempo if original_tempo else None
+
+
+def pipeline_stretch_rate(
+    stages: list[PipelineStage], original_tempo: Optional[float] = None
+) -> Optional[float]:
+    """The lowest product of the rates of the time stretches of the pipeline, from its first stage:
+    the audio is the longest after this stretch. None when it depends on an unknown tempo."""
+
+    rate = lowest = 1.0
+
+    for stage in stages:
+        if not isinstance(stage, TimeStretchStage):
+            continue
+
+        # as in `process_samples`, a target tempo is relative to the tempo of the source
+        stage_rate = stretch_rate(stage.target_tempo, stage.min_rate, stage.max_rate, original_tempo)
+        if stage_rate is None:
+            return None
+
+        rate *= stage_rate
+        lowest = min(lowest, rate)
+
+    return lowest
+
+
+def load_cost_model(path: Path = DEFAULT_COST_MODEL_PATH) -> CostModel:
+
+    if path.exists():
+        try:
+            return CostModel.model_validate_json(path.read_text())
+        except Exception as e:
+            logger.warning(f"Ignoring the invalid cost model '{path}': {e}")
+
+    return CostModel()
+
+
+def save_cost_model(model: CostModel, path: Path = DEFAULT_COST_MODEL_PATH) -> None:
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(model.model_dump_json(indent=2))
+    except OSError as e:
+        logger.warning(f"Cannot save the cost model to '{path}': {e}")
+
+
+def longest_first(items: list[T], costs: list[float]) -> tuple[list[T], list[float]]:
+    """Order the items by decreasing cost (longest processing time first),
+    so that the long jobs don't end up alone at the end of a parallel batch"""
+
+    order = sorted(range(len(items)), key=lambda i: costs[i], reverse=True)
+
+    return [items[i] for i in order], [costs[i] for i in order]
+
+
+def estimate_makespan(costs: list[float], workers: int) -> float:
+    """Simulate the dispatch of the jobs, in order, to the first available worker
+    and return the time when the last one completes"""
+
+    if not costs:
+        return 0.0
+
+    # time when each worker is available
+    available = [0.0] * min(workers, len(costs))
+
+    for cost in costs:
+        heapq.heappush(available, heapq.heappop(available) + cost)
+
+    return max(available)
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Generator
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class SharedArray(BaseModel):
+    """Handle of an array stored in shared memory: the handle is sent to the other processes,
+    which map the array without copying it"""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def _untrack(memory: SharedMemory) -> None:
+    """The resource tracker of the process which creates or attaches a block unlinks it
+    when the process exits: the block is handed over to another process, which unlinks it"""
+
+    # there's no `track=False` before python 3.13
+    resource_tracker.unregister(memory._name, "shared_memory")  # type: ignore[attr-defined]
+
+
+def share_array(array: np.ndarray) -> SharedArray:
+    """Copy the array to a new block of shared memory, the block must be released
+    by the process which receives the handle, with `release_array`"""
+
+    memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+    except BaseException:
+        memory.close()
+        memory.unlink()
+        raise
+
+    _untrack(memory)
+    memory.close()
+
+    return SharedArray(name=memory.name, shape=array.shape, dtype=str(array.dtype))
+
+
+@contextmanager
+def attach_array(shared: SharedArray) -> Generator[np.ndarray, None, None]:
+    """Map the shared array, without copying it: the array must not be used after the exit"""
+
+    memory = SharedMemory(name=shared.name)
+    _untrack(memory)
+
+    try:
+        yield np.ndarray(shared.shape, dtype=shared.dtype, buffer=memory.buf)
+    finally:
+        try:
+            memory.close()
+        except BufferError:
+            # a view is still referenced, e.g. by a traceback: the mapping goes with it
+            pass
+
+
+def release_array(shared: SharedArray) -> None:
+    """Remove the block of shared memory of the array"""
+
+    try:
+        memory = SharedMemory(name=shared.name)
+    except FileNotFoundError:
+        return
+
+    memory.close()
+    memory.unlink()
@@ -0,0 +1,166 @@
+from typing import Generator, Optional
+
+import numpy as np
+import python_stretch
+from pydantic import BaseModel, ConfigDict
+
+from src.mpcli.repository.exceptions import AudioTransformError
+from src.mpcli.repository.timing import timed_stage
+
+# the rates accepted by the stretcher, the same as the ones of `time_stretch`
+MIN_RATE = 0.1
+MAX_RATE = 10.0
+
+# frames of input before and after each block: the stretcher output is degraded
+# over its latency at both ends of the processed signal, these frames are dropped
+CONTEXT_FRAMES = 6144
+
+# frames of output over which two consecutive blocks are crossfaded
+FADE_FRAMES = 512
+
+
+def stretch_samples(samples: np.ndarray, sample_rate: int, rate: float) -> np.ndarray:
+    """Worker task: time stretch the samples of shape (frames, channels) by ``rate``
+    with the signalsmith stretcher, without the randomization of `time_stretch`.
+
+    Returns:
+        np.ndarray: the stretched float32 samples, of shape (frames / rate, channels)
+    """
+
+    stretch = python_stretch.Signalsmith.Stretch()
+    stretch.preset(samples.shape[1], sample_rate)
+    stretch.setTimeFactor(rate)
+
+    with timed_stage("stretch"):
+        stretched = stretch.process(np.ascontiguousarray(samples.T, dtype=np.float32))
+
+    return stretched.T
+
+
+class StretchWindow(BaseModel):
+    """A block of the stream to stretch, along with the input around it"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    samples: np.ndarray
+    rate: float
+    # the frames of the block in the samples, the others are context
+    start: int
+    stop: int
+    last: bool = False
+
+
+class StreamStretcher:
+    """Time stretches a stream of audio by a rate which may change over time, block by block.
+
+    The signalsmith stretcher processes each call as a whole signal: every block is stretched
+    along with the ``context`` frames around it, only the output of the block is kept,
+    and consecutive blocks are crossfaded. The output of a block is available once
+    the ``context`` frames following it are received: the latency is ``block + context`` frames.
+
+    The stretching itself is left to the caller, e.g. in a worker process with `stretch_samples`:
+
+        stretcher.feed(chunk)
+        for window in stretcher.windows():
+            output = stretcher.assemble(window, stretch_samples(window.samples, sample_rate, window.rate))
+    """
+
+    def __init__(
+        self,
+        channels: int,
+        rate: float = 1.0,
+        block: int = 8192,
+        context: int = CONTEXT_FRAMES,
+        fade: int = FADE_FRAMES,
+    ):
+        self.channels = channels
+        self.block = block
+        self.context = context
+        self.fade = fade
+        self.rate = rate
+
+        # the input not stretched yet, after the context of the next block
+        self._input = np.zeros((0, channels), dtype=np.float32)
+        self._position = 0
+
+        # the output of the previous block beyond its end, faded into the next block
+        self._tail: Optional[np.ndarray] = None
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise AudioTransformError(f"The rate must be between {MIN_RATE} and {MAX_RATE}, got {rate}")
+
+        # applied from the next block
+        self._rate = rate
+
+    @property
+    def pending(self) -> int:
+        """frames received which are not stretched yet"""
+        return len(self._input) - self._position
+
+    def feed(self, samples: np.ndarray) -> None:
+        """append frames of shape (frames, channels) to the stream"""
+
+        if samples.ndim != 2 or samples.shape[1] != self.channels:
+            raise AudioTransformError(
+                f"Expected samples of shape (frames, {self.channels}), got {samples.shape}"
+            )
+
+        self._input = np.concatenate([self._input, samples.astype(np.float32, copy=False)])
+
+    def windows(self, final: bool = False) -> Generator[StretchWindow, None, None]:
+        """The blocks which can be stretched, in order: the ones followed by enough context,
+        or all the remaining frames when the stream is ``final``"""
+
+        while self.pending > 0:
+
+            if not final and self.pending < self.block + self.context:
+                return
+
+            size = min(self.block, self.pending)
+            left = self._position
+            right = min(self._position + size + self.context, len(self._input))
+
+            window = StretchWindow(
+                samples=self._input[self._position - left : right],
+                rate=self.rate,
+                start=left,
+                stop=left + size,
+                last=final and self._position + size == len(self._input),
+            )
+
+            self._position += size
+
+            # only the context of the next block is kept
+            drop = self._position - self.context
+            if drop > 0:
+                self._input = self._input[drop:]
+                self._position -= drop
+
+            yield window
+
+    def assemble(self, window: StretchWindow, stretched: np.ndarray) -> np.ndarray:
+        """The output of the block of the window, from the stretched window samples"""
+
+        scale = len(stretched) / len(window.samples)
+        start = round(window.start * scale)
+        stop = round(window.stop * scale)
+
+        output = stretched[start:stop].copy()
+
+        if self._tail is not None:
+            n = min(len(self._tail), len(output))
+            fade_in = np.linspace(0.0, 1.0, n, endpoint=False, dtype=np.float32)[:, np.newaxis]
+            output[:n] = self._tail[:n] * (1.0 - fade_in) + output[:n] * fade_in
+
+        # the output beyond the block overlaps the start of the next block
+        fade = 0 if window.last else min(self.fade, (len(stretched) - stop) // 2)
+        self._tail = stretched[stop : stop + fade] if fade > 0 else None
+
+        return output
@@ -1,11 +1,32 @@
-from io import BytesIO
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 import audioread
-from tempocnn.classifier import TempoClassifier
-from tempocnn.feature import read_features
+import librosa
+import numpy as np
 
 from src.mpcli.entities.result import TempoResult
-from src.mpcli.entities.source import AudioSource
+from src.mpcli.entities.source import AudioSource, ensure_audio_shape
+from src.mpcli.repository.timing import timed_stage
+
+if TYPE_CHECKING:
+    from tempocnn.classifier import TempoClassifier
+
+
+@lru_cache(maxsize=None)
+def get_tempo_classifier(model_name: str = "cnn") -> "TempoClassifier":
+    """Load the tempo model once per process, it's re-used for all the subsequent estimations"""
+
+    # tempocnn imports tensorflow, which is loaded along with the model and not
+    # when this module is imported: it's heavy, and once loaded before python_stretch
+    # (used by the time stretching) the stretcher crashes
+    import keras
+    from tempocnn.classifier import TempoClassifier
+
+    # the progress bars of the predictions would be mixed with the output of the CLI
+    keras.utils.disable_interactive_logging()
+
+    return TempoClassifier(model_name)
 
 
 def estimate_tempo(source: AudioSource) -> TempoResult:
@@ -18,17 +39,15 @@ def estimate_tempo(source: AudioSource) -> TempoResult:
     Returns:
         TempoResult: The estimated tempo result.
     """
-    model_name = "cnn"
-
-    # initialize the model (may be re-used for multiple files)
-    classifier = TempoClassifier(model_name)
+    classifier = get_tempo_classifier("cnn")
 
     try:
 
-        features = read_features(BytesIO(source.audio_bytes), zero_pad=True)
+        features = read_tempo_features(source)
 
         # estimate the global tempo
-        tempo = classifier.estimate_tempo(features, interpolate=True)
+        with timed_stage("tempo_inference"):
+            tempo = classifier.estimate_tempo(features, interpolate=True)
 
         return TempoResult(
             audio_source=source,
@@ -37,3 +56,122 @@ def estimate_tempo(source: AudioSource) -> TempoResult:
 
     except audioread.exceptions.NoBackendError as e:
         raise ValueError(f"Error processing {source}: {e}")
+
+
+def read_tempo_features(source: AudioSource) -> np.ndarray:
+    """Decode the source and compute the features of the tempo model,
+    the same way `tempocnn.feature.read_features` does with ``zero_pad``.
+
+    Neither the model nor tensorflow are loaded: the features can be computed by
+    processes which send them to the one running the model.
+
+    Returns:
+        np.ndarray: feature tensor of shape (windows, 40, 256, 1)
+    """
+
+    # decoded as `librosa.load(audio, sr=11025)` does, only the segment of the source
+    with timed_stage("decode"):
+        y, sample_rate = source.read(dtype="float32")
+        y = librosa.resample(librosa.to_mono(y.T), orig_sr=sample_rate, target_sr=11025)
+
+    with timed_stage("tempo_features"):
+        return _mel_windows(y)
+
+
+def predict_tempi(features: list[np.ndarray]) -> list[float]:
+    """Estimate the tempi of several signals with a single pass of the model.
+
+    The features of each signal are normalized on their own, as by `TempoClassifier.estimate_tempo`,
+    then the windows of all the signals are run as one batch.
+
+    Args:
+        features (list[np.ndarray]): the feature tensor of each signal, of shape (windows, 40, 256, 1)
+
+    Returns:
+        list[float]: the tempo in BPM of each signal
+    """
+
+    if not features:
+        return []
+
+    classifier = get_tempo_classifier("cnn")
+
+    with timed_stage("tempo_inference"):
+        batch = np.concatenate([classifier.normalize(f) for f in features])
+        predictions = classifier.model.predict(batch, batch.shape[0], verbose=0)
+
+    tempi = []
+    offset = 0
+
+    for f in features:
+        averaged = np.average(predictions[offset : offset + len(f)], axis=0)
+        offset += len(f)
+
+        index, _ = classifier.quad_interpol_argmax(averaged)
+        tempi.append(float(classifier.to_bpm(index)))
+
+    return tempi
+
+
+def _mel_windows(y: np.ndarray, frames: int = 256, hop_length: int = 128) -> np.ndarray:
+    """mel spectrum with 40 bands of a mono signal at 11025 Hz, zero padded
+    and cut into the overlapping windows of the model.
+
+    `tempocnn.feature` does the same, but the `tempocnn` package imports tensorflow.
+    """
+
+    data = librosa.feature.melspectrogram(
+        y=y,
+        sr=11025,
+        n_fft=1024,
+        hop_length=512,
+        power=1,
+        n_mels=40,
+        fmin=20,
+        fmax=5000,
+    )
+
+    # frames/2 zero frames before and after the data
+    length = data.shape[1] + frames
+    padded = np.zeros((1, data.shape[0], length, 1), dtype=data.dtype)
+    padded[0, :, frames // 2 : data.shape[1] + frames // 2, 0] = data
+
+    windows = (length - frames) // hop_length + 1
+
+    return np.concatenate(
+        [padded[:, :, i * hop_length : i * hop_length + frames, :] for i in range(windows)]
+    )
+
+
+def compute_tempo_features(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Compute the features of the tempo model from decoded samples,
+    the same way `read_tempo_features` does from a file:
+    mono mix resampled to 11025 Hz, mel spectrum with 40 bands, sliding windows of 256 frames.
+
+    Args:
+        samples (np.ndarray): audio samples of shape (frames, channels)
+        sample_rate (int): sample rate of the samples in Hz
+
+    Returns:
+        np.ndarray: feature tensor of shape (windows, 40, 256, 1)
+    """
+
+    samples = ensure_audio_shape(samples)
+
+    with timed_stage("tempo_features"):
+        # librosa expects shape (num_channels, num_samples)
+        y = librosa.to_mono(np.ascontiguousarray(samples.T, dtype=np.float32))
+        y = librosa.resample(y, orig_sr=sample_rate, target_sr=11025)
+
+        return _mel_windows(y)
+
+
+def estimate_samples_tempo(samples: np.ndarray, sample_rate: int) -> float:
+    """Estimate the tempo in BPM of already decoded samples of shape (frames, channels)"""
+
+    classifier = get_tempo_classifier("cnn")
+
+    features = compute_tempo_features(samples, sample_rate)
+
+    with timed_stage("tempo_inference"):
+        return float(classifier.estimate_tempo(features, interpolate=True))
@@ -0,0 +1,77 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Generator, Optional, TypeVar
+
+R = TypeVar("R")
+
+# the durations of the stages run in the current context, summed by stage, see `record_stages`
+_recorded_stages: ContextVar[Optional[dict[str, float]]] = ContextVar(
+    "recorded_stages", default=None
+)
+
+
+@contextmanager
+def timed(timings: dict[str, float], stage: str) -> Generator[None, None, None]:
+    """record the duration of the stage in seconds, a stage run several times gets a numbered key"""
+
+    key, count = stage, 1
+    while key in timings:
+        count += 1
+        key = f"{stage}#{count}"
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = round(time.perf_counter() - start, 4)
+
+
+@contextmanager
+def record_stages() -> Generator[dict[str, float], None, None]:
+    """Collect the durations in seconds of the `timed_stage` blocks run within, summed by stage:
+    the stages run by the tasks started within are collected as well"""
+
+    stages: dict[str, float] = {}
+    token = _recorded_stages.set(stages)
+
+    try:
+        yield stages
+    finally:
+        _recorded_stages.reset(token)
+
+
+def add_stages(stages: dict[str, float]) -> None:
+    """add the durations of stages run elsewhere, e.g. in a worker process, to the ones being recorded"""
+
+    recorded = _recorded_stages.get()
+
+    if recorded is not None:
+        for name, duration in stages.items():
+            recorded[name] = recorded.get(name, 0.0) + duration
+
+
+@contextmanager
+def timed_stage(name: str) -> Generator[None, None, None]:
+    """Time the block as a stage of the processing, e.g. decoding or encoding,
+    when the stages are recorded with `record_stages`: otherwise it does nothing"""
+
+    recorded = _recorded_stages.get()
+
+    if recorded is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorded[name] = recorded.get(name, 0.0) + time.perf_counter() - start
+
+
+def call_recorded(fn: Callable[..., R], *args: Any) -> tuple[R, dict[str, float]]:
+    """call ``fn(*args)`` and return its result along with the durations of its stages,
+    for them to be reported by another process or thread"""
+
+    with record_stages() as stages:
+        return fn(*args), stages
@@ -1,14 +1,25 @@
 import tomllib
-from typing import TypeVar
+from typing import Optional, TypeVar
+
+from src.mpcli.entities.shard import Shard
 
 T = TypeVar("T")
 
 
-def read_configurations(config_path: str, section_name: str, entity_type: T) -> list[T]:
+def read_configurations(
+    config_path: str,
+    section_name: str,
+    entity_type: T,
+    optional: bool = False,
+    shard: Optional[Shard] = None,
+) -> list[T]:
     """Read a TOML configuration file and returns a list of entities of type T
     contained in the section `section_name`.
 
     The section can be either a single entity or a list of entities.
+    When ``optional`` is True, a missing section returns an empty list instead of raising an error.
+    When a ``shard`` is given, it's set on each entity (overriding the `shard` of the config, if any)
+    so that only the sources assigned to it are processed.
 
     Example:
     ```toml
@@ -39,10 +50,17 @@ def read_configurations(config_path: str, section_name: str, entity_type: T) ->
         with open(config_path, "rb") as f:
             config = tomllib.load(f)
 
-            if isinstance(config[section_name], list):
-                configs = [entity_type(**item) for item in config[section_name]]
-            else:
-                configs = [entity_type(**config[section_name])]
+            if optional and section_name not in config:
+                return []
+
+            items = config[section_name]
+            if not isinstance(items, list):
+                items = [items]
+
+            if shard is not None:
+                items = [{**item, "shard": shard} for item in items]
+
+            configs = [entity_type(**item) for item in items]
 
         return configs
     except Exception as e:
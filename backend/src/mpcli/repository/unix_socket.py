@@ -0,0 +1,73 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator
+
+
+class UntrustedSocketError(PermissionError):
+    """Raised when a socket, or its directory, may be controlled by another user"""
+
+    pass
+
+
+def default_socket_dir() -> Path:
+    """the directory of the sockets of the resident processes, private to the current user:
+    in ``$XDG_RUNTIME_DIR`` when set, otherwise a directory of the user in the temp directory"""
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+
+    if runtime_dir and Path(runtime_dir).is_dir():
+        return Path(runtime_dir) / "mpcli"
+
+    return Path(tempfile.gettempdir()) / f"mpcli-{os.getuid()}"
+
+
+def check_owner(path: Path) -> None:
+    """Check that the socket, or the directory, at ``path`` belongs to the current user
+
+    Raises:
+        FileNotFoundError: if nothing exists at ``path``
+        UntrustedSocketError: if it belongs to another user
+    """
+
+    if os.stat(path).st_uid != os.getuid():
+        raise UntrustedSocketError(f"'{path}' does not belong to the current user")
+
+
+def make_private_dir(path: Path) -> None:
+    """Create the directory readable by the current user only, before any socket is bound in it
+
+    Raises:
+        UntrustedSocketError: if the directory exists and another user owns it, or may write to it
+    """
+
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    check_owner(path)
+
+    if path.stat().st_mode & 0o077:
+        raise UntrustedSocketError(f"'{path}' is accessible to other users")
+
+
+@contextmanager
+def owner_only() -> Generator[None, None, None]:
+    """create the files within with the permissions 0600, e.g. a socket bound within:
+    it's not accessible to the other users, not even between its creation and a chmod"""
+
+    umask = os.umask(0o177)
+
+    try:
+        yield
+    finally:
+        os.umask(umask)
+
+
+def prepare_socket(path: Path) -> None:
+    """Prepare the binding of a server socket at ``path``: the default directory of the sockets
+    is created private, the directories given by the user are left as they are"""
+
+    if path.parent == default_socket_dir():
+        make_private_dir(path.parent)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,119 @@
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from loguru import logger
+
+from src.mpcli.repository.audio_file import iter_source_paths
+
+# (modification time in ns, size in bytes)
+FileSignature = tuple[int, int]
+
+
+def _signature(path: Path) -> Optional[FileSignature]:
+    try:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+class SourceWatcher:
+    """Polls a source (an audio file or a directory of audio files)
+    and reports the files which are new or changed since the last poll.
+
+    A file is reported once it's stable, i.e. its size and modification time
+    did not change for ``settle`` seconds, so that files still being copied
+    into the directory are not processed partially written.
+
+    Files located in ``exclude`` (e.g. the output directory) are ignored.
+
+    Raises:
+        ValueError: if the source is located in ``exclude``, all its files would be ignored
+    """
+
+    def __init__(
+        self,
+        source_path: str | Path,
+        settle: float = 2.0,
+        exclude: Optional[Path] = None,
+        process_existing: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.source_path = Path(source_path)
+        self.settle = settle
+        self.exclude = exclude.resolve() if exclude is not None else None
+        self._clock = clock
+
+        if self.exclude is not None and self.source_path.resolve().is_relative_to(self.exclude):
+            raise ValueError(
+                f"The source '{self.source_path}' is in the excluded directory '{exclude}', "
+                "none of its files would be processed"
+            )
+
+        # signature of the files already reported
+        self._seen: dict[Path, FileSignature] = {}
+
+        # files waiting to be stable: signature, and since when it did not change
+        self._pending: dict[Path, tuple[FileSignature, float]] = {}
+
+        if not process_existing:
+            for path in self._list():
+                signature = _signature(path)
+                if signature is not None:
+                    self._seen[path] = signature
+
+    def _list(self) -> list[Path]:
+
+        # the source directory may not exist yet
+        if not self.source_path.exists():
+            return []
+
+        try:
+            paths = list(iter_source_paths(self.source_path))
+        except ValueError as e:
+            logger.warning(f"Cannot watch '{self.source_path}': {e}")
+            return []
+
+        if self.exclude is None:
+            return paths
+
+        return [p for p in paths if not p.resolve().is_relative_to(self.exclude)]
+
+    def poll(self) -> list[Path]:
+        """Return the files which are new or changed, and stable for ``settle`` seconds"""
+
+        now = self._clock()
+        ready = []
+
+        paths = self._list()
+
+        for path in paths:
+
+            signature = _signature(path)
+
+            if signature is None or self._seen.get(path) == signature:
+                continue
+
+            pending = self._pending.get(path)
+
+            if pending is None or pending[0] != signature:
+                # new file, or still being written
+                self._pending[path] = (signature, now)
+                pending = self._pending[path]
+
+            if now - pending[1] >= self.settle:
+                ready.append(path)
+                self._seen[path] = signature
+                del self._pending[path]
+
+        # forget the deleted files, they are processed again if re-created
+        existing = set(paths)
+        for path in list(self._seen):
+            if path not in existing:
+                del self._seen[path]
+        for path in list(self._pending):
+            if path not in existing:
+                del self._pending[path]
+
+        return ready
@@ -5,6 +5,7 @@ import soundfile as sf
 from src.mpcli.entities.result import NormalizeResult
 from src.mpcli.entities.source import AudioSource
 from src.mpcli.repository.audio_transform import normalize_loudness
+from src.mpcli.repository.timing import timed_stage
 
 
 def execute_normalization(
@@ -12,12 +13,13 @@ def execute_normalization(
 ) -> NormalizeResult | None:
 
     # convert the audio bytes to a numpy array of samples
-    data, sample_rate = sf.read(io.BytesIO(config.audio_bytes), dtype="float32")
+    with timed_stage("decode"):
+        data, sample_rate = config.read(dtype="float32", always_2d=True)
 
     samples_array = normalize_loudness(data, sample_rate, lufs)
 
     # convert the normalized samples back to bytes
-    with io.BytesIO() as output:
+    with timed_stage("encode"), io.BytesIO() as output:
         sf.write(output, samples_array, sample_rate, format=config.audio_format)
         normalized_audio_bytes = output.getvalue()
 
@@ -0,0 +1,135 @@
+import numpy as np
+from loguru import logger
+
+from src.mpcli.entities.pipeline import (
+    ConvertStage,
+    DetectTempoStage,
+    NormalizeStage,
+    PipelineStage,
+    TimeStretchStage,
+)
+from src.mpcli.entities.result import PipelineResult, PipelineSummary
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.audio_transform import normalize_loudness, time_stretch
+from src.mpcli.repository.tempo import estimate_samples_tempo
+from src.mpcli.repository.timing import timed, timed_stage
+
+
+def process_samples(
+    samples: np.ndarray,
+    sample_rate: int,
+    stages: list[PipelineStage],
+    timings: dict[str, float] | None = None,
+    tempo: float | None = None,
+) -> tuple[np.ndarray, PipelineSummary]:
+    """Run the stages in order on decoded samples, without encoding them.
+
+    Args:
+        samples (np.ndarray): float32 audio samples of shape (frames, channels)
+        sample_rate (int): sample rate of the samples in Hz
+        stages (list[PipelineStage]): the stages to run, in order
+        timings (dict[str, float], optional): timings of the previous steps (e.g. decoding),
+            the timings of the stages are added to it
+        tempo (float, optional): the tempo of the samples when already estimated,
+            e.g. by the batched model of the API, it's estimated by the stages otherwise
+
+    Returns:
+        tuple[np.ndarray, PipelineSummary]: the processed samples of shape (frames, channels)
+            and the summary of the stages (tempi, loudness, output format, timings)
+    """
+
+    summary = PipelineSummary(timings=timings if timings is not None else {})
+
+    for stage in stages:
+
+        with timed(summary.timings, stage.operation):
+
+            match stage:
+
+                case DetectTempoStage():
+                    summary.original_tempo = (
+                        tempo if tempo is not None else estimate_samples_tempo(samples, sample_rate)
+                    )
+
+                case TimeStretchStage():
+
+                    min_rate, max_rate = stage.min_rate, stage.max_rate
+
+                    if stage.target_tempo is not None:
+                        if summary.original_tempo is None:
+                            summary.original_tempo = (
+                                tempo
+                                if tempo is not None
+                                else estimate_samples_tempo(samples, sample_rate)
+                            )
+                        min_rate = max_rate = stage.target_tempo / summary.original_tempo
+
+                    if min_rate == 1 and max_rate == 1:
+                        logger.info("time stretch rate is 1.0, skipping time stretching")
+                        continue
+
+                    samples = time_stretch(samples, sample_rate, min_rate, max_rate)
+
+                    # the tempo of the samples changed
+                    tempo = None
+
+                    if stage.target_tempo is not None:
+                        summary.target_tempo = stage.target_tempo
+                    elif summary.original_tempo is not None:
+                        summary.target_tempo = round(
+                            summary.original_tempo * (min_rate + max_rate) / 2, 2
+                        )
+
+                case NormalizeStage():
+                    samples = normalize_loudness(samples, sample_rate, stage.lufs)
+                    summary.lufs = stage.lufs
+
+                case ConvertStage():
+                    summary.target_format = stage.target_format
+
+    return samples, summary
+
+
+def execute_pipeline(
+    source: AudioSource,
+    stages: list[PipelineStage],
+    original_tempo: float | None = None,
+) -> PipelineResult:
+    """Run a chain of operations (tempo detection, time stretch, normalization, conversion)
+    on a single decoded float32 buffer: the source is decoded once and the result encoded once.
+
+    The output format is the one of the last `ConvertStage`, or the format of the source.
+
+    Args:
+        source (AudioSource): Source audio file.
+        stages (list[PipelineStage]): the stages to run, in order.
+        original_tempo (float, optional): the tempo of the source when already estimated.
+
+    Returns:
+        PipelineResult: the processed audio and the duration of each stage, decoding and encoding included.
+    """
+
+    timings: dict[str, float] = {}
+
+    with timed(timings, "decode"), timed_stage("decode"):
+        samples, sample_rate = source.read(dtype="float32", always_2d=True)
+
+    samples, summary = process_samples(
+        samples, sample_rate, stages, timings, tempo=original_tempo
+    )
+
+    audio_format = summary.target_format or source.audio_format
+
+    with timed(summary.timings, "encode"), timed_stage("encode"):
+        converted_audio = AudioSource.from_array(
+            data=samples,
+            audio_format=audio_format,
+            sample_rate=sample_rate,
+            name=source.name,
+        )
+
+    return PipelineResult(
+        audio_source=source,
+        converted_audio=converted_audio,
+        **summary.model_dump(),
+    )
@@ -1,6 +1,8 @@
+import numpy as np
+
 from src.mpcli.entities.result import TempoResult
-from src.mpcli.entities.source import AudioSource
-from src.mpcli.repository.tempo import estimate_tempo
+from src.mpcli.entities.source import AudioSource, AudioSourceError
+from src.mpcli.repository.tempo import estimate_tempo, read_tempo_features
 
 
 def execute_tempo_estimation(
@@ -8,3 +10,20 @@ def execute_tempo_estimation(
 ) -> TempoResult | None:
 
     return estimate_tempo(config)
+
+
+def execute_tempo_features(source: AudioSource) -> np.ndarray:
+    """Compute the features of the tempo model, for the tempo to be estimated elsewhere,
+    e.g. in a batch with the features of other sources
+
+    Raises:
+        AudioSourceError: if the segment of the source starts after the end of the audio
+        ValueError: if the source cannot be decoded
+    """
+
+    try:
+        return read_tempo_features(source)
+    except AudioSourceError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error processing {source.name}: {e}")
@@ -1,9 +1,10 @@
 from loguru import logger
 
-from src.mpcli.entities.result import TimeStretchResult
+from src.mpcli.entities.result import TempoResult, TimeStretchResult
 from src.mpcli.entities.source import AudioSource
 from src.mpcli.repository.audio_transform import time_stretch
 from src.mpcli.repository.tempo import estimate_tempo
+from src.mpcli.repository.timing import timed_stage
 
 
 def execute_timestretch(
@@ -11,6 +12,7 @@ def execute_timestretch(
     target_tempo: float | None = None,
     min_rate: float = 1.0,
     max_rate: float = 1.0,
+    original_tempo: float | None = None,
 ) -> TimeStretchResult | None:
     """Execute time stretching on audio files based on the provided configuration.
 
@@ -29,13 +31,18 @@ def execute_timestretch(
         target_tempo (float, optional): Desired tempo for the output audio file. If not provided, the original tempo will be used. Defaults to None.
         min_rate (float, optional): Minimum time stretch factor. Defaults to 1.0 (no time stretch).
         max_rate (float, optional): Maximum time stretch factor. Defaults to 1.0
+        original_tempo (float, optional): Tempo of the source when it's known already,
+            e.g. estimated in a batch with other sources. Estimated when not provided.
 
     Returns:
         TimeStretchResult | None: Result of the time stretching operation.
     """
 
     # estimate the global tempo
-    estimate = estimate_tempo(source)
+    if original_tempo is not None:
+        estimate = TempoResult(audio_source=source, tempo=original_tempo)
+    else:
+        estimate = estimate_tempo(source)
 
     # special case when min_rate == max_rate == 1, we can skip the time stretching and return the original audio source
     if min_rate == 1 and max_rate == 1:
@@ -44,7 +51,7 @@ def execute_timestretch(
         )
         return TimeStretchResult(
             audio_source=source,
-            converted_audio=source,
+            converted_audio=source.extract(),
             original_tempo=estimate.tempo,
             target_tempo=estimate.tempo,
         )
@@ -70,16 +77,18 @@ def execute_timestretch(
         )
         return None
 
-    data = source.to_array()
+    with timed_stage("decode"):
+        data = source.to_array()
 
     augmented_samples = time_stretch(data, source.sample_rate, min_rate, max_rate)
 
     # convert the time-stretched samples back to bytes
-    converted_audio = AudioSource.from_array(
-        data=augmented_samples,
-        audio_format=source.audio_format,
-        sample_rate=source.sample_rate,
-    )
+    with timed_stage("encode"):
+        converted_audio = AudioSource.from_array(
+            data=augmented_samples,
+            audio_format=source.audio_format,
+            sample_rate=source.sample_rate,
+        )
 
     return TimeStretchResult(
         audio_source=source,
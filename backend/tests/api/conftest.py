@@ -0,0 +1,14 @@
+import pytest
+
+from src.mpcli import api
+from src.mpcli.api_cache import ResultCache
+
+
+@pytest.fixture(autouse=True)
+def result_cache(tmp_path, monkeypatch):
+    """an empty cache of the results for each test, so that the use cases are run"""
+
+    cache = ResultCache(tmp_path / "results", memory_size=64 * 1024 * 1024, disk_size=1024 * 1024 * 1024)
+    monkeypatch.setattr(api, "result_cache", cache)
+
+    return cache
@@ -0,0 +1,130 @@
+import io
+import json
+import zipfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.mpcli import api
+from src.mpcli.api import app
+from src.mpcli.api_pool import ServerBusyError
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_batch_tempo_files_and_zip(wav_source_path, mp3_source_path):
+
+    # given
+    client = TestClient(app)
+
+    wav_bytes = Path(wav_source_path).read_bytes()
+    mp3_bytes = Path(mp3_source_path).read_bytes()
+    archive = _zip(
+        {
+            "album/track.mp3": mp3_bytes,
+            "album/notes.txt": b"skipped",
+            "__MACOSX/album/._track.mp3": b"skipped",
+        }
+    )
+
+    # when
+    response = client.post(
+        "/batch/tempo",
+        files=[
+            ("files", ("a.wav", wav_bytes)),
+            ("files", ("b.txt", b"not audio")),
+            ("files", ("album.zip", archive)),
+        ],
+    )
+
+    # then the results are in the order of the upload, the archive replaced by its audio files
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["source_name"] for r in results] == ["a.wav", "b.txt", "track.mp3"]
+    assert results[0]["tempo"] > 0 and results[2]["tempo"] > 0
+    assert results[1]["tempo"] is None and results[1]["error"]
+
+
+def test_batch_tempo_invalid_zip():
+
+    # given
+    client = TestClient(app)
+
+    # when
+    response = client.post("/batch/tempo", files=[("files", ("album.zip", b"not a zip"))])
+
+    # then
+    assert response.status_code == 422
+
+
+def test_batch_tempo_zip_too_large(monkeypatch, wav_source_path):
+
+    # given an archive whose audio files exceed the limit once extracted
+    client = TestClient(app)
+    monkeypatch.setattr(api.worker_pool.settings, "max_upload_size", 1024)
+
+    archive = _zip({"a.wav": bytes(2048)})
+
+    # when
+    response = client.post("/batch/tempo", files=[("files", ("album.zip", archive))])
+
+    # then
+    assert response.status_code == 413
+
+
+def test_batch_normalize_returns_zip(wav_source_path):
+
+    # given
+    client = TestClient(app)
+
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when the same file is uploaded twice
+    response = client.post(
+        "/batch/normalize",
+        files=[
+            ("files", ("a.wav", wav_bytes)),
+            ("files", ("a.wav", wav_bytes)),
+            ("files", ("b.txt", b"not audio")),
+        ],
+        data={"lufs": "-16"},
+    )
+
+    # then
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        report = json.loads(archive.read("results.json"))
+
+    assert sorted(names) == ["a_normalized (1).wav", "a_normalized.wav", "results.json"]
+    assert [r.get("output") for r in report] == ["a_normalized.wav", "a_normalized (1).wav", None]
+    assert report[2]["error"]
+
+
+def test_batch_normalize_server_busy(monkeypatch, wav_source_path):
+
+    # given
+    client = TestClient(app)
+
+    async def busy(*args, **kwargs):
+        raise ServerBusyError(retry_after=7)
+
+    monkeypatch.setattr(api.worker_pool, "run", busy)
+
+    # when
+    response = client.post(
+        "/batch/normalize",
+        files=[("files", ("a.wav", Path(wav_source_path).read_bytes()))],
+    )
+
+    # then the whole batch is rejected
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
@@ -0,0 +1,177 @@
+import asyncio
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.mpcli import api
+from src.mpcli.api import app
+from src.mpcli.api_cache import ResultCache, cache_key
+
+
+def _result_file(tmp_path: Path, name: str, size: int) -> Path:
+    path = tmp_path / name
+    path.write_bytes(bytes(size))
+    return path
+
+
+def test_cache_key_normalizes_parameters():
+
+    # when
+    key = cache_key("digest", "timestretch", target_tempo=95, min_rate=1.0, max_rate=1)
+
+    # then
+    assert key == cache_key("digest", "timestretch", max_rate=1.0, min_rate=1, target_tempo=95.0)
+    assert key != cache_key("digest", "timestretch", target_tempo=96, min_rate=1, max_rate=1)
+    assert key != cache_key("other", "timestretch", target_tempo=95, min_rate=1, max_rate=1)
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+
+    async def scenario():
+
+        # given a full memory tier, without disk tier
+        cache = ResultCache(tmp_path / "results", memory_size=8 * 25, disk_size=0)
+        for key in "abcdefgh":
+            await cache.put(key, _result_file(tmp_path, key, 25))
+
+        # when
+        await cache.get("a")
+        await cache.put("i", _result_file(tmp_path, "i", 25))
+
+        # then
+        assert (await cache.get("a")).content == bytes(25)
+        assert await cache.get("b") is None
+        assert cache.stats.memory_size == 200
+
+    asyncio.run(scenario())
+
+
+def test_disk_tier_respects_byte_budget_and_survives_restart(tmp_path):
+
+    async def scenario():
+
+        # given
+        cache = ResultCache(tmp_path / "results", memory_size=0, disk_size=250)
+        await cache.put("a", _result_file(tmp_path, "a", 100), media_type="audio/wav")
+        await cache.put("b", _result_file(tmp_path, "b", 100))
+
+        # when over budget
+        await cache.put("c", _result_file(tmp_path, "c", 100))
+
+        # then the least recently used entry is removed
+        assert cache.stats.disk_size == 200
+        assert not (tmp_path / "results" / "a").exists()
+
+        # when the server restarts
+        restarted = ResultCache(tmp_path / "results", memory_size=0, disk_size=250)
+
+        # then
+        assert await restarted.get("a") is None
+        with (await restarted.get("c")).file as file:
+            assert file.read() == bytes(100)
+        assert restarted.stats.disk_entries == 2
+
+    asyncio.run(scenario())
+
+
+def test_result_evicted_while_sent_is_read_whole(tmp_path):
+
+    async def scenario():
+
+        # given a result on disk, got for a response
+        cache = ResultCache(tmp_path / "results", memory_size=0, disk_size=150)
+        await cache.put("a", _result_file(tmp_path, "a", 100))
+        result = await cache.get("a")
+
+        # when it's evicted before the response reads it
+        await cache.put("b", _result_file(tmp_path, "b", 100))
+
+        # then
+        assert not (tmp_path / "results" / "a").exists()
+        with result.file as file:
+            assert file.read() == bytes(100)
+
+    asyncio.run(scenario())
+
+
+def test_result_too_large_is_transient(tmp_path):
+
+    async def scenario():
+
+        # given
+        cache = ResultCache(tmp_path / "results", memory_size=0, disk_size=10)
+        path = _result_file(tmp_path, "a", 100)
+
+        # when
+        result = await cache.put("a", path)
+
+        # then the file is left for the response to remove it
+        assert result.transient and result.path == path
+        assert await cache.get("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_normalize_is_served_from_cache(wav_source_path, monkeypatch):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    first = client.post(
+        "/normalize", files={"file": ("a.wav", wav_bytes)}, data={"lufs": "-14"}
+    )
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("the use case must not run again")
+
+    monkeypatch.setattr(api.worker_pool, "run", fail)
+
+    # when the same file is uploaded again, under another name
+    second = client.post(
+        "/normalize", files={"file": ("b.wav", wav_bytes)}, data={"lufs": "-14.0"}
+    )
+
+    # then
+    assert first.status_code == 200 and second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert "b_normalized.wav" in second.headers["content-disposition"]
+
+    stats = client.get("/cache").json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_convert_target_format_is_case_insensitive(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    lower = client.post("/convert", files={"file": ("a.wav", wav_bytes)}, data={"target_format": "mp3"})
+    upper = client.post("/convert", files={"file": ("a.wav", wav_bytes)}, data={"target_format": "MP3"})
+
+    # then the same result is served
+    assert lower.status_code == 200 and upper.status_code == 200
+    assert upper.headers["etag"] == lower.headers["etag"]
+    assert client.get("/cache").json()["hits"] == 1
+
+
+def test_tempo_not_modified(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    etag = client.post("/tempo", files={"file": ("a.wav", wav_bytes)}).headers["etag"]
+
+    # when
+    response = client.post(
+        "/tempo", files={"file": ("a.wav", wav_bytes)}, headers={"If-None-Match": etag}
+    )
+
+    # then
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
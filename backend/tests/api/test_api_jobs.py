@@ -0,0 +1,194 @@
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.mpcli import api
+from src.mpcli.api import app
+from src.mpcli.api_jobs import (
+    JobRecord,
+    JobStatus,
+    JobStore,
+    NormalizeJobParameters,
+)
+from src.mpcli.entities.source import AudioSource
+
+
+def _job(job_id: str, created_at: datetime, status=JobStatus.queued) -> JobRecord:
+    return JobRecord(
+        id=job_id,
+        status=status,
+        parameters=NormalizeJobParameters(lufs=-14),
+        source=AudioSource(audio_path=Path(f"/tmp/{job_id}.wav"), audio_format="wav"),
+        created_at=created_at,
+    )
+
+
+def test_job_store_queue_survives_restart(tmp_path):
+    # given
+    now = datetime.now(timezone.utc)
+    store = JobStore(tmp_path / "jobs.sqlite")
+    store.save(_job("second", now))
+    store.save(_job("first", now - timedelta(seconds=1), status=JobStatus.running))
+    store.close()
+
+    # when the server restarts
+    store = JobStore(tmp_path / "jobs.sqlite")
+    requeued = store.requeue_running()
+
+    # then
+    assert requeued == 1
+    assert store.get("first").status == JobStatus.queued
+    assert store.next_queued().id == "first"
+    assert store.get("unknown") is None
+
+
+def test_job_progress():
+    # given
+    job = _job("job", datetime.now(timezone.utc), status=JobStatus.running)
+    job.started_at = datetime.now(timezone.utc) - timedelta(seconds=5)
+    job.estimated_duration = 10
+
+    # then
+    assert 0.4 < job.progress < 0.6
+    assert job.model_copy(update={"status": JobStatus.queued}).progress == 0
+    assert job.model_copy(update={"status": JobStatus.done}).progress == 1
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api.worker_pool.settings, "jobs_dir", tmp_path)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_job_normalize(client, wav_source_path):
+
+    # given
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    response = client.post(
+        "/jobs",
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"operation": "normalize", "lufs": -14.0},
+    )
+
+    # then
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] == "queued"
+
+    # when
+    deadline = time.monotonic() + 60
+    while (job := client.get(f"/jobs/{job_id}").json())["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.2)
+
+    # then
+    assert job["status"] == "done", job["error"]
+    assert job["progress"] == 1
+    assert job["result_url"] == f"/jobs/{job_id}/result"
+
+    result = client.get(job["result_url"])
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "audio/wav"
+    assert result.headers["content-disposition"].endswith("test_audio_normalized.wav")
+    assert len(result.content) > 0
+
+    # when
+    assert client.delete(f"/jobs/{job_id}").status_code == 204
+
+    # then
+    assert client.get(f"/jobs/{job_id}").status_code == 404
+
+
+def test_job_invalid_parameters(client, wav_source_path):
+
+    # when
+    response = client.post(
+        "/jobs",
+        files={"file": ("test_audio.wav", Path(wav_source_path).read_bytes())},
+        data={"operation": "convert"},  # missing target_format
+    )
+
+    # then
+    assert response.status_code == 422
+
+
+def test_job_unsupported_target_format(client, wav_source_path):
+
+    # when
+    response = client.post(
+        "/jobs",
+        files={"file": ("test_audio.wav", Path(wav_source_path).read_bytes())},
+        data={"operation": "convert", "target_format": "ogg"},
+    )
+
+    # then
+    assert response.status_code == 422
+
+
+def test_job_queue_full(tmp_path, monkeypatch, wav_source_path):
+
+    # given a queued job, and a queue of one job
+    store = JobStore(tmp_path / "jobs.sqlite")
+    store.save(_job("queued", datetime.now(timezone.utc)))
+    store.close()
+
+    monkeypatch.setattr(api.worker_pool.settings, "jobs_dir", tmp_path)
+    monkeypatch.setattr(api.worker_pool.settings, "max_jobs", 1)
+
+    with TestClient(app) as client:
+
+        # when
+        response = client.post(
+            "/jobs",
+            files={"file": ("test_audio.wav", Path(wav_source_path).read_bytes())},
+            data={"operation": "normalize"},
+        )
+
+    # then
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert not list((tmp_path / "inputs").iterdir())
+
+
+def test_job_disk_full(client, monkeypatch, wav_source_path):
+
+    # given
+    monkeypatch.setattr(api.worker_pool.settings, "jobs_disk_size", 1)
+    files = {"file": ("test_audio.wav", Path(wav_source_path).read_bytes())}
+
+    # when the first upload fills the disk of the jobs
+    first = client.post("/jobs", files=files, data={"operation": "convert", "target_format": "mp3"})
+    second = client.post("/jobs", files=files, data={"operation": "convert", "target_format": "mp3"})
+
+    # then
+    assert first.status_code == 202
+    assert second.status_code == 503
+
+
+def test_job_result_of_failed_job(tmp_path, monkeypatch):
+
+    # given a job which failed before the server restarted
+    job = _job("failed", datetime.now(timezone.utc), status=JobStatus.failed)
+    job.error = "boom"
+    store = JobStore(tmp_path / "jobs.sqlite")
+    store.save(job)
+    store.close()
+
+    monkeypatch.setattr(api.worker_pool.settings, "jobs_dir", tmp_path)
+
+    with TestClient(app) as client:
+
+        # when
+        status = client.get("/jobs/failed").json()
+        result = client.get("/jobs/failed/result")
+
+    # then
+    assert status["status"] == "failed"
+    assert status["error"] == "boom"
+    assert result.status_code == 409
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.mpcli.api import app
+from src.mpcli.api_metrics import Counter, Histogram, MetricsRegistry
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if not line.startswith("#")
+    }
+
+
+def test_histogram_renders_cumulative_buckets():
+
+    # given
+    histogram = Histogram("duration_seconds", "Duration", ("stage",), buckets=(0.1, 1.0))
+
+    # when
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="decode")
+
+    # then
+    samples = _samples(histogram.render())
+    assert samples['duration_seconds_bucket{stage="decode",le="0.1"}'] == 1
+    assert samples['duration_seconds_bucket{stage="decode",le="1.0"}'] == 3
+    assert samples['duration_seconds_bucket{stage="decode",le="+Inf"}'] == 4
+    assert samples['duration_seconds_count{stage="decode"}'] == 4
+    assert samples['duration_seconds_sum{stage="decode"}'] == 4.25
+
+
+def test_registry_renders_the_values_read_at_scrape():
+
+    # given
+    size = {"value": 1}
+    registry = MetricsRegistry()
+    registry.register(Counter("reads_total", "Reads", function=lambda: {(): size["value"]}))
+
+    # when
+    size["value"] = 3
+    text = registry.render()
+
+    # then
+    assert "# TYPE reads_total counter" in text
+    assert _samples(text)["reads_total"] == 3
+
+
+def test_metrics_report_the_stages_of_the_requests(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+    client.post("/normalize", files={"file": ("test_audio.wav", wav_bytes)}, data={"lufs": -14})
+
+    # when
+    response = client.get("/metrics")
+
+    # then the stages run by the worker process are reported along with the ones of the API
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    samples = _samples(response.text)
+    for stage in ("upload", "hash", "decode", "loudness", "encode", "write"):
+        assert samples[f'mpcli_stage_duration_seconds_count{{endpoint="/normalize",stage="{stage}"}}'] >= 1
+
+    assert samples['mpcli_received_bytes_total{endpoint="/normalize"}'] >= len(wav_bytes)
+    assert samples['mpcli_request_duration_seconds_count{method="POST",endpoint="/normalize",status="200"}'] >= 1
+    assert samples['mpcli_cache_lookups_total{result="miss"}'] >= 1
+    assert samples['mpcli_worker_requests{state="queued"}'] == 0
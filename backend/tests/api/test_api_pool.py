@@ -0,0 +1,228 @@
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from src.mpcli.api_pool import (
+    MAX_DEFAULT_WORKERS,
+    APISettings,
+    DeadlineExceededError,
+    MemoryBudget,
+    MemoryBudgetExceededError,
+    ServerBusyError,
+    WorkerPool,
+)
+from src.mpcli.repository.profiling import profile_calls
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(APISettings(workers=1, max_queued=1, deadline=30, retry_after=7))
+    yield pool
+    pool.shutdown()
+
+
+def test_worker_pool_runs_in_another_process(pool):
+    # when
+    result = asyncio.run(pool.run(pow, 2, 10))
+
+    # then
+    assert result == 1024
+    assert pool.in_flight == 0
+
+
+def test_worker_pool_rejects_when_full(pool):
+
+    async def scenario():
+        busy = [asyncio.ensure_future(pool.run(time.sleep, 1)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServerBusyError) as e:
+            await pool.run(time.sleep, 1)
+
+        await asyncio.gather(*busy)
+        return e.value
+
+    # when
+    error = asyncio.run(scenario())
+
+    # then
+    assert error.retry_after == 7
+    assert pool.in_flight == 0
+
+
+def test_worker_pool_deadline(pool):
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(pool.run(time.sleep, 2, deadline=0.1))
+
+
+def test_worker_pool_profiles_calls(pool):
+    with TemporaryDirectory() as tmp_dir:
+
+        # when the calls of the request are profiled
+        with profile_calls(Path(tmp_dir), "POST /tempo"):
+            result = asyncio.run(pool.run(pow, 2, 10))
+
+        # then the profile is written by the worker
+        assert result == 1024
+        assert len(list(Path(tmp_dir).glob("POST_tempo.*.prof"))) == 1
+
+
+def test_memory_budget_queues_until_released():
+
+    # given
+    budget = MemoryBudget(100)
+
+    async def scenario():
+        await budget.reserve(60, timeout=1)
+
+        waiting = asyncio.ensure_future(budget.reserve(60, timeout=1))
+        await asyncio.sleep(0.01)
+        queued = (waiting.done(), budget.waiting)
+
+        budget.release(60)
+        await waiting
+        return queued
+
+    # when
+    queued = asyncio.run(scenario())
+
+    # then the second reservation waited for the first one to be released
+    assert queued == (False, 1)
+    assert budget.reserved == 60
+    assert budget.waiting == 0
+
+
+def test_memory_budget_first_in_first_out():
+
+    # given
+    budget = MemoryBudget(100)
+    admitted = []
+
+    async def reserve(name, size):
+        await budget.reserve(size, timeout=1)
+        admitted.append(name)
+
+    async def scenario():
+        await budget.reserve(90, timeout=1)
+
+        # the small one would fit, but it arrived after the large one
+        tasks = [asyncio.ensure_future(reserve("large", 80)), asyncio.ensure_future(reserve("small", 10))]
+        await asyncio.sleep(0.01)
+        blocked = list(admitted)
+
+        budget.release(90)
+        await asyncio.gather(*tasks)
+        return blocked
+
+    # when
+    blocked = asyncio.run(scenario())
+
+    # then
+    assert blocked == []
+    assert admitted == ["large", "small"]
+
+
+def test_memory_budget_timeout():
+
+    # given
+    budget = MemoryBudget(100)
+
+    async def scenario():
+        await budget.reserve(100, timeout=1)
+        await budget.reserve(1, timeout=0.05)
+
+    # when
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(scenario())
+
+    # then the reservation which timed out is not kept
+    assert budget.reserved == 100
+    assert budget.waiting == 0
+
+
+def test_memory_budget_rejects_larger_than_budget():
+
+    with pytest.raises(MemoryBudgetExceededError):
+        asyncio.run(MemoryBudget(100).reserve(101, timeout=1))
+
+
+def test_worker_pool_releases_memory():
+
+    # given
+    pool = WorkerPool(APISettings(workers=1, max_queued=1, memory_budget=1000))
+
+    try:
+        # when
+        result = asyncio.run(pool.run(pow, 2, 10, memory=800))
+        time.sleep(0.05)
+
+        # then
+        assert result == 1024
+        assert pool.memory.reserved == 0
+    finally:
+        pool.shutdown()
+
+
+def _slow_echo(value, seconds):
+    time.sleep(seconds)
+    return value
+
+
+def test_worker_pool_discards_abandoned_results(pool):
+
+    # given a started worker
+    discarded = []
+    asyncio.run(pool.run(pow, 2, 10))
+
+    # when the call completes after its deadline
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(pool.run(_slow_echo, "output", 0.5, deadline=0.1, discard=discarded.append))
+
+    time.sleep(1)
+
+    # then its result is discarded
+    assert discarded == ["output"]
+
+
+def test_settings_from_env(monkeypatch):
+    # given
+    monkeypatch.setenv("MPCLI_API_WORKERS", "3")
+    monkeypatch.setenv("MPCLI_API_DEADLINE", "12.5")
+    monkeypatch.setenv("MPCLI_API_MEMORY_BUDGET", "0")
+
+    # when
+    settings = APISettings.from_env()
+
+    # then
+    assert settings.workers == 3
+    assert settings.deadline == 12.5
+    assert settings.memory_budget == 0
+    assert settings.max_queued == APISettings().max_queued
+
+
+def test_settings_default_workers_bounded(monkeypatch):
+    # given a large machine
+    monkeypatch.setattr(os, "cpu_count", lambda: 64)
+
+    # then
+    assert APISettings().workers == MAX_DEFAULT_WORKERS
+
+
+def test_worker_pool_restarts_when_broken(pool):
+    # given a worker which died
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(pool.run(os._exit, 1))
+    broken = pool._executor
+
+    # when
+    result = asyncio.run(pool.run(pow, 2, 3))
+
+    # then the broken pool is shut down and replaced
+    assert result == 8
+    assert pool._executor is not broken
+    assert broken._shutdown_thread
@@ -0,0 +1,94 @@
+import io
+import json
+from pathlib import Path
+
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from src.mpcli import api
+from src.mpcli.api import app
+
+
+def _process(client: TestClient, path: Path, operations: list[dict]):
+    return client.post(
+        "/process",
+        files={"file": (path.name, path.read_bytes())},
+        data={"operations": json.dumps(operations)},
+    )
+
+
+def test_process_runs_the_operations_in_one_request(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    operations = [
+        {"operation": "timestretch", "min_rate": 1.2, "max_rate": 1.2},
+        {"operation": "normalize", "lufs": -14},
+        {"operation": "convert", "target_format": "mp3"},
+    ]
+
+    # when
+    response = _process(client, wav_source_path, operations)
+
+    # then the audio is encoded once, in the format of the last conversion
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert "valid_audio_processed.mp3" in response.headers["content-disposition"]
+
+    original, _ = sf.read(wav_source_path)
+    data, _ = sf.read(io.BytesIO(response.content))
+    assert len(data) < len(original)
+
+    timings = [metric.split(";")[0] for metric in response.headers["server-timing"].split(", ")]
+    assert timings == ["decode", "timestretch", "normalize", "convert", "encode"]
+
+
+def test_process_uses_the_batched_tempo(wav_source_path, monkeypatch):
+
+    # given
+    async def estimate(source):
+        return 100.0
+
+    monkeypatch.setattr(api, "_estimate_tempo", estimate)
+    client = TestClient(app)
+
+    # when
+    response = _process(client, wav_source_path, [{"operation": "timestretch", "target_tempo": 150}])
+
+    # then
+    assert response.status_code == 200
+    assert "tempo_inference;dur=" in response.headers["server-timing"]
+
+    original, _ = sf.read(wav_source_path)
+    data, _ = sf.read(io.BytesIO(response.content))
+    assert abs(len(data) - len(original) / 1.5) < 0.05 * len(original)
+
+
+def test_process_cached_result(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    operations = [{"operation": "normalize", "lufs": -14}]
+    first = _process(client, wav_source_path, operations)
+
+    # when
+    second = _process(client, wav_source_path, operations)
+
+    # then
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["server-timing"] == 'cache;desc="hit"'
+
+
+def test_process_invalid_operations(wav_source_path):
+
+    # given
+    client = TestClient(app)
+
+    # when
+    unknown = _process(client, wav_source_path, [{"operation": "reverse"}])
+    empty = _process(client, wav_source_path, [])
+    invalid = _process(client, wav_source_path, [{"operation": "normalize", "lufs": 3}])
+
+    # then
+    assert (unknown.status_code, empty.status_code, invalid.status_code) == (422, 422, 422)
@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.mpcli.api import app
+
+SAMPLE_RATE = 44100
+
+
+def _sine(seconds: float, channels: int = 2) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return np.stack([0.5 * np.sin(2 * np.pi * 440 * t)] * channels, axis=1).astype("<f4")
+
+
+def _receive_all(websocket) -> np.ndarray:
+    """the frames sent until the stream is closed"""
+
+    chunks = []
+    try:
+        while True:
+            chunks.append(np.frombuffer(websocket.receive_bytes(), dtype="<f4"))
+    except WebSocketDisconnect as e:
+        assert e.code == 1000
+
+    return np.concatenate(chunks).reshape(-1, 2)
+
+
+def test_stream_timestretch():
+
+    # given
+    client = TestClient(app)
+    signal = _sine(2.0)
+
+    with client.websocket_connect("/stream/timestretch?rate=1.25") as websocket:
+
+        # when the frames are sent in small chunks
+        for chunk in np.array_split(signal, 50):
+            websocket.send_bytes(chunk.tobytes())
+        websocket.send_text(json.dumps({"end": True}))
+
+        output = _receive_all(websocket)
+
+    # then
+    assert len(output) == pytest.approx(len(signal) / 1.25, abs=64)
+    assert np.abs(output[4096:-4096]).max() == pytest.approx(0.5, abs=0.02)
+
+
+def test_stream_rate_changes():
+
+    # given
+    client = TestClient(app)
+    signal = _sine(1.0)
+
+    with client.websocket_connect("/stream/timestretch?block=4096") as websocket:
+
+        # when the second half is sped up
+        websocket.send_bytes(signal[: SAMPLE_RATE // 2].tobytes())
+        websocket.send_text(json.dumps({"rate": 2.0}))
+        websocket.send_bytes(signal[SAMPLE_RATE // 2 :].tobytes())
+        websocket.send_text(json.dumps({"end": True}))
+
+        output = _receive_all(websocket)
+
+    # then the blocks stretched once the rate changed are shorter, the earlier ones are not
+    assert len(signal) * 0.75 - 8192 < len(output) < len(signal) * 0.75 + 8192
+    assert len(output) < len(signal)
+
+
+def test_stream_output_before_the_end():
+
+    # given
+    client = TestClient(app)
+
+    with client.websocket_connect("/stream/timestretch?block=4096") as websocket:
+
+        # when more than a block and its context are sent
+        websocket.send_bytes(_sine(0.5).tobytes())
+
+        # then the first block is sent back without waiting for the end of the stream
+        first = np.frombuffer(websocket.receive_bytes(), dtype="<f4")
+        assert len(first) == 4096 * 2
+
+
+def test_stream_partial_frames():
+
+    # given
+    client = TestClient(app)
+
+    with client.websocket_connect("/stream/timestretch") as websocket:
+
+        # when
+        websocket.send_bytes(b"\x00" * 6)
+
+        # then
+        with pytest.raises(WebSocketDisconnect) as error:
+            websocket.receive_bytes()
+        assert error.value.code == 1007
+
+
+def test_stream_invalid_rate():
+
+    # given
+    client = TestClient(app)
+
+    with client.websocket_connect("/stream/timestretch") as websocket:
+
+        # when
+        websocket.send_text(json.dumps({"rate": 50}))
+
+        # then
+        with pytest.raises(WebSocketDisconnect) as error:
+            websocket.receive_bytes()
+        assert error.value.code == 1007
@@ -0,0 +1,76 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.mpcli.api_streaming import remove_output, render_to_file, stream_audio
+from src.mpcli.entities.result import ConvertResult
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.use_cases.normalization import execute_normalization
+
+
+def test_render_to_file_moves_the_output_to_a_file(wav_source_path):
+    # given
+    source = AudioSource(audio_path=wav_source_path, audio_format="wav", name="test")
+
+    # when
+    result = render_to_file(execute_normalization, source, -14.0)
+
+    # then
+    output = result.converted_audio
+    try:
+        assert output.audio_bytes is None
+        assert output.audio_path.exists()
+        assert output.to_array().shape == source.to_array().shape
+    finally:
+        output.audio_path.unlink()
+
+
+def test_remove_output(wav_source_path):
+    # given the output of an abandoned request
+    source = AudioSource(audio_path=wav_source_path, audio_format="wav", name="test")
+    result = render_to_file(execute_normalization, source, -14.0)
+
+    # when
+    remove_output(result)
+    remove_output(None)
+
+    # then
+    assert not result.converted_audio.audio_path.exists()
+    assert wav_source_path.exists()
+
+
+def test_remove_output_keeps_the_source(wav_source_path):
+    # given an output which is the source itself
+    source = AudioSource(audio_path=wav_source_path, audio_format="wav", name="test")
+    result = render_to_file(lambda source: ConvertResult(audio_source=source, converted_audio=source), source)
+
+    # when
+    remove_output(result, source=source)
+
+    # then
+    assert wav_source_path.exists()
+
+
+def test_stream_audio_removes_the_file(tmp_path, wav_source_path):
+    # given
+    path = tmp_path / "output.wav"
+    path.write_bytes(wav_source_path.read_bytes())
+    source = AudioSource(audio_path=path, audio_format="wav")
+
+    app = FastAPI()
+
+    @app.get("/audio")
+    async def audio():
+        return stream_audio(source, filename="résumé.wav", remove=True)
+
+    # when
+    response = TestClient(app).get("/audio")
+
+    # then
+    assert response.status_code == 200
+    assert response.content == wav_source_path.read_bytes()
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["content-length"] == str(len(response.content))
+    assert response.headers["content-disposition"] == (
+        "attachment; filename*=utf-8''r%C3%A9sum%C3%A9.wav"
+    )
+    assert not path.exists()
@@ -0,0 +1,111 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.mpcli import api_tempo
+from src.mpcli.api_tempo import TempoBatcher
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.tempo import estimate_tempo, read_tempo_features
+
+
+@pytest.fixture
+def batches(monkeypatch) -> list[int]:
+    """the sizes of the batches run through a fake model, returning the first value of each signal"""
+
+    sizes = []
+
+    def predict(features):
+        sizes.append(len(features))
+        return [float(f.flat[0]) for f in features]
+
+    monkeypatch.setattr(api_tempo, "predict_tempi", predict)
+
+    return sizes
+
+
+def test_concurrent_estimations_are_batched(batches):
+
+    # given
+    batcher = TempoBatcher(max_batch=32, max_delay=0.05)
+
+    async def estimate_all():
+        return await asyncio.gather(
+            *(batcher.estimate(np.full((2, 1), tempo)) for tempo in (90.0, 120.0, 140.0))
+        )
+
+    # when
+    tempi = asyncio.run(estimate_all())
+
+    # then each request gets its own tempo, from a single pass of the model
+    assert tempi == [90.0, 120.0, 140.0]
+    assert batches == [3]
+    assert (batcher.batches, batcher.estimations) == (1, 3)
+
+    batcher.shutdown()
+
+
+def test_batches_are_limited_to_max_batch(batches):
+
+    # given
+    batcher = TempoBatcher(max_batch=2, max_delay=10)
+
+    async def estimate_all():
+        return await asyncio.gather(*(batcher.estimate(np.full((1, 1), i)) for i in range(5)))
+
+    # when, without waiting for the delay
+    tempi = asyncio.run(asyncio.wait_for(estimate_all(), 5))
+
+    # then
+    assert tempi == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert sorted(batches, reverse=True) == [2, 2, 1]
+
+    batcher.shutdown()
+
+
+def test_model_error_is_raised_to_every_request(monkeypatch):
+
+    # given
+    def predict(features):
+        raise RuntimeError("model error")
+
+    monkeypatch.setattr(api_tempo, "predict_tempi", predict)
+    batcher = TempoBatcher(max_batch=32, max_delay=0.01)
+
+    async def estimate_all():
+        return await asyncio.gather(
+            *(batcher.estimate(np.zeros((1, 1))) for _ in range(2)), return_exceptions=True
+        )
+
+    # when
+    errors = asyncio.run(estimate_all())
+
+    # then
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+    batcher.shutdown()
+
+
+def test_batched_tempo_matches_single_estimation(wav_source_path, mp3_source_path):
+
+    # given
+    sources = [
+        AudioSource(audio_path=wav_source_path, audio_format="wav", name=wav_source_path.name),
+        AudioSource(audio_path=mp3_source_path, audio_format="mp3", name=mp3_source_path.name),
+    ]
+    batcher = TempoBatcher(max_batch=32, max_delay=0.05)
+
+    async def estimate_all():
+        return await asyncio.gather(
+            *(batcher.estimate(read_tempo_features(source)) for source in sources)
+        )
+
+    # when
+    tempi = asyncio.run(estimate_all())
+
+    # then
+    assert batcher.batches == 1
+    for source, tempo in zip(sources, tempi):
+        assert tempo == pytest.approx(estimate_tempo(source).tempo, abs=1e-3)
+
+    batcher.shutdown()
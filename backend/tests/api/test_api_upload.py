@@ -0,0 +1,99 @@
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile as StarletteUploadFile
+
+from src.mpcli.api_upload import MaxUploadSizeMiddleware, spooled_source
+
+
+def _app(max_size: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MaxUploadSizeMiddleware, max_size=max_size)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def test_upload_within_limit():
+    # given
+    client = TestClient(_app(max_size=10_000))
+
+    # when
+    response = client.post("/upload", files={"file": ("a.wav", b"x" * 1000)})
+
+    # then
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+
+def test_upload_too_large_content_length():
+    # given
+    client = TestClient(_app(max_size=1000))
+
+    # when
+    response = client.post("/upload", files={"file": ("a.wav", b"x" * 5000)})
+
+    # then
+    assert response.status_code == 413
+
+
+def test_upload_too_large_streamed():
+    # given
+    client = TestClient(_app(max_size=1000))
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 500
+
+    # when, the body is sent without content-length
+    response = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"content-type": "multipart/form-data; boundary=abc"},
+    )
+
+    # then
+    assert response.status_code == 413
+
+
+def test_spooled_source_is_file_backed_and_removed(wav_source_path):
+    # given
+    upload = StarletteUploadFile(
+        io.BytesIO(Path(wav_source_path).read_bytes()), filename="test_audio.wav"
+    )
+
+    async def scenario():
+        async with spooled_source(upload, sample_rate=22050) as source:
+            return source, source.audio_path.exists(), source.to_array().shape
+
+    # when
+    source, existed, shape = asyncio.run(scenario())
+
+    # then
+    assert existed
+    assert not source.audio_path.exists()
+    assert source.audio_bytes is None
+    assert source.audio_format == "wav"
+    assert source.sample_rate == 22050
+    assert shape[1] == 2
+
+
+def test_spooled_source_unsupported_format():
+    # given
+    upload = StarletteUploadFile(io.BytesIO(b"text"), filename="test.txt")
+
+    async def scenario():
+        async with spooled_source(upload):
+            pass
+
+    # then
+    with pytest.raises(ValidationError):
+        asyncio.run(scenario())
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.mpcli import api, api_tempo
+from src.mpcli.api import app
+from src.mpcli.model_host import (
+    ModelHostClient,
+    ModelHostUnavailableError,
+    serve_models,
+)
+from src.mpcli.repository.shared_array import share_array
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    """a model host running a fake model, which returns the first value of each signal"""
+
+    monkeypatch.setattr(api_tempo, "get_tempo_classifier", lambda: None)
+    monkeypatch.setattr(
+        api_tempo, "predict_tempi", lambda features: [float(f.flat[0]) for f in features]
+    )
+
+    with TemporaryDirectory() as tmp_path:
+
+        path = Path(tmp_path) / "models.sock"
+        threading.Thread(target=serve_models, args=(path,), daemon=True).start()
+
+        for _ in range(50):
+            if path.exists():
+                break
+            time.sleep(0.1)
+
+        yield path
+
+
+def test_model_host_not_running():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        client = ModelHostClient(Path(tmp_path) / "models.sock")
+        shared = share_array(np.zeros(4))
+
+        # when / then
+        with pytest.raises(ModelHostUnavailableError, match="No model host listening"):
+            asyncio.run(client.estimate(shared))
+
+        # the features are released anyway
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=shared.name)
+
+
+def test_model_host_socket_of_another_user(socket_path, monkeypatch):
+
+    # given the socket of a model host which belongs to another user
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+    client = ModelHostClient(socket_path)
+    shared = share_array(np.full(4, 100.0))
+
+    # when / then the features are not sent to it
+    with pytest.raises(ModelHostUnavailableError, match="current user"):
+        asyncio.run(client.estimate(shared))
+
+
+def test_model_host_estimates_shared_features(socket_path):
+
+    # given
+    client = ModelHostClient(socket_path)
+    shared = [share_array(np.full((2, 3), tempo)) for tempo in (90.0, 120.0)]
+
+    # when
+    async def estimate_all():
+        return await asyncio.gather(*(client.estimate(s) for s in shared))
+
+    tempi = asyncio.run(estimate_all())
+
+    # then
+    assert tempi == [90.0, 120.0]
+    for s in shared:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=s.name)
+
+
+def test_tempo_endpoint_uses_model_host(socket_path, monkeypatch, wav_source_path):
+
+    # given the API workers sending their features to the model host
+    monkeypatch.setattr(api, "model_host", ModelHostClient(socket_path))
+    client = TestClient(app)
+
+    # when
+    response = client.post(
+        "/tempo", files={"file": ("a.wav", Path(wav_source_path).read_bytes())}
+    )
+
+    # then the tempo is the one of the fake model
+    assert response.status_code == 200
+    assert isinstance(response.json()["tempo"], float)
+
+
+def test_tempo_endpoint_model_host_unavailable(monkeypatch, tmp_path, wav_source_path):
+
+    # given
+    monkeypatch.setattr(api, "model_host", ModelHostClient(tmp_path / "models.sock"))
+    client = TestClient(app)
+
+    # when
+    response = client.post(
+        "/tempo", files={"file": ("a.wav", Path(wav_source_path).read_bytes())}
+    )
+
+    # then
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
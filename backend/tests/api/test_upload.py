@@ -2,9 +2,12 @@ import tempfile
 from pathlib import Path
 
 import librosa
+import pytest
 from fastapi.testclient import TestClient
 
+from src.mpcli import api
 from src.mpcli.api import app
+from src.mpcli.api_pool import MemoryBudget, ServerBusyError
 
 
 def test_tempo_wav(wav_source_path):
@@ -91,7 +94,8 @@ def test_convert_wav_to_mp3(wav_source_path):
 
     # then
     assert response.status_code == 200
-    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.headers["content-disposition"].endswith("test_audio.mp3")
     assert len(response.content) > 0
 
     # check the content is a valid mp3 file
@@ -164,7 +168,8 @@ def test_normalize_valid_lufs(wav_source_path):
 
     # then
     assert response.status_code == 200
-    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["content-disposition"].endswith("test_audio_normalized.wav")
     assert len(response.content) > 0
 
 
@@ -202,5 +207,115 @@ def test_timestretch_valid_tempo(wav_source_path):
 
     # then
     assert response.status_code == 200
-    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-type"] == "audio/wav"
+    assert "test_audio_" in response.headers["content-disposition"]
     assert len(response.content) > 0
+
+
+def test_normalize_server_busy(wav_source_path, monkeypatch):
+
+    # given
+    client = TestClient(app)
+
+    async def busy(*args, **kwargs):
+        raise ServerBusyError(retry_after=3)
+
+    monkeypatch.setattr(api.worker_pool, "run", busy)
+
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    response = client.post(
+        "/normalize",
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"lufs": -14.0},
+    )
+
+    # then
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+
+def test_normalize_over_memory_budget(wav_source_path, monkeypatch):
+
+    # given a budget smaller than the memory needed by any request
+    client = TestClient(app)
+    monkeypatch.setattr(api.worker_pool, "memory", MemoryBudget(1024))
+
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    response = client.post(
+        "/normalize",
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"lufs": -14.0},
+    )
+
+    # then
+    assert response.status_code == 413
+    assert "memory" in response.text
+
+
+def test_normalize_segment(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    whole = client.post("/normalize", files={"file": ("test_audio.wav", wav_bytes)})
+    segment = client.post(
+        "/normalize",
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"start": 22050, "end": 44100, "unit": "samples"},
+    )
+
+    # then only the segment is returned, it's not mistaken for the whole file by the cache
+    assert segment.status_code == 200
+    assert segment.headers["etag"] != whole.headers["etag"]
+
+    with tempfile.NamedTemporaryFile(suffix=".wav") as output:
+        output.write(segment.content)
+        output.flush()
+        assert librosa.get_duration(path=output.name) == 0.5
+
+
+def test_normalize_invalid_segment(wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+
+    # when
+    response = client.post(
+        "/normalize",
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"start": 2.0, "end": 1.0},
+    )
+
+    # then
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("endpoint", ["/normalize", "/tempo", "/timestretch", "/convert", "/process"])
+def test_segment_after_the_end_of_the_audio(endpoint, wav_source_path):
+
+    # given
+    client = TestClient(app)
+    wav_bytes = Path(wav_source_path).read_bytes()
+    data = {
+        "/convert": {"target_format": "mp3"},
+        "/process": {"operations": '[{"operation": "normalize", "lufs": -14}]'},
+        "/timestretch": {"target_tempo": 100},
+    }.get(endpoint, {})
+
+    # when
+    response = client.post(
+        endpoint,
+        files={"file": ("test_audio.wav", wav_bytes)},
+        data={"start": 100000, **data},
+    )
+
+    # then
+    assert response.status_code == 422
+    assert "after the end of the audio" in response.text
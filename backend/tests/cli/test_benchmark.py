@@ -0,0 +1,167 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from loguru import logger
+
+from src.mpcli.cli_benchmark import (
+    BenchmarkCase,
+    BenchmarkReport,
+    BenchmarkResult,
+    compare_reports,
+    default_cases,
+    load_report,
+    run_case,
+    run_operation,
+    save_report,
+    synthetic_signal,
+    synthetic_source,
+)
+
+
+def _result(operation: str, throughput: float, peak_memory: int) -> BenchmarkResult:
+    return BenchmarkResult(
+        case=BenchmarkCase(operation=operation, duration=10.0),
+        repeats=1,
+        wall_time=10.0 / throughput,
+        min_wall_time=10.0 / throughput,
+        throughput=throughput,
+        peak_memory=peak_memory,
+    )
+
+
+def test_synthetic_signal_is_reproducible():
+
+    # when
+    first = synthetic_signal(1.0, 2, 22050)
+    second = synthetic_signal(1.0, 2, 22050)
+
+    # then
+    assert first.shape == (22050, 2)
+    assert first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert np.abs(first).max() <= 1.0
+
+
+def test_synthetic_source():
+
+    # given
+    case = BenchmarkCase(operation="normalize", duration=2.0, channels=1, sample_rate=16000)
+
+    # when
+    source = synthetic_source(case)
+    data, sample_rate = source.read(always_2d=True)
+
+    # then
+    assert sample_rate == 16000
+    assert data.shape == (32000, 1)
+
+
+def test_default_cases_max_duration():
+
+    # when
+    cases = default_cases(["convert"], max_duration=10.0)
+
+    # then
+    assert cases
+    assert all(case.operation == "convert" and case.duration <= 10.0 for case in cases)
+    assert len({case.key for case in cases}) == len(cases)
+
+
+def test_run_case():
+
+    # given a mono signal
+    case = BenchmarkCase(operation="normalize", duration=2.0, channels=1, sample_rate=22050)
+
+    # when
+    result = run_case(case, repeats=2)
+
+    # then
+    assert result.repeats == 2
+    assert result.min_wall_time <= result.wall_time
+    assert result.throughput > 0
+    # at least the decoded samples
+    assert result.peak_memory > 2.0 * 22050 * 4
+    assert "decode" in result.stages
+
+
+def test_compare_reports():
+
+    # given
+    baseline = BenchmarkReport(
+        results=[
+            _result("normalize", throughput=100.0, peak_memory=1000),
+            _result("convert", throughput=100.0, peak_memory=1000),
+        ]
+    )
+    report = BenchmarkReport(
+        results=[
+            # slower and larger beyond the tolerance
+            _result("normalize", throughput=50.0, peak_memory=2000),
+            # within the tolerance
+            _result("convert", throughput=95.0, peak_memory=1050),
+            # not in the baseline
+            _result("timestretch", throughput=1.0, peak_memory=10**9),
+        ]
+    )
+
+    # when
+    regressions = compare_reports(baseline, report, tolerance=0.1)
+
+    # then
+    assert [(r.key, r.metric) for r in regressions] == [
+        ("normalize-10s-2ch-44100Hz", "throughput"),
+        ("normalize-10s-2ch-44100Hz", "peak_memory"),
+    ]
+    assert regressions[0].change == -0.5
+
+
+def test_compare_reports_of_another_machine():
+
+    # given
+    results = [_result("normalize", throughput=100.0, peak_memory=1000)]
+    baseline = BenchmarkReport(machine="arm64", cpus=8, results=results)
+    report = BenchmarkReport(machine="x86_64", cpus=8, results=results)
+
+    warnings = []
+    handler = logger.add(warnings.append, level="WARNING")
+
+    # when
+    try:
+        regressions = compare_reports(baseline, report)
+    finally:
+        logger.remove(handler)
+
+    # then
+    assert regressions == []
+    assert len(warnings) == 1
+    assert "machine" in warnings[0]
+
+
+def test_run_operation_convert_is_reproducible():
+
+    # given
+    source = synthetic_source(BenchmarkCase(operation="convert", duration=2.0, channels=1))
+
+    # when the bitrate of the encoder is drawn
+    first = run_operation("convert", source)
+    second = run_operation("convert", source)
+
+    # then the same one is drawn on each run
+    assert first.converted_audio.audio_bytes == second.converted_audio.audio_bytes
+
+
+def test_report_persistence():
+
+    # given
+    report = BenchmarkReport(results=[_result("normalize", throughput=100.0, peak_memory=1000)])
+
+    with TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "benchmarks" / "results.json"
+
+        # when
+        save_report(path, report)
+        loaded = load_report(path)
+
+    # then
+    assert loaded == report
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from rich.table import Table
+
+from src.mpcli import cli
+from src.mpcli.cli_entities import CLINormalizeConfig
+from src.mpcli.repository import profiling
+from src.mpcli.repository.profiling import ProfilingSettings
+
+
+def _normalize_table() -> Table:
+    table = Table()
+    table.add_column("Source")
+    table.add_column("Output")
+    return table
+
+
+def test_fill_table_single_job_leaves_the_cost_model(tmp_path, monkeypatch):
+
+    # given a single job at a time, without plan
+    source_path = tmp_path / "song.wav"
+    sf.write(source_path, 0.1 * np.random.default_rng(0).standard_normal((44100, 2)), 44100)
+    config = CLINormalizeConfig(source=source_path, output=tmp_path / "out")
+
+    def fail(*args):
+        raise AssertionError("unexpected call")
+
+    monkeypatch.setattr(cli, "probe_source", fail)
+    monkeypatch.setattr(cli, "save_cost_model", fail)
+    monkeypatch.setattr(cli, "run_jobs_on_daemon", lambda section, items: iter(()))
+
+    # when
+    table = _normalize_table()
+    cli._fill_table(table, "normalize", [config], jobs=1)
+
+    # then the sources are processed, neither probed nor used to calibrate the cost model
+    assert table.row_count == 1
+    assert list(Path(tmp_path / "out").glob("*.wav"))
+
+
+def test_fill_table_writes_the_manifest_of_the_config_shard(tmp_path, monkeypatch):
+
+    # given a shard set in the config file, not on the command line
+    source_dir = tmp_path / "sources"
+    source_dir.mkdir()
+    sf.write(source_dir / "song.wav", 0.1 * np.random.default_rng(0).standard_normal((44100, 2)), 44100)
+    config = CLINormalizeConfig(source=source_dir, output=tmp_path / "out", shard="1/1")
+
+    monkeypatch.setattr(cli, "run_jobs_on_daemon", lambda section, items: iter(()))
+
+    # when
+    cli._fill_table(_normalize_table(), "normalize", [config], jobs=1, manifest_dir=tmp_path / "manifests")
+
+    # then
+    assert (tmp_path / "manifests" / "normalize.shard-1-of-1.json").exists()
+
+
+def test_fill_table_profiles_in_process_when_the_daemon_runs(tmp_path, monkeypatch):
+
+    # given the profiling enabled, and a running daemon
+    source_path = tmp_path / "song.wav"
+    sf.write(source_path, 0.1 * np.random.default_rng(0).standard_normal((44100, 2)), 44100)
+    config = CLINormalizeConfig(source=source_path, output=tmp_path / "out")
+
+    monkeypatch.setattr(profiling, "settings", ProfilingSettings(directory=tmp_path / "profiles"))
+
+    def daemon(section, items):
+        raise AssertionError("the daemon profiles under its own settings")
+
+    monkeypatch.setattr(cli, "run_jobs_on_daemon", daemon)
+
+    # when
+    table = _normalize_table()
+    cli._fill_table(table, "normalize", [config], jobs=1)
+
+    # then the file is processed and profiled in-process
+    assert table.row_count == 1
+    assert list((tmp_path / "profiles").glob("normalize.song.*.prof"))
@@ -0,0 +1,141 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.mpcli.cli_entities import CLIJobResult, CLINormalizeConfig, CLIPipelineConfig
+from src.mpcli.cli_jobs import normalize_job, pipeline_job, run_jobs
+from src.mpcli.entities.pipeline import NormalizeStage
+from src.mpcli.repository import profiling
+from src.mpcli.repository.profiling import ProfilingSettings
+
+
+def _name_job(config, path, writer):
+    if path.stem == "broken":
+        raise ValueError("cannot process this file")
+    return CLIJobResult(source=path, row=[config, path.stem]), None
+
+
+def _write_job(config, path, writer):
+    future = writer.submit(
+        output_dir=Path(config),
+        filename=path.stem,
+        data=np.zeros((100, 2), dtype=np.float32),
+        sample_rate=44100,
+        format="unsupported" if path.stem == "broken" else "wav",
+    )
+    return CLIJobResult(source=path, row=[path.stem]), future
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_jobs_isolates_errors(jobs):
+
+    # given
+    items = [("config", Path(f"/tmp/{name}.wav")) for name in ["a", "broken", "b"]]
+
+    # when
+    results = list(run_jobs(_name_job, items, jobs=jobs))
+
+    # then
+    assert len(results) == 3
+    assert {tuple(r.row) for r in results if r.error is None} == {
+        ("config", "a"),
+        ("config", "b"),
+    }
+    errors = [r for r in results if r.error is not None]
+    assert len(errors) == 1
+    assert errors[0].source == Path("/tmp/broken.wav")
+    assert "cannot process this file" in errors[0].error
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_jobs_waits_for_written_files(jobs):
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        items = [(tmp_path, Path(f"/tmp/{name}.wav")) for name in ["a", "broken", "b"]]
+
+        # when
+        results = list(run_jobs(_write_job, items, jobs=jobs))
+
+        # then
+        assert {r.row[0] for r in results if r.error is None} == {"a", "b"}
+        assert (Path(tmp_path) / "a.wav").exists()
+        assert (Path(tmp_path) / "b.wav").exists()
+
+        errors = [r for r in results if r.error is not None]
+        assert len(errors) == 1 and "Error saving audio file" in errors[0].error
+
+
+def test_run_jobs_invalid_jobs():
+    with pytest.raises(ValueError, match="jobs must be at least 1"):
+        list(run_jobs(_name_job, [], jobs=0))
+
+
+def test_normalize_job_records_timings(wav_source_path):
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        config = CLINormalizeConfig(source=wav_source_path, output=tmp_path, lufs=-14)
+
+        # when
+        (result,) = run_jobs(normalize_job, [(config, wav_source_path)])
+
+        # then
+        assert result.error is None
+        assert list(result.timings) == ["load", "normalize"]
+        assert all(t >= 0 for t in result.timings.values())
+
+
+def test_normalize_job_profiled(wav_source_path, monkeypatch):
+    with TemporaryDirectory() as tmp_path, TemporaryDirectory() as profiles_dir:
+
+        # given
+        monkeypatch.setattr(profiling, "settings", ProfilingSettings(directory=profiles_dir))
+        config = CLINormalizeConfig(source=wav_source_path, output=tmp_path, lufs=-14)
+
+        # when
+        (result,) = run_jobs(normalize_job, [(config, wav_source_path)])
+
+        # then the profile is named after the command and the source
+        assert result.error is None
+        assert len(list(Path(profiles_dir).glob("normalize.valid_audio.*.prof"))) == 1
+
+
+def test_normalize_job_segment(wav_source_path):
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        config = CLINormalizeConfig(
+            source=wav_source_path, output=tmp_path, lufs=-14, start=0.5, end=1.0
+        )
+
+        # when
+        (result,) = run_jobs(normalize_job, [(config, wav_source_path)])
+
+        # then only the segment is written
+        assert result.error is None
+
+        (output,) = Path(tmp_path).glob("*.wav")
+        assert sf.info(output).frames == 22050
+
+
+def test_pipeline_job_flac_source_without_convert():
+    with TemporaryDirectory() as tmp_path:
+
+        # given a flac source, and no convert stage
+        source_path = Path(tmp_path) / "song.flac"
+        sf.write(source_path, np.zeros((44100, 2)), 44100)
+
+        config = CLIPipelineConfig(
+            source=source_path, output=Path(tmp_path) / "out", stages=[NormalizeStage(lufs=-14)]
+        )
+
+        # when
+        (result,) = run_jobs(pipeline_job, [(config, source_path)])
+
+        # then it's written in WAV
+        assert result.error is None
+        assert (Path(tmp_path) / "out" / "song_processed.wav").exists()
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from src.mpcli.cli_entities import CLIConfigError, CLIJobResult
+from src.mpcli.cli_manifest import read_manifests, write_manifest
+from src.mpcli.entities.shard import Shard
+
+
+def test_read_manifests_reports_missing_shards(tmp_path):
+    # given
+    for index in (1, 3):
+        write_manifest(
+            tmp_path,
+            "convert",
+            Shard(index=index, count=3),
+            ["Source", "Target"],
+            [CLIJobResult(source=Path(f"audio{index}.wav"), row=[f"audio{index}", "mp3"])],
+        )
+
+    # when
+    manifests, missing = read_manifests(tmp_path, "convert")
+
+    # then
+    assert [m.shard.index for m in manifests] == [1, 3]
+    assert manifests[0].columns == ["Source", "Target"]
+    assert manifests[1].results[0].row == ["audio3", "mp3"]
+    assert missing == [Shard(index=2, count=3)]
+    assert not list(tmp_path.glob(".*.part"))
+
+
+def test_write_manifest_replaces_previous_run(tmp_path):
+    # given
+    shard = Shard(index=1, count=1)
+    write_manifest(tmp_path, "convert", shard, ["Source"], [])
+
+    # when
+    write_manifest(
+        tmp_path, "convert", shard, ["Source"], [CLIJobResult(source=Path("a.wav"), error="boom")]
+    )
+    manifests, missing = read_manifests(tmp_path, "convert")
+
+    # then
+    assert len(manifests) == 1
+    assert manifests[0].results[0].error == "boom"
+    assert missing == []
+
+
+def test_read_manifests_with_different_counts(tmp_path):
+    # given
+    write_manifest(tmp_path, "convert", Shard(index=1, count=2), ["Source"], [])
+    write_manifest(tmp_path, "convert", Shard(index=1, count=3), ["Source"], [])
+
+    # then
+    with pytest.raises(CLIConfigError, match="different shard counts"):
+        read_manifests(tmp_path, "convert")
+
+
+def test_read_manifests_none_found(tmp_path):
+    with pytest.raises(CLIConfigError, match="No manifest found"):
+        read_manifests(tmp_path, "convert")
@@ -0,0 +1,99 @@
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from src.mpcli import cli_jobs
+from src.mpcli.cli_entities import CLIJobResult, CLITempoEstimationConfig
+from src.mpcli.daemon import DaemonUnavailableError, run_jobs_on_daemon, serve
+from src.mpcli.repository.unix_socket import UntrustedSocketError, make_private_dir
+
+
+def _echo_job(config, path, writer):
+    if path.stem == "broken":
+        raise ValueError("cannot process this file")
+    return CLIJobResult(source=path, row=[str(config.source), path.stem]), None
+
+
+def test_daemon_not_running():
+    with TemporaryDirectory() as tmp_path:
+
+        # given no daemon listening on the socket
+        socket_path = Path(tmp_path) / "mpcli.sock"
+        config = CLITempoEstimationConfig(source=tmp_path)
+
+        # when / then
+        with pytest.raises(DaemonUnavailableError, match="No daemon listening"):
+            list(run_jobs_on_daemon("echo", [(config, Path("a.wav"))], socket_path))
+
+
+def test_daemon_socket_of_another_user(monkeypatch):
+    with TemporaryDirectory() as tmp_path, socket.socket(socket.AF_UNIX) as server:
+
+        # given a socket bound by another user
+        socket_path = Path(tmp_path) / "mpcli.sock"
+        server.bind(str(socket_path))
+        server.listen()
+
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+        config = CLITempoEstimationConfig(source=tmp_path)
+
+        # when / then no job is sent to it
+        with pytest.raises(DaemonUnavailableError, match="current user"):
+            list(run_jobs_on_daemon("echo", [(config, Path("a.wav"))], socket_path))
+
+
+def test_make_private_dir():
+    with TemporaryDirectory() as tmp_path:
+
+        # when
+        make_private_dir(Path(tmp_path) / "sockets")
+
+        # then
+        assert (Path(tmp_path) / "sockets").stat().st_mode & 0o777 == 0o700
+
+        # and a directory accessible to the other users is refused
+        os.chmod(tmp_path, 0o777)
+        with pytest.raises(UntrustedSocketError):
+            make_private_dir(Path(tmp_path))
+
+
+def test_daemon_runs_jobs(monkeypatch):
+    with TemporaryDirectory() as tmp_path:
+
+        # given a daemon running a test job
+        monkeypatch.setitem(
+            cli_jobs.SECTION_JOBS, "echo", (CLITempoEstimationConfig, _echo_job)
+        )
+        monkeypatch.setattr(cli_jobs, "warm_up_tempo_model", lambda: None)
+
+        socket_path = Path(tmp_path) / "mpcli.sock"
+        threading.Thread(target=serve, args=(socket_path,), daemon=True).start()
+
+        for _ in range(50):
+            if socket_path.exists():
+                break
+            time.sleep(0.1)
+
+        # only the user running the daemon may connect
+        assert socket_path.stat().st_mode & 0o777 == 0o600
+
+        # when sending relative paths
+        config = CLITempoEstimationConfig(source="sources")
+        items = [(config, Path("a.wav")), (config, Path("broken.wav"))]
+        results = list(run_jobs_on_daemon("echo", items, socket_path))
+
+        # then the paths are resolved by the client, errors are isolated
+        assert results[0].row == [str(Path("sources").resolve()), "a"]
+        assert results[0].source == Path("a.wav").resolve()
+        assert "cannot process this file" in results[1].error
+
+        # and an unknown section is reported as an error
+        (result,) = run_jobs_on_daemon("unknown", [(config, Path("a.wav"))], socket_path)
+        assert "Invalid request" in result.error
@@ -7,7 +7,7 @@ import numpy as np
 import pytest
 import soundfile as sf
 
-from src.mpcli.entities.source import AudioSource, AudioSourceError
+from src.mpcli.entities.source import AudioSegment, AudioSource, AudioSourceError
 
 
 def test_audio_source_from_mp3_2d(mp3_source_path):
@@ -193,3 +193,77 @@ def test_audio_source_wav_to_array(wav_source_path):
     # then
     assert isinstance(result_array, np.ndarray)
     assert result_array.shape == data.shape
+
+
+def test_audio_source_file_backed_to_array(wav_source_path):
+
+    # given
+    in_memory = AudioSource(audio_bytes=wav_source_path.read_bytes(), audio_format="wav")
+    file_backed = AudioSource(audio_path=wav_source_path, audio_format="wav")
+
+    # when
+    result_array = file_backed.to_array()
+
+    # then
+    assert np.array_equal(result_array, in_memory.to_array())
+    assert file_backed.read_bytes() == in_memory.read_bytes()
+
+
+@pytest.mark.parametrize("data", [{}, {"audio_bytes": b"RIFF", "audio_path": "a.wav"}])
+def test_audio_source_requires_either_bytes_or_path(data):
+    with pytest.raises(ValueError, match="Exactly one of audio_bytes or audio_path"):
+        AudioSource(audio_format="wav", **data)
+
+
+@pytest.mark.parametrize(
+    "segment",
+    [
+        AudioSegment(start=0.5, end=1.0),
+        AudioSegment(start=22050, end=44100, unit="samples"),
+    ],
+)
+def test_audio_source_reads_segment(wav_source_path, segment):
+
+    # given
+    data, sample_rate = sf.read(wav_source_path, dtype="float32", always_2d=True)
+    audio_source = AudioSource(audio_path=wav_source_path, audio_format="wav", segment=segment)
+
+    # when
+    samples, _ = audio_source.read(dtype="float32", always_2d=True)
+
+    # then only the frames of the segment are decoded
+    np.testing.assert_array_equal(samples, data[sample_rate // 2 : sample_rate])
+
+
+def test_audio_source_segment_is_clipped(mp3_source_path):
+
+    # given
+    data, _ = sf.read(mp3_source_path, always_2d=True)
+    audio_source = AudioSource(
+        audio_path=mp3_source_path, audio_format="mp3", segment=AudioSegment(start=1.0, end=600)
+    )
+
+    # when
+    extracted = audio_source.extract()
+
+    # then the segment ends with the audio
+    assert extracted.segment is None
+    assert extracted.to_array().shape[0] == pytest.approx(len(data) - 44100, abs=2048)
+
+
+def test_audio_source_segment_after_the_end(wav_source_path):
+
+    # given
+    audio_source = AudioSource(
+        audio_path=wav_source_path, audio_format="wav", segment=AudioSegment(start=600)
+    )
+
+    # when / then
+    with pytest.raises(AudioSourceError):
+        audio_source.read()
+
+
+def test_audio_segment_end_before_start():
+
+    with pytest.raises(ValueError, match="must be after its start"):
+        AudioSegment(start=2.0, end=1.0)
@@ -128,3 +128,31 @@ def test_TimeStretchConfig_target_tempo_or_rate_requirement(wav_source_path):
                 "audio_format": "wav",
             }
         )
+
+
+def test_config_segment(wav_source_path):
+
+    # given
+    config = CLITimeStretchConfig(
+        source=wav_source_path, output="/tmp/output/", min_rate=1.2, start=16.0, end=32.0
+    )
+
+    # then
+    assert config.segment.start == 16.0 and config.segment.end == 32.0
+    assert config.segment.unit == "seconds"
+
+
+def test_config_without_segment(wav_source_path):
+
+    # given
+    config = CLITimeStretchConfig(source=wav_source_path, output="/tmp/output/", min_rate=1.2)
+
+    # then the whole sources are processed
+    assert config.segment is None
+
+
+def test_config_segment_validation(wav_source_path):
+    with pytest.raises(ValidationError, match="end .* must be greater than start"):
+        CLITimeStretchConfig(
+            source=wav_source_path, output="/tmp/output/", min_rate=1.2, start=32, end=16
+        )
@@ -0,0 +1,36 @@
+from pathlib import PurePath
+
+import pytest
+from pydantic import ValidationError
+
+from src.mpcli.entities.shard import Shard
+
+
+def test_shard_parse():
+    # when
+    shard = Shard.model_validate("2/4")
+
+    # then
+    assert shard.index == 2
+    assert shard.count == 4
+    assert str(shard) == "2/4"
+
+
+@pytest.mark.parametrize("value", ["2", "a/4", "0/4", "5/4", "1/0"])
+def test_shard_parse_invalid(value):
+    with pytest.raises(ValidationError):
+        Shard.model_validate(value)
+
+
+def test_shard_contains_exactly_one_shard():
+    # given
+    paths = [PurePath(f"dir/audio{i}.wav") for i in range(50)]
+    shards = [Shard(index=i, count=4) for i in range(1, 5)]
+
+    # then
+    for path in paths:
+        assert sum(shard.contains(path) for shard in shards) == 1
+
+
+def test_single_shard_contains_everything():
+    assert Shard(index=1, count=1).contains(PurePath("audio.wav"))
@@ -4,8 +4,10 @@ from tempfile import NamedTemporaryFile, TemporaryDirectory
 import numpy as np
 import pytest
 
+from src.mpcli.entities.shard import Shard
 from src.mpcli.entities.source import AudioSource
 from src.mpcli.repository.audio_file import (
+    iter_source_paths,
     iter_sources,
     load_audio_file,
     save_audio_file,
@@ -83,6 +85,37 @@ def test_iter_sources_directory_with_format_filter():
         assert set(source.name for source in sources) == {"audio1"}
 
 
+def test_iter_source_paths_shards_are_disjoint_and_complete():
+    with TemporaryDirectory() as tmp_path:
+        for i in range(20):
+            (Path(tmp_path) / f"audio{i}.wav").touch()
+
+        # when
+        shards = [
+            set(iter_source_paths(tmp_path, shard=Shard(index=i, count=3)))
+            for i in range(1, 4)
+        ]
+
+        # then
+        assert set.union(*shards) == set(iter_source_paths(tmp_path))
+        assert sum(len(s) for s in shards) == 20
+
+
+def test_iter_source_paths_shard_does_not_depend_on_the_source_location():
+    with TemporaryDirectory() as tmp_path1, TemporaryDirectory() as tmp_path2:
+        for tmp_path in (tmp_path1, tmp_path2):
+            for i in range(10):
+                (Path(tmp_path) / f"audio{i}.wav").touch()
+
+        # when
+        shard = Shard(index=1, count=2)
+        names1 = [p.name for p in iter_source_paths(tmp_path1, shard=shard)]
+        names2 = [p.name for p in iter_source_paths(tmp_path2, shard=shard)]
+
+        # then
+        assert sorted(names1) == sorted(names2)
+
+
 def test_load_audio_file_valid_file():
     f = Path(__file__).parent.parent / "assets/valid_audio.wav"
     samples, sample_rate = load_audio_file(file_path=f)
@@ -121,7 +154,8 @@ def test_save_audio_file_wav():
         )
 
         assert result.sample_rate == sample_rate
-        assert result.audio_bytes is not None
+        assert result.path == output_dir / "test.wav"
+        assert result.size == result.path.stat().st_size
 
         # try reading the saved file to ensure it's a valid wav file
         saved_file_path = output_dir / "test.wav"
@@ -202,3 +236,35 @@ def test_save_audio_file_overwrite_existing_mp3():
         assert (Path(tmp_path) / "test.mp3").exists()
         mod_time_after = mp3_output_path.stat().st_mtime
         assert mod_time_after > mod_time_before
+
+
+def test_save_audio_file_leaves_no_temporary_file():
+    with TemporaryDirectory() as tmp_path:
+        output_dir = Path(tmp_path)
+
+        _ = save_audio_file(
+            output_dir=output_dir,
+            filename="test",
+            data=np.array([[0, 0], [0, 0]], dtype=np.int16),
+            sample_rate=44100,
+            format="wav",
+        )
+
+        # only the final file remains once the temporary file is renamed
+        assert [f.name for f in output_dir.iterdir()] == ["test.wav"]
+
+
+def test_save_audio_file_invalid_format_leaves_no_temporary_file():
+    with TemporaryDirectory() as tmp_path:
+        output_dir = Path(tmp_path)
+
+        with pytest.raises(InvalidAudioFileError, match="Error saving audio file"):
+            save_audio_file(
+                output_dir=output_dir,
+                filename="test",
+                data=np.array([[0, 0], [0, 0]], dtype=np.int16),
+                sample_rate=44100,
+                format="unsupported",
+            )
+
+        assert list(output_dir.iterdir()) == []
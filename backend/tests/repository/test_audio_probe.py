@@ -0,0 +1,109 @@
+import os
+import shutil
+
+import pytest
+
+from src.mpcli.repository import audio_probe
+from src.mpcli.repository.audio_probe import (
+    ProbeCache,
+    probe_audio_file,
+    probe_audio_files,
+)
+from src.mpcli.repository.exceptions import InvalidAudioFileError
+
+
+def test_probe_audio_file_wav(wav_source_path):
+    # when
+    probe = probe_audio_file(wav_source_path)
+
+    # then
+    assert probe.format == "WAV"
+    assert probe.sample_rate == 44100
+    assert probe.channels == 2
+    assert probe.duration > 0
+    assert probe.bit_depth == 24
+    assert probe.loudness is None
+
+
+def test_probe_audio_file_mp3_with_loudness(mp3_source_path):
+    # when
+    probe = probe_audio_file(mp3_source_path, loudness=True)
+
+    # then
+    assert probe.format == "MP3"
+    assert probe.bit_depth is None
+    assert probe.loudness is not None and probe.loudness < 0
+
+
+def test_probe_audio_file_invalid(invalid_source_path):
+    with pytest.raises(InvalidAudioFileError):
+        probe_audio_file(invalid_source_path)
+
+
+def test_probe_audio_files_uses_the_cache_until_the_file_changes(
+    tmp_path, wav_source_path, monkeypatch
+):
+    # given
+    path = tmp_path / "audio.wav"
+    shutil.copy(wav_source_path, path)
+    cache = ProbeCache(tmp_path / "probes.sqlite")
+    list(probe_audio_files([path], cache))
+
+    probed = []
+    monkeypatch.setattr(
+        audio_probe,
+        "probe_audio_file",
+        lambda path, **kwargs: probed.append(path) or probe_audio_file(path, **kwargs),
+    )
+
+    # when
+    ((_, cached),) = probe_audio_files([path], cache)
+
+    # then
+    assert cached.sample_rate == 44100
+    assert probed == []
+
+    # when the file changes
+    os.utime(path, ns=(0, 0))
+    list(probe_audio_files([path], cache))
+
+    # then
+    assert probed == [path.resolve()]
+
+
+def test_probe_audio_files_measures_missing_loudness(tmp_path, wav_source_path):
+    # given
+    cache = ProbeCache(tmp_path / "probes.sqlite")
+    list(probe_audio_files([wav_source_path], cache))
+
+    # when
+    ((_, probe),) = probe_audio_files([wav_source_path], cache, loudness=True)
+    ((_, cached),) = probe_audio_files([wav_source_path], cache)
+
+    # then
+    assert probe.loudness is not None
+    assert cached.loudness == probe.loudness
+
+
+def test_probe_audio_files_reports_errors(tmp_path, wav_source_path, invalid_source_path):
+    # given
+    cache = ProbeCache(tmp_path / "probes.sqlite")
+
+    # when
+    results = dict(probe_audio_files([wav_source_path, invalid_source_path], cache))
+
+    # then
+    assert results[wav_source_path.resolve()].format == "WAV"
+    assert isinstance(results[invalid_source_path.resolve()], InvalidAudioFileError)
+
+
+def test_probe_audio_files_in_input_order(tmp_path, wav_source_path, mp3_source_path):
+    # given the second file cached, not the first one
+    cache = ProbeCache(tmp_path / "probes.sqlite")
+    list(probe_audio_files([mp3_source_path], cache))
+
+    # when
+    results = list(probe_audio_files([wav_source_path, mp3_source_path], cache))
+
+    # then
+    assert [path for path, _ in results] == [wav_source_path.resolve(), mp3_source_path.resolve()]
@@ -0,0 +1,86 @@
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.mpcli.entities.source import AudioFileHandle
+from src.mpcli.repository.audio_writer import AudioFileWriter
+from src.mpcli.repository.exceptions import InvalidAudioFileError
+
+
+def test_writer_returns_handles():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        output_dir = Path(tmp_path)
+        data = np.zeros((1000, 2), dtype=np.float32)
+
+        # when
+        with AudioFileWriter(max_workers=2, max_pending=2) as writer:
+            futures = [
+                writer.submit(output_dir, f"test_{i}", data, 44100, "wav")
+                for i in range(5)
+            ]
+
+        # then
+        handles = [f.result() for f in futures]
+        assert all(isinstance(h, AudioFileHandle) for h in handles)
+        assert {h.path.name for h in handles} == {f"test_{i}.wav" for i in range(5)}
+        assert all(h.size == h.path.stat().st_size for h in handles)
+
+
+def test_writer_error_is_raised_by_future():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        data = np.zeros((1000, 2), dtype=np.float32)
+
+        # when
+        with AudioFileWriter() as writer:
+            future = writer.submit(Path(tmp_path), "test", data, 44100, "unsupported")
+
+        # then
+        with pytest.raises(InvalidAudioFileError, match="Error saving audio file"):
+            future.result()
+
+
+def test_writer_applies_back_pressure():
+    with TemporaryDirectory() as tmp_path:
+
+        # given a writer with a single slot, and a write blocked until released
+        release = threading.Event()
+
+        def blocked_save(**kwargs):
+            release.wait(timeout=5)
+
+        data = np.zeros((10, 2), dtype=np.float32)
+
+        with patch("src.mpcli.repository.audio_writer.save_audio_file", blocked_save):
+            with AudioFileWriter(max_workers=1, max_pending=1) as writer:
+
+                writer.submit(Path(tmp_path), "first", data, 44100)
+
+                # when submitting a second write
+                submitted = threading.Event()
+
+                def submit_second():
+                    writer.submit(Path(tmp_path), "second", data, 44100)
+                    submitted.set()
+
+                thread = threading.Thread(target=submit_second)
+                thread.start()
+
+                # then it waits for the first one to complete
+                assert not submitted.wait(timeout=0.2)
+
+                release.set()
+                assert submitted.wait(timeout=5)
+                thread.join()
+
+
+def test_writer_invalid_pending_size():
+    with pytest.raises(ValueError, match="cannot be lower than max_workers"):
+        AudioFileWriter(max_workers=4, max_pending=2)
@@ -0,0 +1,106 @@
+import pstats
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository import profiling
+from src.mpcli.repository.profiling import (
+    ProfilingSettings,
+    call_profiled,
+    maybe_profiled,
+    profile_name,
+    profiled,
+)
+
+
+def _allocate(size: int) -> int:
+    return len(np.ones(size))
+
+
+def test_profiled_writes_profile_and_snapshot():
+    with TemporaryDirectory() as tmp_dir:
+
+        # when
+        with profiled(Path(tmp_dir), "test"):
+            _allocate(100_000)
+
+        # then
+        stats = pstats.Stats(str(Path(tmp_dir) / "test.prof"))
+        assert any(name == "_allocate" for _, _, name in stats.stats)
+
+        tracemalloc.Snapshot.load(str(Path(tmp_dir) / "test.snapshot"))
+        assert not tracemalloc.is_tracing()
+
+
+def test_profile_name():
+
+    # when
+    name = profile_name("POST /normalize", None, "my song")
+
+    # then
+    assert name.startswith("POST_normalize.my_song.")
+    assert profile_name("a") != profile_name("a")
+
+
+def test_maybe_profiled_disabled(monkeypatch):
+    with TemporaryDirectory() as tmp_dir:
+
+        # given a directory, but no request sampled
+        monkeypatch.setattr(
+            profiling, "settings", ProfilingSettings(directory=tmp_dir, sample_rate=0.0)
+        )
+
+        # when
+        with maybe_profiled("normalize", "source"):
+            _allocate(10)
+
+        # then
+        assert list(Path(tmp_dir).iterdir()) == []
+
+
+def test_maybe_profiled_enabled(monkeypatch):
+    with TemporaryDirectory() as tmp_dir:
+
+        # given
+        monkeypatch.setattr(profiling, "settings", ProfilingSettings(directory=tmp_dir))
+
+        # when
+        with maybe_profiled("normalize", "source"):
+            _allocate(10)
+
+        # then
+        files = sorted(path.suffix for path in Path(tmp_dir).glob("normalize.source.*"))
+        assert files == [".prof", ".snapshot"]
+
+
+def test_call_profiled_named_after_source():
+    with TemporaryDirectory() as tmp_dir:
+
+        # given
+        source = AudioSource(audio_bytes=b"", audio_format="wav", name="my_song")
+
+        # when
+        result = call_profiled(Path(tmp_dir), "POST /tempo", lambda s: s.name, source)
+
+        # then
+        assert result == "my_song"
+        assert len(list(Path(tmp_dir).glob("POST_tempo.my_song.*.prof"))) == 1
+
+
+def test_settings_from_env(monkeypatch):
+
+    # given
+    monkeypatch.setenv("MPCLI_PROFILE_DIR", "/tmp/profiles")
+    monkeypatch.setenv("MPCLI_PROFILE_SAMPLE_RATE", "0.05")
+
+    # when
+    settings = ProfilingSettings.from_env()
+
+    # then
+    assert settings.enabled
+    assert settings.directory == Path("/tmp/profiles")
+    assert settings.sample_rate == 0.05
+    assert not ProfilingSettings().enabled
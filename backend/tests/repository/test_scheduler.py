@@ -0,0 +1,164 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from src.mpcli.entities.pipeline import NormalizeStage, TimeStretchStage
+from src.mpcli.entities.source import AudioSegment
+from src.mpcli.repository.audio_file import load_source
+from src.mpcli.repository.scheduler import (
+    CostModel,
+    MemoryModel,
+    SourceProbe,
+    estimate_makespan,
+    load_cost_model,
+    longest_first,
+    pipeline_stretch_rate,
+    probe_audio_source,
+    probe_source,
+    save_cost_model,
+    stretch_rate,
+)
+
+
+def test_probe_source(wav_source_path):
+
+    # when
+    probe = probe_source(wav_source_path)
+
+    # then
+    assert probe.duration > 0
+    assert probe.channels in (1, 2)
+
+
+def test_probe_source_unreadable_header(invalid_source_path):
+
+    # when the header cannot be read, the duration is estimated from the size
+    probe = probe_source(invalid_source_path)
+
+    # then
+    assert probe.duration >= 0
+
+
+def test_probe_audio_source_segment(wav_source_path):
+
+    # given
+    source = load_source(wav_source_path, segment=AudioSegment(start=0.0, end=0.5))
+
+    # when
+    probe = probe_audio_source(source)
+
+    # then only the segment is decoded
+    assert probe.duration == pytest.approx(0.5, abs=1e-3)
+    assert probe.sample_rate > 0
+
+
+def test_memory_model_scales_with_decoded_size():
+
+    # given
+    model = MemoryModel(copies={"normalize": 4.0}, overhead=1000)
+    probe = SourceProbe(duration=10.0, channels=2, sample_rate=44100)
+
+    # when
+    peak = model.estimate("normalize", probe)
+
+    # then 4 copies of the float32 samples
+    assert peak == 1000 + 4 * 10 * 44100 * 2 * 4
+    assert model.estimate("unknown", probe) > peak
+
+
+def test_memory_model_scales_with_stretch_rate():
+
+    # given
+    model = MemoryModel(copies={"timestretch": 1.0}, stretched_copies={"timestretch": 2.0}, overhead=0)
+    probe = SourceProbe(duration=10.0, channels=2, sample_rate=44100)
+    decoded = 10 * 44100 * 2 * 4
+
+    # then the output of a rate of 0.1 is 10 times longer
+    assert model.estimate("timestretch", probe) == 3 * decoded
+    assert model.estimate("timestretch", probe, rate=0.1) == 21 * decoded
+    # a rate depending on an unknown tempo
+    assert model.estimate("timestretch", probe, rate=None) == 5 * decoded
+
+
+def test_stretch_rate():
+
+    # then
+    assert stretch_rate(None, 0.5, 1.5) == 0.5
+    assert stretch_rate(60.0, 1.0, 1.0, original_tempo=120.0) == 0.5
+    assert stretch_rate(60.0, 1.0, 1.0) is None
+    assert stretch_rate(None, 1.0, 1.0) == 1.0
+
+
+def test_pipeline_stretch_rate():
+
+    # given
+    stages = [
+        TimeStretchStage(min_rate=0.5, max_rate=0.8),
+        NormalizeStage(lufs=-14),
+        TimeStretchStage(target_tempo=240.0),
+    ]
+
+    # then the audio is the longest after the first stretch
+    assert pipeline_stretch_rate(stages, original_tempo=120.0) == 0.5
+    assert pipeline_stretch_rate(stages) is None
+    assert pipeline_stretch_rate([NormalizeStage(lufs=-14)]) == 1.0
+
+
+def test_cost_model_scales_with_duration_and_channels():
+
+    # given
+    model = CostModel(rates={"normalize": 0.1}, overhead=0.0)
+
+    # then
+    assert model.estimate("normalize", SourceProbe(duration=10, channels=2)) == pytest.approx(2.0)
+    assert model.estimate("normalize", SourceProbe(duration=10, channels=1)) == pytest.approx(1.0)
+
+
+def test_cost_model_calibration():
+
+    # given
+    model = CostModel(rates={"normalize": 0.1}, overhead=0.0, smoothing=0.5)
+
+    # when the observed jobs are faster than estimated
+    model.calibrate("normalize", [(SourceProbe(duration=10, channels=1), 0.5)])
+
+    # then the rate moves toward the observed one
+    assert model.rates["normalize"] == pytest.approx(0.075)
+
+
+def test_cost_model_persistence():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        path = Path(tmp_path) / "cost-model.json"
+        model = CostModel(rates={"normalize": 0.42})
+
+        # when
+        save_cost_model(model, path)
+
+        # then
+        assert load_cost_model(path).rates["normalize"] == 0.42
+        assert load_cost_model(Path(tmp_path) / "missing.json") == CostModel()
+
+
+def test_longest_first():
+
+    # when
+    items, costs = longest_first(["a", "b", "c"], [1.0, 3.0, 2.0])
+
+    # then
+    assert items == ["b", "c", "a"]
+    assert costs == [3.0, 2.0, 1.0]
+
+
+def test_estimate_makespan():
+
+    # long job last: one worker ends alone with it
+    assert estimate_makespan([1, 1, 1, 1, 4], workers=2) == 6
+
+    # long job first
+    assert estimate_makespan([4, 1, 1, 1, 1], workers=2) == 4
+
+    assert estimate_makespan([2, 3], workers=8) == 3
+    assert estimate_makespan([], workers=2) == 0
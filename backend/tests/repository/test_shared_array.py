@@ -0,0 +1,38 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from src.mpcli.repository.shared_array import attach_array, release_array, share_array
+
+
+def test_shared_array_round_trip():
+
+    # given
+    array = np.random.default_rng(0).random((3, 40, 256, 1), dtype=np.float32)
+
+    # when
+    shared = share_array(array)
+
+    # then the array is mapped as it was shared
+    with attach_array(shared) as attached:
+        assert attached.dtype == np.float32
+        assert np.array_equal(attached, array)
+        del attached
+
+    # when
+    release_array(shared)
+
+    # then
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=shared.name)
+
+
+def test_release_array_twice():
+
+    # given
+    shared = share_array(np.zeros(4))
+    release_array(shared)
+
+    # when / then
+    release_array(shared)
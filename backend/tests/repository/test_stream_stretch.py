@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from src.mpcli.repository.exceptions import AudioTransformError
+from src.mpcli.repository.stream_stretch import StreamStretcher, stretch_samples
+
+SAMPLE_RATE = 44100
+
+
+def _stretch_stream(stretcher: StreamStretcher, chunks: list[np.ndarray]) -> np.ndarray:
+
+    outputs = []
+
+    for chunk in chunks:
+        stretcher.feed(chunk)
+        for window in stretcher.windows():
+            stretched = stretch_samples(window.samples, SAMPLE_RATE, window.rate)
+            outputs.append(stretcher.assemble(window, stretched))
+
+    for window in stretcher.windows(final=True):
+        stretched = stretch_samples(window.samples, SAMPLE_RATE, window.rate)
+        outputs.append(stretcher.assemble(window, stretched))
+
+    return np.concatenate(outputs)
+
+
+def test_stream_matches_the_whole_signal():
+
+    # given
+    rng = np.random.default_rng(0)
+    signal = (0.1 * rng.standard_normal((SAMPLE_RATE * 2, 2))).astype(np.float32)
+
+    # when, at rate 1 the stretcher leaves the signal as is
+    output = _stretch_stream(StreamStretcher(2, rate=1.0), np.array_split(signal, 37))
+
+    # then the blocks are stitched without seams
+    assert output.shape == signal.shape
+    np.testing.assert_allclose(output[4096:-4096], signal[4096:-4096], atol=1e-4)
+
+
+def test_stream_is_stretched_by_rate():
+
+    # given
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+    signal = np.stack([0.5 * np.sin(2 * np.pi * 440 * t)] * 2, axis=1).astype(np.float32)
+
+    # when
+    output = _stretch_stream(StreamStretcher(2, rate=0.8), np.array_split(signal, 20))
+
+    # then the duration changes, not the pitch
+    assert len(output) == pytest.approx(len(signal) / 0.8, abs=64)
+
+    spectrum = np.abs(np.fft.rfft(output[:, 0]))
+    assert spectrum.argmax() * SAMPLE_RATE / len(output) == pytest.approx(440, abs=2)
+
+
+def test_stream_blocks_wait_for_their_context():
+
+    # given
+    stretcher = StreamStretcher(1, block=4096, context=1024)
+
+    # when
+    stretcher.feed(np.zeros((5000, 1), dtype=np.float32))
+
+    # then
+    assert list(stretcher.windows()) == []
+    assert [w.stop - w.start for w in stretcher.windows(final=True)] == [4096, 904]
+
+
+def test_stream_invalid_rate():
+    with pytest.raises(AudioTransformError):
+        StreamStretcher(2, rate=20)
@@ -1,8 +1,10 @@
 from pathlib import Path
 
+import numpy as np
+
 from src.mpcli.entities.result import TempoResult
 from src.mpcli.entities.source import AudioSource
-from src.mpcli.repository.tempo import estimate_tempo
+from src.mpcli.repository.tempo import estimate_tempo, predict_tempi, read_tempo_features
 
 
 def test_estimate_mp3_tempo(mp3_source_path: Path):
@@ -37,3 +39,33 @@ def test_estimate_wav_tempo(wav_source_path: Path):
     print(f"Estimated tempo for {wav_source_path.name}: {result.tempo} BPM")
     assert isinstance(result, TempoResult)
     assert result.tempo > 0
+
+
+def test_predict_tempi_matches_single_estimates(wav_source_path: Path, mp3_source_path: Path):
+    # given valid audio sources
+    sources = [
+        AudioSource(audio_path=wav_source_path, audio_format="wav", name=wav_source_path.name),
+        AudioSource(audio_path=mp3_source_path, audio_format="mp3", name=mp3_source_path.name),
+    ]
+
+    # when estimating the tempi in a single batch
+    tempi = predict_tempi([read_tempo_features(source) for source in sources])
+
+    # then
+    assert len(tempi) == 2
+    for source, tempo in zip(sources, tempi):
+        assert abs(tempo - estimate_tempo(source).tempo) < 1e-3
+
+
+def test_read_tempo_features_as_tempocnn(mp3_source_path: Path):
+    # given
+    from tempocnn.feature import read_features
+
+    source = AudioSource(audio_path=mp3_source_path, audio_format="mp3", name=mp3_source_path.name)
+
+    # when
+    features = read_tempo_features(source)
+
+    # then
+    with source.open() as audio:
+        assert np.array_equal(features, read_features(audio, zero_pad=True))
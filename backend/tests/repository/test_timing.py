@@ -0,0 +1,48 @@
+from src.mpcli.repository.timing import add_stages, call_recorded, record_stages, timed_stage
+
+
+def _decode_twice() -> str:
+    with timed_stage("decode"):
+        pass
+    with timed_stage("decode"):
+        pass
+    return "done"
+
+
+def test_stages_are_summed_by_name():
+
+    # when
+    result, stages = call_recorded(_decode_twice)
+
+    # then
+    assert result == "done"
+    assert list(stages) == ["decode"]
+
+
+def test_stages_run_elsewhere_are_added():
+
+    # given
+    with record_stages() as stages:
+        with timed_stage("upload"):
+            pass
+
+        # when
+        add_stages({"decode": 1.5})
+        add_stages({"decode": 0.5})
+
+    # then
+    assert stages["decode"] == 2.0
+    assert set(stages) == {"upload", "decode"}
+
+
+def test_stages_are_not_recorded_by_default():
+
+    # when
+    with timed_stage("decode"):
+        pass
+    add_stages({"decode": 1.0})
+
+    # then nothing is recorded, nor raised
+    with record_stages() as stages:
+        pass
+    assert stages == {}
@@ -0,0 +1,129 @@
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from src.mpcli.repository.watch import SourceWatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_watcher_skips_existing_files():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        (Path(tmp_path) / "existing.wav").write_bytes(b"data")
+        clock = FakeClock()
+        watcher = SourceWatcher(tmp_path, settle=1.0, clock=clock)
+
+        # when
+        clock.now = 10.0
+
+        # then
+        assert watcher.poll() == []
+
+
+def test_watcher_process_existing_files():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        existing = Path(tmp_path) / "existing.wav"
+        existing.write_bytes(b"data")
+        watcher = SourceWatcher(tmp_path, settle=0.0, process_existing=True)
+
+        # then
+        assert watcher.poll() == [existing]
+
+
+def test_watcher_waits_for_stable_files():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        clock = FakeClock()
+        watcher = SourceWatcher(tmp_path, settle=2.0, clock=clock)
+
+        # when a file is being written
+        new_file = Path(tmp_path) / "new.mp3"
+        new_file.write_bytes(b"partial")
+        assert watcher.poll() == []
+
+        clock.now = 1.5
+        new_file.write_bytes(b"partial and more")
+        assert watcher.poll() == []
+
+        # then it's reported once unchanged for `settle` seconds
+        clock.now = 3.0
+        assert watcher.poll() == []
+
+        clock.now = 3.5
+        assert watcher.poll() == [new_file]
+
+        # and only once
+        clock.now = 10.0
+        assert watcher.poll() == []
+
+
+def test_watcher_reports_changed_files():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        clock = FakeClock()
+        source = Path(tmp_path) / "source.wav"
+        source.write_bytes(b"data")
+        watcher = SourceWatcher(tmp_path, settle=0.0, clock=clock)
+
+        # when
+        source.write_bytes(b"new data")
+        os.utime(source, ns=(0, 10**9))
+
+        # then
+        assert watcher.poll() == [source]
+
+
+def test_watcher_ignores_excluded_directory():
+    with TemporaryDirectory() as tmp_path:
+
+        # given the output directory is within the source directory
+        output_dir = Path(tmp_path) / "out"
+        output_dir.mkdir()
+        watcher = SourceWatcher(tmp_path, settle=0.0, exclude=output_dir)
+
+        # when
+        (output_dir / "output.wav").write_bytes(b"data")
+
+        # then
+        assert watcher.poll() == []
+
+
+def test_watcher_source_not_existing_yet():
+    with TemporaryDirectory() as tmp_path:
+
+        # given
+        source_dir = Path(tmp_path) / "drop"
+        watcher = SourceWatcher(source_dir, settle=0.0)
+        assert watcher.poll() == []
+
+        # when
+        source_dir.mkdir()
+        (source_dir / "new.wav").write_bytes(b"data")
+
+        # then
+        assert watcher.poll() == [source_dir / "new.wav"]
+
+
+def test_watcher_rejects_source_in_excluded_directory():
+    with TemporaryDirectory() as tmp_path:
+
+        # when the output directory is the watched one
+        with pytest.raises(ValueError, match="none of its files"):
+            SourceWatcher(tmp_path, exclude=Path(tmp_path))
+
+        # then an output directory within the source is allowed
+        SourceWatcher(tmp_path, exclude=Path(tmp_path) / "out")
@@ -0,0 +1,108 @@
+import tracemalloc
+
+import pytest
+
+from src.mpcli.cli_benchmark import SIGNAL_TEMPO, OPERATIONS, BenchmarkCase, synthetic_source
+from src.mpcli.entities.pipeline import NormalizeStage, TimeStretchStage
+from src.mpcli.repository.scheduler import MemoryModel, SourceProbe
+from src.mpcli.use_cases.pipeline import execute_pipeline
+from src.mpcli.use_cases.timestretch import execute_timestretch
+
+# the peak memory allowed to each use case, in decoded sizes (float32 samples) of its source:
+# the source itself is allocated beforehand and not counted. The loudness is measured channel
+# by channel in float64, so the budgets of the mono signals are higher.
+BUDGETS = [
+    ("detect_tempo", 2, 2.0),
+    ("detect_tempo", 1, 2.5),
+    # stretched by a rate of 1.25
+    ("timestretch", 2, 2.75),
+    ("timestretch", 1, 2.0),
+    ("convert", 2, 2.5),
+    ("convert", 1, 1.5),
+    ("normalize", 2, 4.5),
+    ("normalize", 1, 6.5),
+    ("pipeline", 2, 4.0),
+    ("pipeline", 1, 5.75),
+]
+
+DURATION = 15.0
+
+# the time stretches of the source by a rate
+STRETCHES = {
+    "timestretch": lambda source, rate: execute_timestretch(
+        source, min_rate=rate, max_rate=rate, original_tempo=SIGNAL_TEMPO
+    ),
+    "pipeline": lambda source, rate: execute_pipeline(
+        source,
+        [TimeStretchStage(target_tempo=SIGNAL_TEMPO * rate), NormalizeStage(lufs=-14.0)],
+        original_tempo=SIGNAL_TEMPO,
+    ),
+}
+
+
+def case_probe(case: BenchmarkCase) -> SourceProbe:
+    return SourceProbe(duration=case.duration, channels=case.channels, sample_rate=case.sample_rate)
+
+
+def _peak_memory(case: BenchmarkCase) -> int:
+    """the peak of the memory allocated by the use case of the case, once the models are loaded"""
+
+    source = synthetic_source(case)
+    operation = OPERATIONS[case.operation]
+
+    # loads the models and fills the caches
+    operation(source)
+
+    tracemalloc.start()
+    try:
+        operation(source)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+@pytest.mark.parametrize("operation,channels,budget", BUDGETS)
+def test_peak_memory_within_budget(operation, channels, budget):
+
+    # given
+    sample_rate = 44100 if channels == 2 else 22050
+    case = BenchmarkCase(
+        operation=operation, duration=DURATION, channels=channels, sample_rate=sample_rate
+    )
+    decoded = DURATION * sample_rate * channels * 4
+
+    # when
+    peak = _peak_memory(case)
+
+    # then
+    assert peak <= budget * decoded, (
+        f"{case.key} peaked at {peak / decoded:.2f}x the decoded size, the budget is {budget}x"
+    )
+
+    # the requests of the API are admitted on estimations which must not be exceeded
+    assert peak <= MemoryModel().estimate(operation, case_probe(case), rate=1.25)
+
+
+@pytest.mark.parametrize("operation", ["timestretch", "pipeline"])
+@pytest.mark.parametrize("rate", [0.25, 2.0])
+def test_peak_memory_of_time_stretches_within_estimation(operation, rate):
+
+    # given a mono signal, the worst case of the loudness, stretched by the rate
+    case = BenchmarkCase(operation=operation, duration=DURATION, channels=1, sample_rate=22050)
+    source = synthetic_source(case)
+    run = STRETCHES[operation]
+
+    run(source, rate)
+
+    # when
+    tracemalloc.start()
+    try:
+        run(source, rate)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # then
+    assert peak <= MemoryModel().estimate(operation, case_probe(case), rate=rate)
@@ -0,0 +1,121 @@
+import io
+
+import pytest
+import soundfile as sf
+from pydantic import TypeAdapter, ValidationError
+
+from src.mpcli.entities.pipeline import (
+    ConvertStage,
+    NormalizeStage,
+    PipelineStage,
+    TimeStretchStage,
+)
+from src.mpcli.entities.source import AudioSource
+from src.mpcli.repository.audio_transform import get_loudness
+from src.mpcli.use_cases.pipeline import execute_pipeline
+
+
+def test_execute_pipeline(wav_source_path):
+
+    # given
+    audio_source = AudioSource(
+        audio_bytes=wav_source_path.read_bytes(), audio_format="wav", name="test"
+    )
+    stages = [
+        TimeStretchStage(min_rate=1.2, max_rate=1.2),
+        NormalizeStage(lufs=-14.0),
+        ConvertStage(target_format="mp3"),
+    ]
+
+    # when
+    result = execute_pipeline(audio_source, stages)
+
+    # then
+    assert result.converted_audio.audio_format == "mp3"
+    assert result.lufs == -14.0
+    assert list(result.timings.keys()) == [
+        "decode",
+        "timestretch",
+        "normalize",
+        "convert",
+        "encode",
+    ]
+
+    original, sample_rate = sf.read(wav_source_path, always_2d=True)
+    data, _ = sf.read(io.BytesIO(result.converted_audio.audio_bytes), always_2d=True)
+    assert len(data) < len(original)
+    assert abs(get_loudness(data, sample_rate) - (-14.0)) < 0.5
+
+
+def test_execute_pipeline_target_tempo(mp3_source_path):
+
+    # given
+    audio_source = AudioSource(
+        audio_bytes=mp3_source_path.read_bytes(), audio_format="mp3", name="test"
+    )
+
+    # when
+    result = execute_pipeline(audio_source, [TimeStretchStage(target_tempo=95.0)])
+
+    # then the tempo is detected before stretching, and the source format is kept
+    assert result.original_tempo is not None and result.original_tempo > 0
+    assert result.target_tempo == 95.0
+    assert result.converted_audio.audio_format == "mp3"
+
+
+def test_execute_pipeline_repeated_stages(wav_source_path):
+
+    # given
+    audio_source = AudioSource(
+        audio_bytes=wav_source_path.read_bytes(), audio_format="wav", name="test"
+    )
+
+    # when
+    result = execute_pipeline(audio_source, [NormalizeStage(), NormalizeStage()])
+
+    # then
+    assert "normalize" in result.timings and "normalize#2" in result.timings
+
+
+def test_pipeline_stages_from_config():
+
+    # given stages as declared in the TOML config
+    stages = TypeAdapter(list[PipelineStage]).validate_python(
+        [
+            {"operation": "detect_tempo"},
+            {"operation": "timestretch", "min_rate": 0.9},
+            {"operation": "convert", "target_format": "mp3"},
+        ]
+    )
+
+    # then
+    assert stages[1].min_rate == 0.9 and stages[1].max_rate == 1.0
+    assert stages[2].target_format == "mp3"
+
+
+def test_pipeline_timestretch_stage_validation():
+    with pytest.raises(ValidationError, match="Only one of target_tempo"):
+        TimeStretchStage(target_tempo=120.0, min_rate=0.9)
+
+    with pytest.raises(ValidationError, match="Either target_tempo"):
+        TimeStretchStage()
+
+
+def test_execute_pipeline_known_tempo(wav_source_path):
+
+    # given
+    audio_source = AudioSource(
+        audio_bytes=wav_source_path.read_bytes(), audio_format="wav", name="test"
+    )
+
+    # when the tempo of the source was estimated beforehand
+    result = execute_pipeline(
+        audio_source, [TimeStretchStage(target_tempo=150.0)], original_tempo=100.0
+    )
+
+    # then it's used, the audio is stretched by 1.5
+    original, _ = sf.read(wav_source_path, always_2d=True)
+    data, _ = sf.read(io.BytesIO(result.converted_audio.audio_bytes), always_2d=True)
+
+    assert result.original_tempo == 100.0
+    assert len(data) == pytest.approx(len(original) / 1.5, rel=0.05)